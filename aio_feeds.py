@@ -0,0 +1,52 @@
+# Adafruit IO Feeds
+# Single feed read/write helpers over the Adafruit IO REST API. The main loop reports through
+# telemetry.py instead; these are kept for one-off use from the REPL, e.g.
+#   import aio_feeds; aio_feeds.get_feed_data(wifi, secrets, "train")
+
+AIO_BASE_URL = "https://io.adafruit.com/api/v2/"
+
+
+def send_feed_data(wifi, secrets, feed_key, data):
+    """
+    Sends data to Adafruit IO.
+    Args:
+        wifi: WiFi manager to request with.
+        secrets: Dict with 'aio username' and 'aio key'.
+        feed_key: Key of the feed to append to.
+        data: The value to send.
+
+    Returns:
+        'status_code', 'response' tuple, or None if the request failed.
+    """
+    request_url = f"{AIO_BASE_URL}{secrets['aio username']}/feeds/{feed_key}/data"
+    headers = {'X-AIO-Key': secrets['aio key']}
+    payload = {'value': data}
+    try:
+        response = wifi.post(request_url, headers=headers, json=payload)
+        return response.status_code, response.json()
+    except Exception as e:
+        print("Failed to send Adafruit IO data: {}".format(e))
+        return None
+
+
+def get_feed_data(wifi, secrets, feed_key, limit=1):
+    """
+    Gets data from Adafruit IO.
+    Args:
+        wifi: WiFi manager to request with.
+        secrets: Dict with 'aio username' and 'aio key'.
+        feed_key: Key of the feed to read.
+        limit: Number of data points to return.
+
+    Returns:
+        'status_code': The HTTP status code from the request
+        'response': The JSON data
+    """
+    request_url = f"{AIO_BASE_URL}{secrets['aio username']}/feeds/{feed_key}/data?limit={limit}"
+    headers = {'X-AIO-Key': secrets['aio key']}
+    try:
+        response = wifi.get(request_url, headers=headers)
+        return response.status_code, response.json()
+    except Exception as e:
+        print("Failed to get Adafruit IO data: {}".format(e))
+        return 400, "{}"
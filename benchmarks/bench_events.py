@@ -0,0 +1,221 @@
+# Benchmark: events.py calendar polling, rebuild-and-list vs. incremental sync
+# Runs events.CalendarSync against an in-process Calendar v3 stand-in and compares it with the
+# previous per-cycle behaviour (build the service, list the whole lookahead window). Reports
+# requests, events transferred and per-cycle latency: CPU time measured here plus a modeled
+# network cost of `rtt_ms` per request and `discovery_ms` per service build.
+#
+# It then replays a day of the publisher loop on a virtual clock and counts Directions API calls:
+# the previous loop (directions for the first event every pass, 15 s apart within 30 minutes of
+# departure) against events.DeparturePlanner with its DirectionsCache.
+#
+# Usage (from the repo root):
+#   python benchmarks/bench_events.py [events] [cycles] [changes_every]
+
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import pytz
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import events  # noqa: E402
+
+TIMEZONE = pytz.timezone("America/New_York")
+PAGE_SIZE = 250
+
+
+class LocalCalendar:
+    """
+    Calendar v3 stand-in: events().list(...).execute() with timeMin/timeMax, paging and sync tokens.
+    Every change bumps a version; a sync token is the version it was issued at.
+    """
+
+    def __init__(self, count, days=30, seed=1):
+        self.random = random.Random(seed)
+        self.version = 0
+        self.items = {}
+        self.requests = 0
+        self.items_sent = 0
+        self.builds = 0
+        self.start = TIMEZONE.localize(datetime.combine(datetime.now(TIMEZONE).date(), datetime.min.time()))
+        self.days = days
+        for index in range(count):
+            self._put("event%04d" % index)
+
+    def _put(self, event_id, status="confirmed"):
+        self.version += 1
+        start = self.start + timedelta(minutes=self.random.randrange(self.days * 24 * 60))
+        self.items[event_id] = {
+            "id": event_id, "status": status, "summary": "Meeting " + event_id,
+            "location": "1600 Pennsylvania Ave NW\nWashington, DC 20500",
+            "start": {"dateTime": start.isoformat()}, "end": {"dateTime": (start + timedelta(hours=1)).isoformat()},
+            "_version": self.version,
+        }
+
+    def change(self):
+        """
+        Moves, adds or cancels one event.
+        """
+        roll = self.random.random()
+        event_id = self.random.choice(sorted(self.items))
+        if roll < 0.2:
+            self._put("new%04d" % self.version)
+        elif roll < 0.3:
+            self.version += 1
+            self.items[event_id]["status"] = "cancelled"
+            self.items[event_id]["_version"] = self.version
+        else:
+            self._put(event_id)
+
+    # --- SERVICE INTERFACE ---
+    def events(self):
+        return self
+
+    def list(self, calendarId, singleEvents=True, pageToken=None, syncToken=None, timeMin=None, timeMax=None,
+             orderBy=None, maxResults=PAGE_SIZE):
+        return _Request(self, syncToken, timeMin, timeMax, orderBy, int(pageToken or 0), maxResults)
+
+
+class _Request:
+    def __init__(self, calendar, sync_token, time_min, time_max, order_by, offset, page_size):
+        self.calendar = calendar
+        self.args = (sync_token, time_min, time_max, order_by, offset, page_size)
+
+    def execute(self):
+        calendar = self.calendar
+        sync_token, time_min, time_max, order_by, offset, page_size = self.args
+        calendar.requests += 1
+        if sync_token is not None:
+            since = int(sync_token)
+            matches = [item for item in calendar.items.values() if item["_version"] > since]
+        else:
+            low = datetime.fromisoformat(time_min.replace("Z", "+00:00")) if time_min else None
+            high = datetime.fromisoformat(time_max.replace("Z", "+00:00")) if time_max else None
+            matches = []
+            for item in calendar.items.values():
+                start = datetime.fromisoformat(item["start"]["dateTime"])
+                if item["status"] == "cancelled" or (low and start < low) or (high and start >= high):
+                    continue
+                matches.append(item)
+            if order_by == "startTime":
+                matches.sort(key=lambda item: item["start"]["dateTime"])
+        page = [{key: value for key, value in item.items() if key != "_version"}
+                for item in matches[offset:offset + page_size]]
+        calendar.items_sent += len(page)
+        result = {"items": page}
+        if offset + page_size < len(matches):
+            result["nextPageToken"] = str(offset + page_size)
+        else:
+            result["nextSyncToken"] = str(calendar.version)
+        return result
+
+
+def legacy_cycle(calendar, lookahead_days=3):
+    # what retrieve_next_event() did every pass: build the service, list the lookahead window in order
+    calendar.builds += 1
+    today = datetime.now(TIMEZONE).date()
+    start = datetime.combine(today, datetime.min.time()).isoformat() + "Z"
+    end = (datetime.combine(today, datetime.max.time()) + timedelta(days=lookahead_days)).isoformat() + "Z"
+    page_token = None
+    items = []
+    while True:
+        result = calendar.events().list(calendarId="bench", timeMin=start, timeMax=end, singleEvents=True,
+                                        orderBy="startTime", pageToken=page_token).execute()
+        items.extend(result.get("items", []))
+        page_token = result.get("nextPageToken")
+        if not page_token:
+            break
+    return items[0] if items else None
+
+
+def run(mode, count, cycles, changes_every, rtt_ms, discovery_ms):
+    calendar = LocalCalendar(count)
+    sync = None
+    if mode == "incremental":
+        calendar.builds += 1
+        sync = events.CalendarSync(calendar, "bench", timezone=TIMEZONE)
+    cpu = 0.0
+    for cycle in range(cycles):
+        if cycle and cycle % changes_every == 0:
+            calendar.change()
+        started = time.perf_counter()
+        if sync is None:
+            legacy_cycle(calendar)
+        else:
+            sync.sync()
+            sync.next_event()
+        cpu += time.perf_counter() - started
+    modeled_ms = cpu * 1000 + calendar.requests * rtt_ms + calendar.builds * discovery_ms
+    return {
+        "mode": mode,
+        "requests": calendar.requests,
+        "events_transferred": calendar.items_sent,
+        "service_builds": calendar.builds,
+        "cpu_ms_per_cycle": round(cpu * 1000 / cycles, 3),
+        "modeled_ms_per_cycle": round(modeled_ms / cycles, 1),
+    }
+
+
+def fake_directions(counter):
+    # a transit route leaving 30 minutes before the event starts
+    def fetch(event):
+        counter[0] += 1
+        return {"routes": [{"legs": [{
+            "departure_time": {"value": int(event.start_time) - 30 * 60},
+            "steps": [{"travel_mode": "TRANSIT", "transit_details": {
+                "headsign": "Shady Grove", "line": {"short_name": "RD"}, "departure_stop": {"name": "Metro Center"}}}],
+        }]}]}
+    return fetch
+
+
+def replay_day(mode, count, hours=15, changes_every=3600):
+    """
+    Runs the publisher loop for `hours` of virtual time from now, with a calendar change every
+    `changes_every` seconds. Returns loop passes and Directions calls.
+    """
+    calendar = LocalCalendar(count, days=4)
+    sync = events.CalendarSync(calendar, "bench", timezone=TIMEZONE)
+    counter = [0]
+    fetch = fake_directions(counter)
+    planner = events.DeparturePlanner(sync, events.DirectionsCache(fetch))
+    now = time.time()
+    end = now + hours * 60 * 60
+    next_change = now + changes_every
+    passes = 0
+    while now < end:
+        passes += 1
+        if now >= next_change:
+            calendar.change()
+            next_change += changes_every
+        if mode == "legacy":
+            sync.sync()
+            event = sync.next_event(now=now)
+            if event is None:
+                now += 5 * 60
+                continue
+            departure = events.get_departure_time(fetch(event))
+            now += 15 if departure - now < 1800 else 1800
+        else:
+            planner.plan(now)
+            now += planner.seconds_until_change(now)
+    return {"mode": mode, "passes": passes, "directions_calls": counter[0],
+            "events_planned": len(planner.timeline) if mode == "planner" else 1}
+
+
+def main(count=200, cycles=240, changes_every=20, rtt_ms=120, discovery_ms=400):
+    print(f"{count} events, {cycles} cycles (15 s apart near departure), a change every {changes_every} cycles")
+    results = [run(mode, count, cycles, changes_every, rtt_ms, discovery_ms) for mode in ("legacy", "incremental")]
+    for result in results:
+        print("  ".join(f"{key}={value}" for key, value in result.items()))
+    print("Directions over a 15 hour day, 40 events in the next 4 days, a calendar change every hour")
+    for mode in ("legacy", "planner"):
+        result = replay_day(mode, 40)
+        print("  ".join(f"{key}={value}" for key, value in result.items()))
+    return results
+
+
+if __name__ == "__main__":
+    main(*(int(argument) for argument in sys.argv[1:4]))
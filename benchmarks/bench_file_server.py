@@ -0,0 +1,196 @@
+# Benchmark: file_server.py change-to-client latency and request counts
+# Publishes next_event.json through publisher.Publisher while four clients watch it through a
+# FileServer on localhost:
+#   poll            GET every 5 minutes without a validator (the sign's previous event check)
+#   conditional     GET every 30 seconds with If-None-Match, mostly answered 304
+#   long_poll       GET ?wait=300 with If-None-Match, reissued as soon as it returns
+#   sse             one /events stream
+# Time is compressed by `scale` (sign seconds per real second) so a few hours run in seconds.
+# Intervals and long-poll waits are scaled; latency of the push clients does not depend on the
+# clock, so it is reported as measured, while the timer-bound latency of the polling clients is
+# scaled back to sign seconds. Requests and bytes are per hour of sign time.
+#
+# Usage (from the repo root):
+#   python benchmarks/bench_file_server.py [hours] [scale] [changes_per_hour]
+
+import asyncio
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import file_server  # noqa: E402
+import publisher  # noqa: E402
+
+NAME = "next_event.json"
+
+
+class Client:
+    """
+    Minimal keep-alive HTTP/1.1 client that counts requests and bytes received.
+    """
+
+    def __init__(self, port):
+        self.port = port
+        self.reader = None
+        self.writer = None
+        self.requests = 0
+        self.bytes = 0
+
+    async def get(self, path, headers=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection("127.0.0.1", self.port)
+        lines = ["GET {} HTTP/1.1".format(path), "Host: bench", "Accept-Encoding: gzip"]
+        lines.extend("{}: {}".format(key, value) for key, value in (headers or {}).items())
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        self.requests += 1
+        status_line = await self.reader.readline()
+        response_headers = {}
+        size = len(status_line)
+        while True:
+            line = await self.reader.readline()
+            size += len(line)
+            if line in (b"\r\n", b""):
+                break
+            key, _, value = line.decode("latin-1").partition(":")
+            response_headers[key.strip().lower()] = value.strip()
+        body = await self.reader.readexactly(int(response_headers.get("content-length", 0)))
+        self.bytes += size + len(body)
+        return int(status_line.split()[1]), response_headers, body
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def decode(headers, body):
+    if headers.get("content-encoding") == "gzip":
+        import gzip
+        body = gzip.decompress(body)
+    return json.loads(body)
+
+
+class Watcher:
+    def __init__(self, name, scale, published):
+        self.name = name
+        self.scale = scale
+        # change number -> real time published, shared with the publisher task
+        self.published = published
+        # change number -> latency in real seconds
+        self.latency = {}
+
+    def seen(self, change):
+        if change not in self.latency and change in self.published:
+            self.latency[change] = time.monotonic() - self.published[change]
+
+
+async def poll(watcher, client, interval, conditional):
+    etag = None
+    while True:
+        headers = {"If-None-Match": etag} if conditional and etag else None
+        status, response_headers, body = await client.get("/" + NAME, headers)
+        if status == 200:
+            etag = response_headers.get("etag")
+            watcher.seen(decode(response_headers, body)["change"])
+        await asyncio.sleep(interval)
+
+
+async def long_poll(watcher, client, wait):
+    etag = None
+    while True:
+        headers = {"If-None-Match": etag} if etag else None
+        status, response_headers, body = await client.get("/{}?wait={}".format(NAME, wait), headers)
+        if status == 200:
+            etag = response_headers.get("etag")
+            watcher.seen(decode(response_headers, body)["change"])
+
+
+async def stream(watcher, port, counters, current):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"GET /events?files=" + NAME.encode() + b" HTTP/1.1\r\nHost: bench\r\n\r\n")
+    counters["requests"] += 1
+    try:
+        while True:
+            line = await reader.readline()
+            counters["bytes"] += len(line)
+            if line.startswith(b"data:"):
+                # the event carries the ETag; the client fetches nothing else, the change number
+                # comes from the publisher's side for the latency measurement
+                watcher.seen(current[0])
+    finally:
+        writer.close()
+
+
+async def run(hours, scale, changes_per_hour, seed=1):
+    directory = tempfile.mkdtemp(prefix="bench-file-server-")
+    random.seed(seed)
+    try:
+        events_publisher = publisher.Publisher(directory)
+        events_publisher.publish_json(NAME, {"change": 0})
+        server = file_server.FileServer(directory, "127.0.0.1", 0, max_wait=300)
+        server.attach(events_publisher)
+        await server.start()
+
+        published = {0: time.monotonic()}
+        current = [0]
+        watchers = {name: Watcher(name, scale, published) for name in ("poll", "conditional", "long_poll", "sse")}
+        clients = {name: Client(server.port) for name in ("poll", "conditional", "long_poll")}
+        sse_counters = {"requests": 0, "bytes": 0}
+        tasks = [
+            asyncio.ensure_future(poll(watchers["poll"], clients["poll"], 300 / scale, False)),
+            asyncio.ensure_future(poll(watchers["conditional"], clients["conditional"], 30 / scale, True)),
+            asyncio.ensure_future(long_poll(watchers["long_poll"], clients["long_poll"], 300 / scale)),
+            asyncio.ensure_future(stream(watchers["sse"], server.port, sse_counters, current)),
+        ]
+        # random change times, then enough time for the slowest client to catch the last one
+        duration = hours * 3600 / scale
+        changes = sorted(random.uniform(0, duration) for _ in range(int(hours * changes_per_hour)))
+        started = time.monotonic()
+        for number, at in enumerate(changes, 1):
+            await asyncio.sleep(max(0.0, started + at - time.monotonic()))
+            current[0] = number
+            published[number] = time.monotonic()
+            events_publisher.publish_json(NAME, {"change": number})
+        await asyncio.sleep(max(0.0, started + duration - time.monotonic()) + 310 / scale)
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for client in clients.values():
+            client.close()
+        await server.close()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    results = []
+    for name, watcher in watchers.items():
+        counters = sse_counters if name == "sse" else {"requests": clients[name].requests, "bytes": clients[name].bytes}
+        latencies = [watcher.latency[change] for change in range(1, len(changes) + 1) if change in watcher.latency]
+        # timer-bound latency is in compressed time; push latency is real network time
+        factor = 1 if name in ("long_poll", "sse") else scale
+        results.append({
+            "client": name,
+            "changes_seen": "{}/{}".format(len(latencies), len(changes)),
+            "mean_latency_s": round(sum(latencies) / len(latencies) * factor, 3) if latencies else None,
+            "max_latency_s": round(max(latencies) * factor, 3) if latencies else None,
+            "requests_per_hour": round(counters["requests"] / hours, 1),
+            "bytes_per_hour": round(counters["bytes"] / hours),
+        })
+    return results
+
+
+def main(hours=4, scale=600, changes_per_hour=3):
+    print(f"{hours} h of sign time at {scale}x, {changes_per_hour} changes per hour")
+    results = asyncio.run(run(hours, scale, changes_per_hour))
+    for result in results:
+        print("  ".join(f"{key}={value}" for key, value in result.items()))
+    return results
+
+
+if __name__ == "__main__":
+    main(*(int(argument) for argument in sys.argv[1:4]))
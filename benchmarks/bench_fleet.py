@@ -0,0 +1,142 @@
+# Benchmark: fleet MQTT push vs. per-sign polling
+# Runs fleet.FleetPublisher against an in-process broker stand-in with N subscribed signs and
+# reports upstream request counts, publish counts and publish-to-delivery (fan-out) latency.
+#
+# Usage (from the repo root):
+#   python benchmarks/bench_fleet.py [signs] [stations] [ticks]
+
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import fleet  # noqa: E402
+
+DESTINATIONS = (("A15", "Shady Grv", "Shady Grove"), ("B11", "Glenmont", "Glenmont"))
+
+
+class LocalBroker:
+    """
+    Minimal in-process MQTT broker stand-in: exact topic matching, retained messages,
+    synchronous delivery. publish() has the paho signature so FleetPublisher can use it directly.
+    """
+
+    def __init__(self):
+        self.retained = {}
+        self.subscribers = {}
+        self.deliveries = 0
+
+    def subscribe(self, topic, callback):
+        self.subscribers.setdefault(topic, []).append(callback)
+        # retained state is delivered on subscribe, like a real broker
+        if topic in self.retained:
+            callback(topic, self.retained[topic])
+
+    def publish(self, topic, payload, qos=0, retain=False):
+        if retain:
+            self.retained[topic] = payload
+        for callback in self.subscribers.get(topic, []):
+            callback(topic, payload)
+            self.deliveries += 1
+
+
+class FakeUpstream:
+    """Generates WMATA/OpenWeather payloads that change on a fraction of ticks and counts requests."""
+
+    def __init__(self, stations, change_rate=0.3, seed=1):
+        self.stations = stations
+        self.change_rate = change_rate
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.minutes = {station: 10 for station in stations}
+
+    def __call__(self, url, headers=None):
+        self.requests += 1
+        if "onecall" in url:
+            return {
+                "current": {"weather": [{"icon": "01d"}], "temp": 70, "feels_like": 70},
+                "daily": [{"temp": {"min": 60, "max": 80}}],
+                "hourly": [{}, {}, {"temp": 71, "feels_like": 71}],
+            }
+        trains = []
+        for station in self.stations:
+            if self.random.random() < self.change_rate:
+                self.minutes[station] = max(0, self.minutes[station] - 1) or 12
+            for code, destination, name in DESTINATIONS:
+                trains.append({
+                    "LocationCode": station, "Line": "RD", "Destination": destination,
+                    "DestinationCode": code, "DestinationName": name, "Min": str(self.minutes[station]),
+                    "Car": "8", "Group": "1",
+                })
+        return {"Trains": trains}
+
+
+def main(signs=50, station_count=5, ticks=240):
+    stations = ["A%02d" % (index + 1) for index in range(station_count)]
+    broker = LocalBroker()
+    upstream = FakeUpstream(stations)
+    publisher = fleet.FleetPublisher(broker, stations, fetch=upstream)
+    fleet.secrets.setdefault("wmata api key", "bench")
+    for key in ("dc coords x", "dc coords y", "openweather api key"):
+        fleet.secrets.setdefault(key, "0")
+
+    latencies = []
+    publish_started = [0.0]
+    received = [0]
+
+    def sign_handler(topic, message):
+        # every sign decodes the payload, as code.py's on_trains_message does
+        json.loads(message)
+        received[0] += 1
+        latencies.append(time.perf_counter() - publish_started[0])
+
+    for index in range(signs):
+        station = stations[index % station_count]
+        broker.subscribe(fleet.train_topic(station), sign_handler)
+        broker.subscribe(fleet.weather_topic(), sign_handler)
+
+    original_publish = broker.publish
+
+    def timed_publish(topic, payload, qos=0, retain=False):
+        publish_started[0] = time.perf_counter()
+        original_publish(topic, payload, qos, retain)
+
+    broker.publish = timed_publish
+
+    weather_every = 40  # 10 minutes at a 15 second train interval
+    for tick in range(ticks):
+        publisher.poll_trains()
+        if tick % weather_every == 0:
+            publisher.poll_weather()
+
+    # a rebooted sign gets state from retained messages without any upstream request
+    requests_before_reboot = upstream.requests
+    rebooted = []
+    broker.subscribe(fleet.train_topic(stations[0]), lambda topic, message: rebooted.append(message))
+
+    polling_requests = signs * (ticks + (ticks + weather_every - 1) // weather_every)
+    latencies.sort()
+    results = {
+        "signs": signs,
+        "stations": station_count,
+        "ticks": ticks,
+        "upstream_requests_fleet": upstream.requests,
+        "upstream_requests_polling": polling_requests,
+        "published": publisher.published,
+        "unchanged_skipped": publisher.unchanged,
+        "deliveries": broker.deliveries,
+        "fanout_p50_us": round(latencies[len(latencies) // 2] * 1e6, 2) if latencies else None,
+        "fanout_max_us": round(latencies[-1] * 1e6, 2) if latencies else None,
+        "reboot_state_delivered": bool(rebooted) and upstream.requests == requests_before_reboot,
+    }
+    for key, value in results.items():
+        print(f"{key:>26}: {value}")
+    return results
+
+
+if __name__ == "__main__":
+    arguments = [int(argument) for argument in sys.argv[1:4]]
+    main(*arguments)
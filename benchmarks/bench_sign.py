@@ -0,0 +1,427 @@
+# Benchmark suite for the sign's parsers, renderer and main loop, run on the host simulator.
+#
+# Measures get_trains() across 5/50/500 trains, get_nearest_plane() across 10/500/5000 aircraft,
+# get_weather() on a full One Call payload, headline parsing across 5/10/50 GNews articles
+# (the streaming extractor against response.json()), the display_manager render methods, framebuffer
+# rasterization, whole-loop latency, and night mode: idle power proxies (panel, radio and light
+# sleep seconds, requests while closed) and wake-to-first-train latency, with and without
+# low-power night mode. Logging is measured per level (logger.py) against the print() it replaced,
+# with the serial bytes each call writes, and per Day mode loop with everything echoed to serial
+# (the previous behaviour) against the default WARNING echo level. Results are saved as JSON for
+# run-to-run comparison.
+# With --trace, the main loop runs against a recorded trace (recorder.py) instead of the fixtures.
+#
+# Usage (from the repo root):
+#   python benchmarks/bench_sign.py [--quick] [--output FILE] [--compare PREVIOUS.json] [--trace FILE]
+
+import argparse
+import contextlib
+import importlib
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from harness import compare, measure, print_result, save_results  # noqa: E402
+from sim import DEFAULT_FIXTURES, Simulation  # noqa: E402
+from sim.http import FakeResponse, ResponseTable  # noqa: E402
+from sim.replay import TraceReplay  # noqa: E402
+
+TRAIN_COUNTS = (5, 50, 500)
+AIRCRAFT_COUNTS = (10, 500, 5000)
+ARTICLE_COUNTS = (5, 10, 50)
+# night mode timing model: seconds per HTTPS request through the ESP32, and for the ESP32 to boot and
+# rejoin WiFi after it was held in reset (estimates, not measured on a board)
+NIGHT_REQUEST_LATENCY = 0.5
+NIGHT_ESP_RESTART = 5.0
+
+DESTINATIONS = (
+    ("RD", "Shady Grv", "Shady Grove", "A15"),
+    ("RD", "Glenmont", "Glenmont", "B11"),
+    ("RD", "Silver Spring", "Silver Spring", "B08"),
+    ("RD", "Grosvenor", "Grosvenor-Strathmore", "A11"),
+    ("OR", "Vienna", "Vienna/Fairfax-GMU", "K08"),
+    ("BL", "Franconia", "Franconia-Springfield", "J03"),
+)
+
+
+# --- PAYLOADS ---
+def wmata_payload(count, seed=1):
+    generator = random.Random(seed)
+    trains = []
+    for _ in range(count):
+        line, destination, name, code = generator.choice(DESTINATIONS)
+        trains.append({
+            "Car": "8", "Destination": destination, "DestinationCode": code, "DestinationName": name,
+            "Group": "1", "Line": line, "LocationCode": "A03", "LocationName": "Dupont Circle",
+            "Min": generator.choice(("ARR", "BRD", "1", "4", "9", "14")),
+        })
+    return {"Trains": trains}
+
+
+def aircraft_payload(count, seed=1):
+    generator = random.Random(seed)
+    aircraft = []
+    for index in range(count):
+        entry = {"hex": "%06x" % index, "alt_geom": generator.randint(500, 38000),
+                 "r_dst": round(generator.uniform(0.1, 60), 2), "messages": generator.randint(1, 5000)}
+        if generator.random() < 0.9:
+            entry["flight"] = "SIM%04d  " % index
+        aircraft.append(entry)
+    return {"now": 1760900400.0, "messages": 10 ** 6, "aircraft": aircraft}
+
+
+def gnews_payload(count, seed=1):
+    generator = random.Random(seed)
+    articles = []
+    for index in range(count):
+        articles.append({
+            "title": "Story %d: Metro service update for the %s line - WTOP" % (index, generator.choice(("Red", "Blue"))),
+            "description": "Trains will run later on Friday and Saturday nights. " * 4,
+            "content": "Trains will run later on Friday and Saturday nights... " * 20 + "[1200 chars]",
+            "url": "https://example.com/story-%d" % index,
+            "image": "https://example.com/story-%d.jpg" % index,
+            "publishedAt": "2025-10-20T11:%02d:00Z" % (index % 60),
+            "source": {"name": "WTOP", "url": "https://wtop.com"},
+        })
+    return {"totalArticles": count, "articles": articles}
+
+
+def onecall_payload():
+    """A full One Call 3.0 response as requested by the sign (minutely and alerts excluded)."""
+    def weather(icon):
+        return [{"id": 802, "main": "Clouds", "description": "scattered clouds", "icon": icon}]
+
+    hourly = [{"dt": 1760900400 + hour * 3600, "temp": 60 + hour % 12, "feels_like": 59 + hour % 12,
+               "pressure": 1016, "humidity": 60, "dew_point": 48.2, "uvi": 1.2, "clouds": 40,
+               "visibility": 10000, "wind_speed": 6.1, "wind_deg": 210, "wind_gust": 9.4,
+               "weather": weather("03d"), "pop": 0.1} for hour in range(48)]
+    daily = [{"dt": 1760893200 + day * 86400, "sunrise": 1760872000, "sunset": 1760912000,
+              "moonrise": 1760880000, "moonset": 1760930000, "moon_phase": 0.9,
+              "summary": "Expect a day of partly cloudy with clear spells",
+              "temp": {"day": 66, "min": 55, "max": 70, "night": 58, "eve": 64, "morn": 56},
+              "feels_like": {"day": 65, "night": 57, "eve": 63, "morn": 55},
+              "pressure": 1016, "humidity": 55, "dew_point": 48, "wind_speed": 8, "wind_deg": 200,
+              "wind_gust": 14, "weather": weather("03d"), "clouds": 40, "pop": 0.2, "uvi": 4.1}
+             for day in range(8)]
+    return {
+        "lat": 38.9096, "lon": -77.0434, "timezone": "America/New_York", "timezone_offset": -14400,
+        "current": {"dt": 1760900400, "sunrise": 1760872000, "sunset": 1760912000, "temp": 64.2,
+                    "feels_like": 63.0, "pressure": 1016, "humidity": 61, "dew_point": 50.1, "uvi": 2.3,
+                    "clouds": 40, "visibility": 10000, "wind_speed": 6.9, "wind_deg": 220,
+                    "weather": weather("03d")},
+        "hourly": hourly,
+        "daily": daily,
+    }
+
+
+def serve(simulation, pattern, payload):
+    """Answers requests matching pattern with payload, encoded once up front like a recorded response."""
+    body = json.dumps(payload)
+    simulation.responses.add(pattern, handler=lambda method, url, headers, request_body: FakeResponse(200, body),
+                             first=True)
+    return len(body)
+
+
+def start_morning(simulation):
+    # set after install so the start is local to the simulation's timezone; 08:00 on a Monday is Day mode
+    simulation.clock.start_epoch = time.mktime((2025, 10, 20, 8, 0, 0, 0, 0, -1))
+
+
+class SerialCounter:
+    """Stands in for sys.stdout and counts the bytes a USB serial console would have been sent."""
+
+    def __init__(self):
+        self.bytes = 0
+
+    def write(self, text):
+        self.bytes += len(text.encode("utf-8"))
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+# --- BENCHMARKS ---
+def bench_parsers(simulation, sign, iterations):
+    results = []
+    for count in TRAIN_COUNTS:
+        size = serve(simulation, r"api\.wmata\.com", wmata_payload(count))
+        results.append(measure("get_trains", sign["get_trains"], iterations, trains=count, bytes=size))
+        payload = wmata_payload(count)
+        results.append(measure("parse_trains", lambda: sign["parse_trains"](payload), iterations, trains=count))
+
+    # planes.py is only imported by code.py when ENABLE_PLANES is on
+    sign["planes"] = importlib.import_module("planes")
+    for count in AIRCRAFT_COUNTS:
+        size = serve(simulation, r"tar1090", aircraft_payload(count))
+
+        def nearest_plane():
+            sign["nearest_plane"] = None
+            sign["get_nearest_plane"]()
+
+        results.append(measure("get_nearest_plane", nearest_plane, max(1, iterations // (count // 100 or 1)),
+                               aircraft=count, bytes=size))
+
+    size = serve(simulation, r"api\.openweathermap\.org", onecall_payload())
+    results.append(measure("get_weather", sign["get_weather"], iterations, bytes=size))
+
+    # headlines.py is only imported by code.py when ENABLE_HEADLINES is on
+    headlines = importlib.import_module("headlines")
+    wifi = sign["wifi"]
+    secrets = sign["secrets"]
+    for count in ARTICLE_COUNTS:
+        size = serve(simulation, r"gnews\.io", gnews_payload(count))
+        results.append(measure("fetch_articles", lambda: headlines.fetch_articles(wifi, secrets, "gnews", count),
+                               iterations, articles=count, bytes=size))
+        # what fetch_articles() did before: the whole response through response.json()
+        results.append(measure("fetch_articles_json", lambda: wifi.get("https://gnews.io/api/v4/top-headlines").json(),
+                               iterations, articles=count, bytes=size))
+    return results
+
+
+def bench_render(simulation, sign, iterations):
+    display = sign["display_manager"]
+    trains = sign["get_trains"]()
+    historical_trains = sign["historical_trains"]
+    weather_data = sign["weather_data"]
+    results = [
+        measure("update_trains", lambda: display.update_trains(trains, historical_trains), iterations),
+        measure("update_weather", lambda: display.update_weather(weather_data), iterations),
+        # scroll time is mostly scroll_delay sleeps, which the virtual clock skips, so this is the CPU cost
+        measure("scroll_text", lambda: display.scroll_text("Time is 08:00"), max(1, iterations // 10)),
+        measure("framebuffer_render", simulation.frame, max(1, iterations // 10)),
+    ]
+    try:
+        from sim import raster, runtime
+    except ImportError:
+        print("numpy not installed, skipping the numpy framebuffer backend")
+        return results
+    root_group = runtime.display.root_group
+    results.append(measure("framebuffer_render_numpy", lambda: raster.render(root_group), iterations))
+    return results
+
+
+def bench_logging(iterations):
+    """
+    Per-call cost of each log level at the sign's defaults (INFO kept, WARNING and up echoed) against
+    the print() it replaced, using the notification queue dump as the message.
+    """
+    logger = importlib.import_module("logger")
+    queue = ["Time is 08:00", "N123AB | 1200 ft | 2.0 mi", "Headline: " + "x" * 120]
+    log = logger.Logger()
+    # a dump on every error, the worst case; the default is at most one per 5 minutes
+    log.dump_interval = 0
+    log.listeners.append(lambda text: None)
+    calls = (
+        ("print_fstring", lambda: print(f"Notification Queue:\n{queue}")),
+        ("log_debug_dropped", lambda: log.debug("Notification queue: {}", queue)),
+        ("log_info_buffered", lambda: log.info("Notification queue: {}", queue)),
+        ("log_warning_echoed", lambda: log.warning("Notification queue: {}", queue)),
+        ("log_error_dumped", lambda: log.error("Notification queue: {}", queue)),
+    )
+    results = []
+    for name, call in calls:
+        serial = SerialCounter()
+        with contextlib.redirect_stdout(serial):
+            result = measure(name, call, iterations * 10)
+            before = serial.bytes
+            call()
+        result["params"]["serial_bytes"] = serial.bytes - before
+        results.append(result)
+    return results
+
+
+def bench_serial(loops):
+    """
+    Serial bytes written per Day mode loop with every record echoed (what print() did) and at the
+    default echo level.
+    """
+    logger = importlib.import_module("logger")
+    results = []
+    for name, echo_level in (("serial_echo_all", logger.DEBUG), ("serial_echo_warning", logger.WARNING)):
+        simulation = Simulation(duration=loops * 10 + 5)
+        serial = SerialCounter()
+        with simulation, contextlib.redirect_stdout(serial):
+            start_morning(simulation)
+            sign = simulation.load_code()
+            sign["log"].level = logger.DEBUG if echo_level == logger.DEBUG else logger.INFO
+            sign["log"].echo_level = echo_level
+            # count from the first loop, not the boot profile
+            serial.bytes = 0
+            start = time.perf_counter()
+            simulation.run()
+            elapsed = time.perf_counter() - start
+        results.append({
+            "name": name,
+            "params": {"loops": loops},
+            "iterations": loops,
+            "mean_us": round(elapsed / loops * 1e6, 2),
+            "min_us": None,
+            "peak_alloc_bytes": None,
+            "retained_blocks_per_call": None,
+            "serial_bytes_per_loop": round(serial.bytes / loops, 1),
+        })
+    return results
+
+
+def bench_loop(loops, trace=None):
+    """
+    Runs main() for `loops` Day mode loops and reports real time per loop.
+
+    Args:
+        loops (int): Number of loops.
+        trace (str, optional): Recorded trace served ahead of the fixtures.
+    """
+    fixtures = DEFAULT_FIXTURES
+    replay = None
+    if trace:
+        fixtures = ResponseTable().load(DEFAULT_FIXTURES)
+        # recorded latency would only move the virtual clock, so it is left out
+        replay = TraceReplay.from_file(trace, latency=0, loop=True)
+        replay.attach(fixtures)
+    # Day mode loops sleep 10 virtual seconds; scroll sleeps add a little on top
+    simulation = Simulation(duration=loops * 10 + 5, fixtures=fixtures)
+    with simulation:
+        start_morning(simulation)
+        sign = simulation.load_code()
+        counter = {"loops": 0}
+        get_current_time = sign["get_current_time"]
+
+        def counting_get_current_time():
+            counter["loops"] += 1
+            get_current_time()
+
+        sign["get_current_time"] = counting_get_current_time
+        start = time.perf_counter()
+        stats = simulation.run()
+        elapsed = time.perf_counter() - start
+    return [{
+        "name": "main_loop",
+        "params": {"loops": counter["loops"], "trace": os.path.basename(trace) if trace else None},
+        "iterations": counter["loops"],
+        "mean_us": round(elapsed / max(1, counter["loops"]) * 1e6, 2),
+        "min_us": None,
+        "peak_alloc_bytes": None,
+        "retained_blocks_per_call": None,
+        "requests": stats["requests"],
+        "replay": replay.stats() if replay is not None else None,
+    }]
+
+
+def bench_night(low_power=True):
+    """
+    Runs the sign from Friday 20:50 to Saturday 07:10 (closing at 21:00, opening at 07:00) and reports
+    the idle power proxies for the night and the wake-to-first-train latency. Every request costs
+    NIGHT_REQUEST_LATENCY virtual seconds and the first one after an ESP32 reset NIGHT_ESP_RESTART
+    more, so the latency reflects the requests and restart a wake needs rather than the simulator's speed.
+
+    Args:
+        low_power (bool, optional): Value of ENABLE_LOW_POWER_NIGHT. Defaults to True.
+    """
+    simulation = Simulation(duration=(10 * 60 + 20) * 60, latency=NIGHT_REQUEST_LATENCY,
+                            esp_restart=NIGHT_ESP_RESTART)
+    with simulation:
+        simulation.clock.start_epoch = time.mktime((2025, 10, 24, 20, 50, 0, 0, 0, -1))
+        sign = simulation.load_code()
+        sign["ENABLE_LOW_POWER_NIGHT"] = low_power
+        clock = simulation.clock
+        night = {}
+        night_sleep = sign["night_sleep"]
+
+        def measured_night_sleep(seconds):
+            night["requests_before"] = len(simulation.responses.log)
+            night["power_before"] = dict(simulation.power)
+            night["start"] = clock.elapsed
+            night_sleep(seconds)
+            night["woke"] = clock.elapsed
+            night["requests_while_closed"] = len(simulation.responses.log) - night["requests_before"]
+            night["power"] = {name: value - night["power_before"][name] for name, value in simulation.power.items()}
+            night["requests_at_wake"] = len(simulation.responses.log)
+
+        display = sign["display_manager"]
+        update_trains = display.update_trains
+
+        def measured_update_trains(trains, historical_trains):
+            update_trains(trains, historical_trains)
+            if "woke" in night and "first_train" not in night:
+                night["first_train"] = clock.elapsed
+                night["wake_requests"] = len(simulation.responses.log) - night["requests_at_wake"]
+
+        sign["night_sleep"] = measured_night_sleep
+        display.update_trains = measured_update_trains
+        start = time.perf_counter()
+        simulation.run()
+        elapsed = time.perf_counter() - start
+
+    closed_seconds = night["woke"] - night["start"]
+    power = night["power"]
+    return [{
+        "name": "night_mode",
+        "params": {"low_power": low_power, "request_latency": NIGHT_REQUEST_LATENCY,
+                   "esp_restart": NIGHT_ESP_RESTART},
+        "iterations": 1,
+        "mean_us": round(elapsed * 1e6, 2),
+        "min_us": None,
+        "peak_alloc_bytes": None,
+        "retained_blocks_per_call": None,
+        "closed_seconds": round(closed_seconds, 1),
+        "panel_on_fraction": round(power["panel_on_seconds"] / closed_seconds, 3),
+        "radio_on_fraction": round(power["radio_on_seconds"] / closed_seconds, 3),
+        "light_sleep_fraction": round(power["light_sleep_seconds"] / closed_seconds, 3),
+        "requests_while_closed": night["requests_while_closed"],
+        "wake_to_first_train_seconds": round(night["first_train"] - night["woke"], 3),
+        "wake_to_first_train_requests": night["wake_requests"],
+    }]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the sign's parsers, renderer and main loop.")
+    parser.add_argument("--quick", action="store_true", help="fewer iterations, for a smoke run")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", help="previous results file to compare against")
+    parser.add_argument("--trace", help="recorded trace to run the main loop against")
+    arguments = parser.parse_args()
+    iterations = 5 if arguments.quick else 50
+
+    results = []
+    simulation = Simulation()
+    with simulation:
+        start_morning(simulation)
+        sign = simulation.load_code()
+        sign["get_current_time"]()
+        results += bench_parsers(simulation, sign, iterations)
+        results += bench_render(simulation, sign, iterations)
+    results += bench_logging(iterations)
+    results += bench_serial(30 if arguments.quick else 360)
+    results += bench_loop(30 if arguments.quick else 360, arguments.trace)
+    results += bench_night(low_power=True)
+    results += bench_night(low_power=False)
+
+    for result in results:
+        if result["peak_alloc_bytes"] is not None:
+            print_result(result)
+        elif result["name"] == "night_mode":
+            print(f"{result['name']:<28} {json.dumps(result['params']):<18} "
+                  f"panel on {result['panel_on_fraction']:.0%}  radio on {result['radio_on_fraction']:.0%}  "
+                  f"light sleep {result['light_sleep_fraction']:.0%}  {result['requests_while_closed']} requests closed  "
+                  f"wake to first train {result['wake_to_first_train_seconds']} s / "
+                  f"{result['wake_to_first_train_requests']} requests")
+        elif "serial_bytes_per_loop" in result:
+            print(f"{result['name']:<28} {json.dumps(result['params']):<18} {result['mean_us']:>12.2f} us/loop"
+                  f"  {result['serial_bytes_per_loop']} serial B/loop")
+        else:
+            print(f"{result['name']:<28} {json.dumps(result['params']):<18} {result['mean_us']:>12.2f} us/loop")
+    path = save_results(results, arguments.output)
+    print(f"Results saved to {path}")
+    if arguments.compare:
+        compare(arguments.compare, results)
+    return results
+
+
+if __name__ == "__main__":
+    main()
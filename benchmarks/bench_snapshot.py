@@ -0,0 +1,98 @@
+# Benchmark: binary snapshot decode vs. JSON parse
+# Compares Snapshot.decode_into() against json.loads() on the same event + headline payload,
+# reporting time per decode and bytes allocated per decode.
+#
+# Usage (from the repo root):
+#   python benchmarks/bench_snapshot.py [iterations]
+
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from snapshot import Snapshot, encode_snapshot  # noqa: E402
+
+SAMPLE_TRAINS = [
+    {"destination": "Shady Grv", "minutes": "4"},
+    {"destination": "Glenmont", "minutes": "BRD"},
+]
+SAMPLE_WEATHER = {
+    "icon": "02d",
+    "current_temp": 71.6,
+    "current_feels_like": 70.9,
+    "daily_temp_min": 60.1,
+    "daily_temp_max": 78.4,
+    "hourly_next_temp": 73.0,
+    "hourly_feels_like": 72.2,
+}
+SAMPLE_EVENT = {"departure_time": 1760900400, "departure_train": "Shady Grove"}
+SAMPLE_HEADLINE = {
+    "source": "Associated Press",
+    "title": "Metro extends late-night service on weekends through the end of the year",
+    "hour": 9,
+    "minute": 41,
+}
+
+
+def json_payload():
+    return json.dumps({
+        "trains": SAMPLE_TRAINS,
+        "weather": SAMPLE_WEATHER,
+        "event": SAMPLE_EVENT,
+        "headline": SAMPLE_HEADLINE,
+    }).encode("utf-8")
+
+
+def measure(label, decode, iterations):
+    """Times `decode` over `iterations` calls and returns a result dict with time and allocations."""
+    decode()
+    gc.collect()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        decode()
+    elapsed = time.perf_counter() - start
+
+    gc.collect()
+    tracemalloc.start()
+    for _ in range(iterations):
+        decode()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "label": label,
+        "iterations": iterations,
+        "us_per_decode": round(elapsed / iterations * 1e6, 3),
+        "peak_bytes": peak,
+    }
+
+
+def main(iterations=20000):
+    payload = json_payload()
+    record = encode_snapshot(SAMPLE_TRAINS, SAMPLE_WEATHER, SAMPLE_EVENT, SAMPLE_HEADLINE, sequence=1)
+    target = Snapshot()
+
+    def decode_json():
+        return json.loads(payload)
+
+    def decode_snapshot():
+        # reset the sequence so every call does the full decode instead of the unchanged shortcut
+        target.sequence = None
+        return target.decode_into(record)
+
+    results = [
+        measure("json.loads", decode_json, iterations),
+        measure("Snapshot.decode_into", decode_snapshot, iterations),
+    ]
+    print(f"JSON payload: {len(payload)} bytes | Snapshot record: {len(record)} bytes")
+    for result in results:
+        print(f"{result['label']:>22}: {result['us_per_decode']:>8} us/decode | peak {result['peak_bytes']} bytes")
+    return results
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,159 @@
+# Bandwidth and latency of frame streaming (sim/stream.py) for a static board versus a scrolling
+# notification, against sending every frame raw.
+#
+# Frames come from display_manager on the host simulator: the static board is the Day mode
+# trains + weather screen held for 10 seconds, the scroll is one scroll_text() notification
+# captured at every scroll step. Each sequence is streamed at 30 fps over localhost UDP to a
+# receiver thread; latency is from send() to the receiver reconstructing the frame.
+#
+# Usage (from the repo root):
+#   python benchmarks/bench_stream.py [--output FILE] [--compare PREVIOUS.json]
+
+import argparse
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from harness import compare, save_results  # noqa: E402
+from sim import Simulation, runtime  # noqa: E402
+from sim.stream import FrameReceiver, FrameStreamer, frame_bytes  # noqa: E402
+
+FPS = 30
+STATIC_SECONDS = 10
+NOTIFICATION = "Next event: Nationals vs Mets 7:05 PM, leave by 6:20"
+
+
+def capture_frames():
+    """
+    Returns {"static": [...], "scrolling": [...]} lists of packed RGB888 frames from display_manager.
+    """
+    sequences = {}
+    with Simulation() as simulation:
+        sign = simulation.load_code()
+        display = sign["display_manager"]
+        train = sign["Train"]
+        display.update_trains([train("Shady Grv", "Shady Grove", "3"), train("Glenmont", "Glenmont", "12")],
+                              [None, None])
+        display.update_weather({"icon": "03d", "current_temp": 64, "daily_temp_min": 55,
+                                "daily_temp_max": 70, "hourly_next_temp": 68})
+        display.refresh_display()
+        sequences["static"] = [frame_bytes(simulation.frame())] * (STATIC_SECONDS * FPS)
+
+        scrolling = []
+        def capture(elapsed):
+            scrolling.append(frame_bytes(simulation.frame()))
+
+        simulation.clock.listeners.append(capture)
+        display.scroll_text(NOTIFICATION)
+        simulation.clock.listeners.remove(capture)
+        sequences["scrolling"] = scrolling
+        sequences["size"] = (runtime.display.width, runtime.display.height)
+    return sequences
+
+
+def stream(frames, width, height, keyframe_every=FPS * 2):
+    """
+    Streams frames to a receiver thread over localhost UDP, paced at FPS.
+
+    Returns:
+        dict: Bandwidth, encode/decode cost and latency figures.
+    """
+    receiver_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver_socket.bind(("127.0.0.1", 0))
+    receiver_socket.settimeout(1.0)
+    receiver = FrameReceiver()
+    received = {}
+    decode_time = [0.0]
+
+    def receive():
+        while True:
+            try:
+                packet = receiver_socket.recv(65535)
+            except socket.timeout:
+                return
+            start = time.perf_counter()
+            frame = receiver.feed(packet)
+            decode_time[0] += time.perf_counter() - start
+            if frame is not None:
+                received[receiver.last_complete] = time.perf_counter()
+
+    thread = threading.Thread(target=receive)
+    thread.start()
+    streamer = FrameStreamer([receiver_socket.getsockname()], width, height, keyframe_every=keyframe_every)
+    sent = {}
+    encode_time = 0.0
+    interval = 1.0 / FPS
+    next_frame = time.perf_counter()
+    for frame in frames:
+        sequence = streamer.sequence
+        start = time.perf_counter()
+        packets = streamer.packetize(frame)
+        encode_time += time.perf_counter() - start
+        sent[sequence] = time.perf_counter()
+        for packet in packets:
+            streamer.sock.sendto(packet, streamer.destinations[0])
+            streamer.bytes_sent += len(packet)
+            streamer.packets += 1
+        next_frame += interval
+        time.sleep(max(0.0, next_frame - time.perf_counter()))
+    thread.join()
+    receiver_socket.close()
+    streamer.sock.close()
+
+    latencies = sorted((received[sequence] - sent[sequence]) * 1e6 for sequence in received if sequence in sent)
+    count = len(frames)
+    return {
+        "frames": count,
+        "bytes_per_frame": round(streamer.bytes_sent / count, 1),
+        "packets_per_frame": round(streamer.packets / count, 2),
+        "kbit_per_second": round(streamer.bytes_sent * 8 / 1000 / (count / FPS), 1),
+        "raw_kbit_per_second": round(len(frames[0]) * FPS * 8 / 1000, 1),
+        "rows_per_frame": round(streamer.rows_sent / count, 1),
+        "encode_us": round(encode_time / count * 1e6, 1),
+        "decode_us": round(decode_time[0] / max(1, receiver.frames) * 1e6, 1),
+        "latency_p50_us": round(latencies[len(latencies) // 2], 1) if latencies else None,
+        "latency_p95_us": round(latencies[int(len(latencies) * 0.95)], 1) if latencies else None,
+        "frames_received": receiver.frames,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark delta-compressed frame streaming.")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", help="previous results file to compare against")
+    arguments = parser.parse_args()
+
+    sequences = capture_frames()
+    width, height = sequences.pop("size")
+    results = []
+    for name, frames in sequences.items():
+        figures = stream(frames, width, height)
+        print(f"{name:<10} {figures['frames']:>4} frames  {figures['bytes_per_frame']:>8} B/frame "
+              f"{figures['kbit_per_second']:>8} kbit/s (raw {figures['raw_kbit_per_second']})  "
+              f"encode {figures['encode_us']} us  decode {figures['decode_us']} us  "
+              f"latency p50 {figures['latency_p50_us']} us p95 {figures['latency_p95_us']} us")
+        results.append({
+            "name": "stream_" + name,
+            "params": {"fps": FPS},
+            "iterations": figures["frames"],
+            # per frame sender + receiver CPU time, the figure compared between runs
+            "mean_us": round(figures["encode_us"] + figures["decode_us"], 1),
+            "min_us": None,
+            "peak_alloc_bytes": None,
+            "retained_blocks_per_call": None,
+            "stream": figures,
+        })
+    path = save_results(results, arguments.output)
+    print(f"Results saved to {path}")
+    if arguments.compare:
+        compare(arguments.compare, results)
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# Shared helpers for the benchmark scripts: timing with allocation tracking, result files and
+# run-to-run comparison.
+
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+RESULTS_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def measure(name, function, iterations=100, warmup=1, **params):
+    """
+    Times `function` and tracks its allocations.
+
+    Timing runs `iterations` calls with tracemalloc off; a second pass with tracemalloc on records
+    the allocation peak and the blocks still alive afterwards, per call.
+
+    Args:
+        name (str): Benchmark name.
+        function (callable): Called with no arguments.
+        iterations (int, optional): Calls per pass. Defaults to 100.
+        warmup (int, optional): Untimed calls before measuring. Defaults to 1.
+        **params: Extra values recorded with the result (e.g. payload size).
+
+    Returns:
+        dict: name, params, iterations, mean/min time in microseconds, peak and retained allocations.
+    """
+    for _ in range(warmup):
+        function()
+    gc.collect()
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    blocks_before = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+    for _ in range(iterations):
+        function()
+    _, peak = tracemalloc.get_traced_memory()
+    blocks_after = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+    tracemalloc.stop()
+
+    return {
+        "name": name,
+        "params": params,
+        "iterations": iterations,
+        "mean_us": round(sum(timings) / len(timings) * 1e6, 2),
+        "min_us": round(min(timings) * 1e6, 2),
+        "peak_alloc_bytes": peak,
+        "retained_blocks_per_call": round((blocks_after - blocks_before) / iterations, 2),
+    }
+
+
+def print_result(result):
+    params = " ".join(f"{key}={value}" for key, value in result["params"].items())
+    print(f"{result['name']:<28} {params:<18} {result['mean_us']:>12.2f} us  (min {result['min_us']:.2f})"
+          f"  peak {result['peak_alloc_bytes']:>9} B  retained {result['retained_blocks_per_call']} blocks/call")
+
+
+def save_results(results, path=None):
+    """
+    Writes results with run metadata to JSON (default: benchmarks/results/<timestamp>.json).
+
+    Returns:
+        str: The file written.
+    """
+    if path is None:
+        os.makedirs(RESULTS_DIRECTORY, exist_ok=True)
+        path = os.path.join(RESULTS_DIRECTORY, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    document = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "results": results,
+    }
+    with open(path, "w") as results_file:
+        json.dump(document, results_file, indent=2)
+    return path
+
+
+def _key(result):
+    return result["name"], json.dumps(result["params"], sort_keys=True)
+
+
+def compare(baseline_path, results, threshold=1.2):
+    """
+    Prints the mean time ratio of each result against a previous results file and flags
+    regressions slower than `threshold` times the baseline.
+
+    Returns:
+        list: The (name, params, ratio) regressions.
+    """
+    with open(baseline_path) as baseline_file:
+        baseline = {_key(result): result for result in json.load(baseline_file)["results"]}
+    regressions = []
+    for result in results:
+        previous = baseline.get(_key(result))
+        if previous is None or not previous["mean_us"]:
+            continue
+        ratio = result["mean_us"] / previous["mean_us"]
+        flag = "  REGRESSION" if ratio > threshold else ""
+        print(f"{result['name']:<28} {json.dumps(result['params']):<24} x{ratio:.2f}{flag}")
+        if ratio > threshold:
+            regressions.append((result["name"], result["params"], ratio))
+    return regressions
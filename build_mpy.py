@@ -0,0 +1,115 @@
+# Builds the sign's CIRCUITPY drive contents with every module except code.py precompiled to
+# .mpy by mpy-cross, so the board loads bytecode instead of compiling source at boot.
+#
+# mpy-cross must match the CircuitPython major version on the board: download it from
+# https://adafruit-circuit-python.s3.amazonaws.com/index.html?prefix=bin/mpy-cross/ or
+# `pip install mpy-cross` for a matching release, and pass its path with --mpy-cross if it isn't
+# on PATH.
+#
+# Usage:
+#   python build_mpy.py                            # writes build/
+#   python build_mpy.py --device /Volumes/CIRCUITPY   # then copies build/ onto the board
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+
+ROOT_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+# modules that run on the sign; code.py stays source because CircuitPython only runs code.py
+DEVICE_MODULES = (
+    "display_manager.py",
+    "snapshot.py",
+    "telemetry.py",
+    "tracer.py",
+    "time_utils.py",
+    "schedule.py",
+    "quota.py",
+    "boot_profiler.py",
+    "logger.py",
+    "stage_watchdog.py",
+    "warm_boot.py",
+    "recorder.py",
+    "mqtt_manager.py",
+    "remote_control.py",
+    "planes.py",
+    "event_tracker.py",
+    "headlines.py",
+    "aio_feeds.py",
+)
+# copied as-is
+DEVICE_FILES = ("code.py", "schedule.json")
+DEVICE_DIRECTORIES = ("bdf", "bmp", "stations", "lib")
+
+
+def compile_module(mpy_cross, source, target):
+    result = subprocess.run([mpy_cross, "-o", target, source], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"mpy-cross failed for {source}:\n{result.stderr}")
+
+
+def build(output, mpy_cross):
+    """
+    Writes the device files to `output`.
+
+    Returns:
+        list: (file, source bytes, built bytes) for each module compiled.
+    """
+    if os.path.exists(output):
+        shutil.rmtree(output)
+    os.makedirs(output)
+    sizes = []
+    for module in DEVICE_MODULES:
+        source = os.path.join(ROOT_DIRECTORY, module)
+        target = os.path.join(output, module[:-3] + ".mpy")
+        compile_module(mpy_cross, source, target)
+        sizes.append((module, os.path.getsize(source), os.path.getsize(target)))
+    for name in DEVICE_FILES:
+        shutil.copy2(os.path.join(ROOT_DIRECTORY, name), os.path.join(output, name))
+    for directory in DEVICE_DIRECTORIES:
+        source = os.path.join(ROOT_DIRECTORY, directory)
+        if os.path.isdir(source):
+            shutil.copytree(source, os.path.join(output, directory))
+    return sizes
+
+
+def install(output, device):
+    """
+    Copies the build onto a mounted CIRCUITPY drive, removing .py copies of modules that are now .mpy
+    (CircuitPython prefers .py over .mpy when both exist).
+    """
+    for module in DEVICE_MODULES:
+        stale = os.path.join(device, module)
+        if os.path.exists(stale):
+            os.remove(stale)
+    for name in os.listdir(output):
+        source = os.path.join(output, name)
+        target = os.path.join(device, name)
+        if os.path.isdir(source):
+            shutil.copytree(source, target, dirs_exist_ok=True)
+        else:
+            shutil.copy2(source, target)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompile the sign's modules to .mpy.")
+    parser.add_argument("--output", default=os.path.join(ROOT_DIRECTORY, "build"), help="build directory")
+    parser.add_argument("--mpy-cross", default="mpy-cross", help="mpy-cross executable")
+    parser.add_argument("--device", help="mounted CIRCUITPY drive to copy the build to")
+    arguments = parser.parse_args()
+
+    if shutil.which(arguments.mpy_cross) is None and not os.path.exists(arguments.mpy_cross):
+        sys.exit(f"{arguments.mpy_cross} not found; install mpy-cross matching the board's CircuitPython version")
+    sizes = build(arguments.output, arguments.mpy_cross)
+    for module, source_size, built_size in sizes:
+        print(f"{module:<22} {source_size:>7} B source -> {built_size:>6} B mpy")
+    print(f"Built {len(sizes)} modules into {arguments.output}")
+    if arguments.device:
+        install(arguments.output, arguments.device)
+        print(f"Copied to {arguments.device}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,12 @@
  # type: ignore
-import board
 import gc
 import time
+
+from boot_profiler import BootProfiler
+
+boot_profiler = BootProfiler()
+
+import board
 import busio
 from digitalio import DigitalInOut
 import neopixel
@@ -12,22 +17,72 @@ from adafruit_esp32spi import adafruit_esp32spi
 from adafruit_esp32spi import adafruit_esp32spi_wifimanager
 
 import display_manager
+from telemetry import Telemetry, REPORT_MAX
+from tracer import Tracer
+from time_utils import format_time_struct, offset_minutes
+from schedule import Schedule, load_overrides, weekly_hours
+from quota import QuotaBudget
+from stage_watchdog import REQUEST_TIMEOUT, StageWatchdog
+import logger
 
-print(f"All imports loaded | Available memory: {gc.mem_free()} bytes")
+boot_profiler.mark("All imports loaded")
 
 # --- FUNCTIONS TOGGLES ---
 ENABLE_PLANES = False
 ENABLE_EVENTS = False
 ENABLE_HEADLINES = False
+# Receive trains and weather from fleet.py over MQTT instead of polling WMATA/OpenWeather
+ENABLE_MQTT = False
+# Apply start/end hours and commands from Adafruit IO feeds as they arrive over MQTT
+ENABLE_REMOTE_CONTROL = False
+# Record per-stage latency and heap deltas (see tracer.py); disabled tracing costs nothing
+ENABLE_TRACING = False
+# Append every upstream response to a trace file for replay with sim/replay.py (needs a writable filesystem)
+ENABLE_TRACE_RECORDING = False
+# Keep the last known trains/weather in NVM and show them right after a reset (see warm_boot.py)
+ENABLE_WARM_BOOT = True
+# Outside operating hours, blank the panels, hold the ESP32 in reset and light sleep until opening
+ENABLE_LOW_POWER_NIGHT = True
+# Reset the board when a loop stage overruns its deadline, recording the stage in NVM (see stage_watchdog.py)
+ENABLE_WATCHDOG = True
+
+# Optional subsystems are separate modules, imported only when enabled
+if ENABLE_PLANES:
+    import planes
+if ENABLE_EVENTS:
+    import event_tracker
+if ENABLE_HEADLINES:
+    import headlines
+if ENABLE_TRACE_RECORDING:
+    from recorder import TraceRecorder
+if ENABLE_WARM_BOOT:
+    from warm_boot import WarmBoot
+alarm = None
+if ENABLE_LOW_POWER_NIGHT:
+    try:
+        import alarm
+    except ImportError:
+        print("alarm module not available, night mode will sleep with time.sleep()")
+boot_profiler.mark("Optional modules loaded")
 
 # --- CONSTANTS SETUP ---
 
+tracer = Tracer(enabled=ENABLE_TRACING)
+
 try:
     from secrets import secrets
 except ImportError:
     print("Wifi + constants are kept in secrets.py, please add them there!")
     raise
 
+# Records at LOG_LEVEL and up are kept in a RAM ring buffer; only LOG_ECHO_LEVEL and up are printed
+# to serial, which is synchronous and slows the loop. Errors dump the buffer (see logger.py).
+LOG_LEVEL = logger.INFO
+LOG_ECHO_LEVEL = logger.WARNING
+log = logger.Logger(secrets.get('log capacity', 32), LOG_LEVEL, LOG_ECHO_LEVEL, secrets.get('log file'))
+# characters of a dump sent to the aio log feed
+LOG_REPORT_SIZE = 1024
+
 # Stores train data
 station_code = secrets["station code"]
 historical_trains = [None, None]
@@ -43,9 +98,15 @@ nearest_plane = None
 
 # Stores next event data
 next_event = None
+event_check_interval = secrets.get('event check interval', 60 * 5)
+# Counts down to the departure in Event mode on the local clock
+event_countdown = event_tracker.EventCountdown() if ENABLE_EVENTS else None
 
 # Stores most recent headline
 current_headline = None
+# Articles requested per news call; the fresh ones are shown one at a time until the next call
+HEADLINE_BATCH = 5
+headline_rotation = headlines.HeadlineRotation() if ENABLE_HEADLINES else None
 
 # Weather data dict
 weather_data = {}
@@ -62,10 +123,19 @@ current_temp = []
 current_time = None
 current_time_epoch = None
 timezone_offset = None
+# epoch and monotonic time of the last successful time sync
+time_synced_epoch = None
+time_synced_at = None
+# seconds between time sync attempts before the first sync, doubling after each failure
+TIME_SYNC_RETRY_DELAY = 5
+MAX_TIME_SYNC_RETRY_DELAY = 5 * 60
 
 # Default operating hour start and end times
 start_time = 6
 end_time = 21
+# Weekly operating hours built from start_time/end_time, with holiday and late-night overrides
+# from /schedule.json (see schedule.py)
+schedule = Schedule(weekly_hours(start_time, end_time), load_overrides("/schedule.json"))
 
 # Notification queue
 notification_queue = []
@@ -77,7 +147,11 @@ notification_queue = []
 # (https://www.adafruit.com/product/2278)
 matrix = Matrix(width=128, height=32, bit_depth=2, tile_rows=1)
 display_manager = display_manager.display_manager(matrix.display)
-print(f"Display loaded | Available memory: {gc.mem_free()} bytes")
+# Trace the render stages of the hot path
+tracer.wrap_method(display_manager, 'update_trains')
+tracer.wrap_method(display_manager, 'scroll_text')
+tracer.wrap_method(display_manager, 'refresh_display')
+boot_profiler.mark("Display loaded")
 
 # --- WIFI SETUP ---
 # Initialize ESP32 Pins:
@@ -91,10 +165,79 @@ esp = adafruit_esp32spi.ESP_SPIcontrol(spi, esp32_cs, esp32_ready, esp32_reset)
 status_light = neopixel.NeoPixel(board.NEOPIXEL, 1, brightness=0.2)
 # Initialize Wi-Fi object
 wifi = adafruit_esp32spi_wifimanager.ESPSPI_WiFiManager(esp, secrets, status_light, attempts=5)
-wifi.timeout = 20
+# a request must finish before the watchdog's hardware timeout, which nothing feeds during the call
+wifi.timeout = REQUEST_TIMEOUT if ENABLE_WATCHDOG else 20
+if ENABLE_TRACE_RECORDING:
+    wifi = TraceRecorder(wifi, secrets.get('trace file', '/trace.jsonl'))
 
 gc.collect()
-print(f"WiFi loaded | Available memory: {gc.mem_free()} bytes")
+boot_profiler.mark("WiFi loaded")
+
+# --- TELEMETRY SETUP ---
+# Diagnostics are aggregated every loop and flushed to the Adafruit IO group in one request
+telemetry = Telemetry(secrets['aio username'], secrets['aio key'], secrets.get('aio group', 'dc-metro-sign'))
+# seconds/minutes since the last check, worst case since the previous flush
+telemetry.register('train', secrets['aio train'], REPORT_MAX)
+telemetry.register('plane', secrets['aio plane'], REPORT_MAX)
+telemetry.register('event', secrets['aio event'], REPORT_MAX)
+telemetry.register('headline', secrets['aio headline'], REPORT_MAX)
+telemetry.register('loop counter', secrets['aio loop counter'])
+if ENABLE_TRACING and 'aio trace' in secrets:
+    # compact per-stage summary string from tracer.summary()
+    telemetry.register('trace', secrets['aio trace'])
+if 'aio quota' in secrets:
+    # remaining API budget string from budget.summary()
+    telemetry.register('quota', secrets['aio quota'])
+if 'aio log' in secrets:
+    # last log records before an error, sent with the next flush
+    telemetry.register('log', secrets['aio log'])
+    log.listeners.append(lambda text: telemetry.record('log', text[-LOG_REPORT_SIZE:]))
+if ENABLE_WATCHDOG and 'aio watchdog' in secrets:
+    # stage that overran before the last reset, sent once after boot
+    telemetry.register('watchdog', secrets['aio watchdog'])
+
+# --- API BUDGET SETUP ---
+# Daily quotas spread over the operating hours, usage kept in NVM after the warm boot record (see quota.py)
+# Intervals are the minimum between requests; spare budget refreshes trains faster while they arrive
+budget = QuotaBudget(schedule, microcontroller.nvm)
+budget.register('wmata', secrets.get('wmata daily quota', 50000), 15, fast_interval=10)
+budget.register('openweather', secrets.get('openweather daily quota', 1000), 60 * 10)
+budget.register('news', secrets.get('news daily quota', 100), 60 * 12)
+if budget.restore():
+    log.info("API budget restored: {}", ", ".join(f"{name} {budget.remaining(name)}" for name in budget.names))
+
+# --- WARM BOOT SETUP ---
+# Last known state in NVM, restored by main() before the first request
+warm_boot = WarmBoot(microcontroller.nvm) if ENABLE_WARM_BOOT else None
+
+# --- WATCHDOG SETUP ---
+# Per-stage deadlines on microcontroller.watchdog, started by main(); an overrun is recorded in NVM after the
+# quota record and resets the board. When disabled the stages are never started and cost one check each.
+if ENABLE_WATCHDOG:
+    stage_watchdog = StageWatchdog(getattr(microcontroller, 'watchdog', None), microcontroller.nvm, 640,
+                                   secrets.get('watchdog deadlines'))
+    stage_watchdog.restore()
+else:
+    stage_watchdog = StageWatchdog()
+
+# --- MQTT SETUP ---
+# Trains and weather pushed by fleet.py, applied by main()
+pushed_trains = None
+pushed_weather = None
+# WMATA is polled directly while the broker is unreachable, or when fleet.py has pushed no trains for this long
+MQTT_TRAIN_TIMEOUT = 5 * 60
+last_train_push = time.monotonic()
+
+mqtt = None
+if ENABLE_MQTT:
+    import json
+    from mqtt_manager import MQTTManager
+
+    mqtt = MQTTManager(esp, secrets)
+    boot_profiler.mark("MQTT loaded")
+
+# Remote control channel, created in main() once the handlers below are defined
+remote_control = None
 
 
 # --- CLASSES ---
@@ -116,63 +259,11 @@ class Train:
             raise KeyError(f"Invalid key: {key}")
 
 
-class Plane:
-    def __init__(self, flight, altitude, distance, emergency=None):
-        self.flight = flight
-        self.altitude = altitude
-        self.distance = distance
-        self.emergency = emergency
-
-    def __getitem__(self, key):
-        if key == 'flight':
-            return self.flight
-        elif key == 'altitude':
-            return self.altitude
-        elif key == 'distance':
-            return self.distance
-        elif key == 'emergency':
-            return self.emergency
-        else:
-            raise KeyError(f"Invalid key: {key}")
-
-    def get_plane_string(self):
-        return (f"Flight: {self.flight}\nAlt: {add_commas_to_number(str(self.altitude))}ft" +
-                f" | Dist: {self.distance}nmi")
-
-
-class Article:
-    def __init__(self, source, publishedTime, publishedAt, title):
-        self.source = source
-        self.publishedTime = publishedTime
-        self.publishedAt = publishedAt
-        self.title = title
-
-    def __repr__(self):
-        return ('Article(source=\'{self.source}\', title=\'{self.title}\', publishedTime=\'{self.publishedTime}\', '
-                'publishedAt=\'{self.publishedAt}\')').format(
-            self=self)
-
-    def __getitem__(self, key):
-        if key == 'source':
-            return self.source
-        elif key == 'publishedTime':
-            return self.publishedTime
-        elif key == 'publishedAt':
-            return self.publishedAt
-        elif key == 'title':
-            return self.title
-        else:
-            raise KeyError(f"Invalid key: {key}")
-
-    def get_headline_string(self):
-        headline_string = format_time_struct(self.publishedTime)
-        return f"{headline_string} | {self.source}\n{self.title}"
-
-
 # --- WEATHER API CALLS ---
 
 # queries Openweather API to return a dict with current and 3 hr forecast weather data
 # input is latitude and longitude coordinates for weather location
+@tracer.traced("get_weather")
 def get_weather():
     """
     Retrieves weather data from the OpenWeather API based on the provided latitude and longitude.
@@ -204,7 +295,7 @@ def get_weather():
         weather_json = response.json()
         del response
     except Exception as e:
-        print("Failed to get weather data from Openweather: {}".format(e))
+        log.error("Failed to get weather data from Openweather: {}", e)
         return False
 
     try:
@@ -222,59 +313,71 @@ def get_weather():
         # Clean up response
         del weather_json
 
-        # Set daily highest temperature
-        global highest_temp
-        if current_time:
-            # If daily highest temperature hasn't been set or is from a previous day
-            if highest_temp[0] is None or highest_temp[1] != current_time.tm_wday:
-                highest_temp[0] = weather_data["daily_temp_max"]
-                highest_temp[1] = current_time.tm_wday
-            # If stored highest temp is less than new highest temp
-            elif highest_temp[0] < weather_data["daily_temp_max"]:
-                highest_temp[0] = weather_data["daily_temp_max"]
-            # If stored highest temp is greater than new highest temp
-            elif highest_temp[0] > weather_data["daily_temp_max"]:
-                weather_data["daily_temp_max"] = highest_temp[0]
-
-            # Set daily lowest temperature
-            global lowest_temp
-            # If daily lowest temperature hasn't been set or is from a previous day
-            if lowest_temp[0] is None or lowest_temp[1] != current_time.tm_wday:
-                lowest_temp[0] = weather_data["daily_temp_min"]
-                lowest_temp[1] = current_time.tm_wday
-            # If daily lowest temp is greater than new lowest temp
-            elif lowest_temp[0] > weather_data["daily_temp_min"]:
-                lowest_temp[0] = weather_data["daily_temp_min"]
-            # If daily lowest temp is less than new lowest temp
-            elif lowest_temp[0] < weather_data["daily_temp_min"]:
-                weather_data["daily_temp_min"] = lowest_temp[0]
-
-        # If current time is not set and no value for highest or lowest temp, set them
-        elif highest_temp[0] is None:
-            highest_temp[0] = weather_data["daily_temp_max"]
-        elif lowest_temp[0] is None:
-            lowest_temp[0] = weather_data["daily_temp_min"]
-
-        # Highest and lowest temp set but no time found, get time on the next round
-        else:
-            pass
-
-        # add current temp to historical array
-        global current_temp
-        current_temp.append(weather_data["current_temp"])
+        track_daily_temps()
 
     except Exception as e:
-        print("Failed to get WEATHER data, retrying\n", e)
+        log.error("Failed to get WEATHER data, retrying: {}", e)
         wifi.reset()
         return False
 
     return True
 
 
+def track_daily_temps():
+    """
+    Updates the daily highest/lowest temperatures and the historical temperature array from weather_data.
+    Shared by get_weather() and the MQTT weather handler.
+    """
+    global weather_data
+    global current_time
+    global highest_temp
+    global lowest_temp
+    global current_temp
+
+    # Set daily highest temperature
+    if current_time:
+        # If daily highest temperature hasn't been set or is from a previous day
+        if highest_temp[0] is None or highest_temp[1] != current_time.tm_wday:
+            highest_temp[0] = weather_data["daily_temp_max"]
+            highest_temp[1] = current_time.tm_wday
+        # If stored highest temp is less than new highest temp
+        elif highest_temp[0] < weather_data["daily_temp_max"]:
+            highest_temp[0] = weather_data["daily_temp_max"]
+        # If stored highest temp is greater than new highest temp
+        elif highest_temp[0] > weather_data["daily_temp_max"]:
+            weather_data["daily_temp_max"] = highest_temp[0]
+
+        # Set daily lowest temperature
+        # If daily lowest temperature hasn't been set or is from a previous day
+        if lowest_temp[0] is None or lowest_temp[1] != current_time.tm_wday:
+            lowest_temp[0] = weather_data["daily_temp_min"]
+            lowest_temp[1] = current_time.tm_wday
+        # If daily lowest temp is greater than new lowest temp
+        elif lowest_temp[0] > weather_data["daily_temp_min"]:
+            lowest_temp[0] = weather_data["daily_temp_min"]
+        # If daily lowest temp is less than new lowest temp
+        elif lowest_temp[0] < weather_data["daily_temp_min"]:
+            weather_data["daily_temp_min"] = lowest_temp[0]
+
+    # If current time is not set and no value for highest or lowest temp, set them
+    elif highest_temp[0] is None:
+        highest_temp[0] = weather_data["daily_temp_max"]
+    elif lowest_temp[0] is None:
+        lowest_temp[0] = weather_data["daily_temp_min"]
+
+    # Highest and lowest temp set but no time found, get time on the next round
+    else:
+        pass
+
+    # add current temp to historical array
+    current_temp.append(weather_data["current_temp"])
+
+
 # --- METRO API CALLS ---
 
 # queries WMATA API to return an array of two Train objects
 # input is station code from secrets.py, and a historical_trains array
+@tracer.traced("get_trains")
 def get_trains():
     """
     Retrieves the train predictions for a specific station.
@@ -286,16 +389,31 @@ def get_trains():
     Raises:
         Exception: If there is an error retrieving the WMATA data.
     """
-    global station_code, current_station_index, train_order, historical_trains
+    global station_code, historical_trains
 
     try:
         response = wifi.get('https://api.wmata.com/StationPrediction.svc/json/GetPrediction/' + station_code, headers={'api_key': secrets['wmata api key']})
         json_data = response.json()
     except Exception as e:
-        print("Failed to get WMATA data, retrying\n", e)
+        log.error("Failed to get WMATA data, retrying: {}", e)
         wifi.reset()
         return historical_trains  # Return historical data if API call fails
 
+    return parse_trains(json_data)
+
+
+def parse_trains(json_data):
+    """
+    Selects the next eastbound and westbound train from a WMATA prediction payload.
+
+    Args:
+        json_data (dict): A GetPrediction response, or the per-station payload published by fleet.py.
+
+    Returns:
+        A list of two Train objects (east, west), falling back to historical_trains for missing directions.
+    """
+    global current_station_index, train_order, historical_trains
+
     east_train = None
     west_train = None
 
@@ -319,7 +437,7 @@ def get_trains():
                     if west_train is None:
                         west_train = Train(train['Destination'], train['DestinationName'], train['Min'])
             except ValueError:
-                print(f"Warning: Destination {train['Destination']} not found in train_order")
+                log.warning("Destination {} not found in train_order", train['Destination'])
                 continue
 
         if east_train is not None:
@@ -334,259 +452,126 @@ def get_trains():
         trains = [east_train, west_train]
 
     except Exception as e:
-        print(f"Error processing train data: {e}")
+        log.error("Error processing train data: {}", e)
         return historical_trains  # Return historical data in case of processing error
 
     return trains
 
 
 
-# --- PLANE API CALLS ---
-def get_nearest_plane(range=2.0):
+# --- MQTT HANDLERS ---
+def on_trains_message(topic, message):
     """
-    Retrieves the nearest plane within a given range by requesting plane.json from local ADS-B receiver (default
-    location for readsb)
-    Sample format: http://XXX.XXX.X.XXX/tar1090/data/aircraft.json
-
-    Args:
-        range (float, optional): The range within which to search for planes. Defaults to 2.0.
-
-    Returns:
-        None
+    Handles a retained per-station train payload from fleet.py.
     """
-    global nearest_plane
-    json_data = None
+    global pushed_trains
+    pushed_trains = parse_trains(json.loads(message))
 
-    try:
-        response = wifi.get(secrets['plane data json url'])
-        json_data = response.json()
-    except OSError as e:
-        print("Failed to get PLANE data, retrying\n", e)
-        wifi.reset()
-    except RuntimeError as e:
-        print("Failed to get PLANE data, retrying\n", e)
-        wifi.reset()
-    except Exception as e:
-        print("Failed to get PLANE data", e)
-        pass
-    gc.collect()
 
-    # If aircraft data exists
-    if json_data is not None and json_data["aircraft"] is not None:
-        try:
-            for entry in json_data["aircraft"]:
-                # Check if flight callsign and distance exists, check distance against range
-                if "flight" and "alt_geom" and "r_dst" in entry and float(entry["r_dst"]) <= range:
-                    entry_distance = round(float(entry["r_dst"]), 2)
-                    if nearest_plane is None or (
-                            nearest_plane is not None and nearest_plane.distance > entry_distance):
-                        try:
-                            nearest_plane = Plane(
-                                entry["flight"].strip(),
-                                entry["alt_geom"],
-                                float(entry_distance)
-                            )
-                            # print(nearest_plane.get_plane_string())
-                            # Separate emergency field as optional
-                            if "emergency" in entry:
-                                nearest_plane.emergency = entry["emergency"]
-                        except Exception as e:
-                            print(f"couldn't update nearest plane entry: {e}")
-                else:
-                    # print("Plane data didn't meet object criteria")
-                    pass
-        except Exception as e:
-            print("Failed to create PLANE object:", e)
-    else:
-        print("Failed to get PLANE data")
+def on_weather_message(topic, message):
+    """
+    Handles a retained weather payload from fleet.py (same keys as weather_data).
+    """
+    global pushed_weather
+    pushed_weather = json.loads(message)
 
 
-# --- EVENT API CALLS ---
-def get_next_event():
+def on_remote_setting(name, value):
     """
-    Retrieves the next scheduled event from the API.
+    Applies an operating hour setting received from the Adafruit IO control feeds.
+    """
+    global start_time
+    global end_time
+    if name == "start_time":
+        start_time = value
+    elif name == "end_time":
+        end_time = value
+    schedule.set_hours(weekly_hours(start_time, end_time))
+    log.info("Remote setting applied: {} = {}", name, value)
 
-    This function makes a request to the specified event data JSON URL
-    and retrieves the response. It then parses the JSON data to extract
-    the departure time and the departure train information of the next event.
-    Sample format: http://XXX.XXX.X.XXX/next_event.json
 
-    Returns:
-        dict or None: A dictionary containing the departure time and
-        departure train information of the next event if successful,
-        None otherwise.
+def on_remote_command(command):
     """
-    global next_event
-    try:
-        response = wifi.get(secrets['event data json url'])
-        json_data = response.json()
-        del response
-    except Exception as e:
-        print("Failed to get EVENT data: {}".format(e))
-        return None
-    if json_data is not None:
-        next_event = {}
-        try:
-            next_event['departure_time'] = json_data['departure_time']
-            next_event['departure_train'] = json_data['departure_train']
-            return next_event
-        except Exception as e:
-            print("Probably no events scheduled: {}".format(e))
-            return None
+    Runs a command received from the Adafruit IO command feed.
+    """
+    if command == "RESET":
+        log.warning("RESET command received, resetting")
+        log.dump(force=True)
+        save_warm_state(force=True)
+        budget.save(force=True)
+        microcontroller.reset()
     else:
-        return None
+        log.warning("Unknown remote command: {}", command)
 
 
-def event_mode_switch(departure_time, diff=60):
+# --- PLANE API CALLS ---
+def get_nearest_plane(range=2.0):
     """
-    Returns the mode to switch based on the departure time.
+    Updates nearest_plane with the closest plane within range from the local ADS-B receiver (see planes.py).
+    """
+    global nearest_plane
+    nearest_plane = planes.find_nearest_plane(wifi, secrets['plane data json url'], range, nearest_plane)
 
-    Parameters:
-    - departure_time (datetime): The departure time.
-    - diff (int, optional): The time difference in minutes. Default is 60.
+
+# --- EVENT API CALLS ---
+def get_next_event():
+    """
+    Retrieves the next scheduled event published by events.py (see event_tracker.py).
 
     Returns:
-    - str: The mode to switch based on the departure time. It can be either "Event" or "Day".
-    """
-    departure_diff = epoch_diff(departure_time)
-    # if departure time is within timeframe, switch mode to event
-    if 0 < departure_diff < diff:
-        print(f"Departure time: {departure_time} | Switching to EVENT mode")
-        return "Event"
-    # if departure time is 0 or less than 0, reset mode
-    else:
-        return "Day"
+        dict or None: The next event's departure time and departure train, or None.
+    """
+    global next_event
+    next_event = event_tracker.fetch_next_event(wifi, secrets, next_event)
+    return next_event
 
 
 # --- HEADLINE FUNCTIONS ---
-def get_headline(recent_only=True, recent_within=90, news_source="gnews", article_count=1):
+def get_headline(fetch, recent_only=True, recent_within=90, news_source="gnews", article_count=HEADLINE_BATCH):
     """
-    Generates a headline from a specified news source.
-
-    Args:
-        recent_only (bool, optional): Flag indicating if only recent headlines should be returned. Defaults to True.
-        recent_within (int, optional): The time window (in minutes) within which a headline is considered recent. Defaults to 90.
-        news_source (str, optional): The source of the news. Can be 'gnews', 'newsapi', or 'sample_data'. Defaults to "gnews".
-        article_count (int, optional): The number of articles to retrieve. Defaults to 1.
+    Returns the next headline to announce (see headlines.py). With fetch set, a new batch of articles is
+    requested first and its fresh, unseen ones are spread over the time until the next request.
 
     Returns:
-        Article or None: The generated headline as an Article object, or None if no headline is available.
+        Article or None: The headline, which also becomes current_headline, or None.
     """
     global current_headline
-    global current_time
-    global timezone_offset
-    article_list = []
-
-    # Make API call to specified news source
-    request_url = None
-    if news_source == 'newsapi':
-        # Query News API with input count
-        request_url = f'https://newsapi.org/v2/top-headlines?country=us&pageSize={article_count}'
-        headers = {'X-Api-Key': secrets['news api key']}
-    elif news_source == 'gnews':
-        # Query GNews API with input count
-        request_url = f'https://gnews.io/api/v4/top-headlines?category=general&lang=en&country=us&max={article_count}'
-        request_url += f'&apikey={secrets["gnews api key"]}'
-        headers = {}
-    elif news_source == 'sample_data':
-        # Add sample API output here for testing
-        pass
-
-    if request_url and news_source != 'sample_data':
-        try:
-            response = wifi.get(request_url, headers=headers)
-            if response.status_code == 200:
-                json_data = response.json()
-                del response
-            else:
-                print("Failed to retrieve NEWS data from endpoint: {}".format(response.status_code))
-                return None
-        except Exception as e:
-            print("Failed to retrieve NEWS data from endpoint: {}".format(e))
-            return None
-
-    # Iterate through json data to create list of Article objects
-    if json_data:
-        for item in json_data['articles']:
-            title = item['title'].split(' - ')[0].strip()
-            published_time = item['publishedAt'].split("T")[1].split(":")
-            published_time_hour = int(published_time[0])
-            published_time_minutes = int(published_time[1])
-
-            # Adjust the parsed_time using timezone_offset
-            # Convert timezone offset string to minutes
-            offset_hours = int(timezone_offset[:-2])
-            offset_minutes = int(timezone_offset[-2:])
-            offset_minutes_total = offset_hours * 60 + offset_minutes
-            local_time_hour = (published_time_hour + (offset_minutes_total // 60)) % 24
-
-            # Create local time struct
-            local_time_struct = time.struct_time(
-                current_time[:3] + (local_time_hour,) + (published_time_minutes,) + current_time[5:]
-            )
-
-            article_list.append(Article(
-                item['source']['name'],
-                local_time_struct,
-                item['publishedAt'],
-                title
-            )
-            )
-    if len(article_list) != 0:
-        new_headline = article_list.pop(0)
-
-        # Any headline and no current headline
-        if not recent_only and current_headline is None:
-            current_headline = new_headline
-            return current_headline
-        # Any headline and current headline is the same as new headline
-        elif not recent_only and current_headline is not None and current_headline.title == new_headline.title:
-            return None
-        # Recent headline only
-        elif recent_only is True:
-            # if new headline is more than recent_within minutes old, don't replace
-            local_time_epoch = time.mktime(local_time_struct)
-            if epoch_diff(local_time_epoch) > recent_within:
-                '''print(
-                    "DO NOT REPLACE: New headline is {} minutes old | Adjusted time: {}:{}".format(
-                        epoch_diff(local_time_epoch), local_time_struct.tm_hour, local_time_struct.tm_min,
-                    ))'''
-                return None
-            # If new headline is less than 60 minutes old and title is different, replace
-            elif current_headline is None or (
-                    current_headline is not None and current_headline.title != new_headline.title):
-                '''print(
-                    "REPLACE: New headline is {} minutes old | Adjusted time: {}:{}".format(
-                        epoch_diff(local_time_epoch), local_time_struct.tm_hour, local_time_struct.tm_min,
-                    ))'''
-                current_headline = new_headline
-                return current_headline
-            else:
-                return None
-
-    else:
-        print("No headlines found, Article list length is 0")
-        return None
+    now = time.monotonic()
+    if fetch:
+        json_data = headlines.fetch_articles(wifi, secrets, news_source, article_count)
+        if json_data is not None:
+            articles = headlines.parse_articles(json_data, current_time, offset_minutes(timezone_offset),
+                                                recent_within if recent_only else None)
+            del json_data
+            queued = headline_rotation.load(articles, budget.interval('news'), now)
+            log.info("Headlines: {} new of {}", queued, len(articles))
+    headline = headline_rotation.next(now)
+    if headline is not None:
+        current_headline = headline
+    return headline
 
 
 # --- TIME MGMT FUNCTIONS ---
 def get_current_time():
     """
     Retrieves the current time from Adafruit IO API and stores it in the global variables.
-    This function makes up to three API requests to Adafruit IO:
-    1. Get current time in epoch seconds.
-    2. Get current time as a struct.
-    3. Get timezone offset if it hasn't already been retrieved.
+    This function makes up to two API requests to Adafruit IO:
+    1. Get current time as a struct.
+    2. Get timezone offset if it hasn't already been retrieved.
+
+    If Adafruit IO can't be reached, the time keeps counting on the local clock from the last sync.
 
     Parameters:
         None
 
     Returns:
-        None
+        bool: True if the time was synced, False if it was not (current_time stays None until the first sync).
     """
     global current_time
     global current_time_epoch
     global timezone_offset
+    global time_synced_epoch
+    global time_synced_at
 
     base_url = "https://io.adafruit.com/api/v2/"
 
@@ -598,25 +583,37 @@ def get_current_time():
         json_response = response.text
         del response
     except Exception as e:
-        print("Failed to get Adafruit IO time struct: {}".format(e))
+        log.error("Failed to get Adafruit IO time struct: {}", e)
         wifi.reset()
         json_response = None
     if json_response is not None:
         # Extract values from the JSON
         data = eval(json_response)
         time_values = [int(data[key]) for key in ['year', 'mon', 'mday', 'hour', 'min', 'sec', 'wday', 'yday', 'isdst']]
+        # Adafruit IO counts wday from Sunday = 0, struct_time from Monday = 0
+        time_values[6] = (time_values[6] - 1) % 7
 
         # Create a current time struct
         current_time = time.struct_time(time_values)
+    elif time_synced_epoch is None:
+        # never synced: the caller retries
+        return False
     else:
-        get_current_time()
+        # keep counting from the last sync until Adafruit IO answers again
+        current_time_epoch = time_synced_epoch + int(time.monotonic() - time_synced_at)
+        current_time = time.localtime(current_time_epoch)
+        return False
 
     # Get current time in epoch seconds
     current_time_epoch = time.mktime(current_time)
+    time_synced_epoch = current_time_epoch
+    time_synced_at = time.monotonic()
 
     # Get timezone offset
 
     if timezone_offset is None:
+        # the watchdog isn't fed during a request, so feed it between the two
+        stage_watchdog.check()
         # Get timezone offset for timezone in secrets.py
         try:
             request_url = (base_url + secrets["aio username"] +
@@ -627,8 +624,9 @@ def get_current_time():
             timezone_offset = response.text
             del response
         except Exception as e:
-            print("Failed to get Adafruit IO timezone: {}".format(e))
+            log.error("Failed to get Adafruit IO timezone: {}", e)
             wifi.reset()
+    return True
 
 
 def epoch_diff(epoch_time):
@@ -640,130 +638,191 @@ def epoch_diff(epoch_time):
 
     Returns:
         int or None: The difference in minutes if the current time epoch is available, else None.
+        Negative if epoch_time has passed.
     """
     global current_time_epoch
     if current_time_epoch is not None:
-        difference = abs(epoch_time - current_time_epoch)
-        print(
-            f"Current time epoch: {current_time_epoch} | Event Epoch: {epoch_time} | Diff (sec): {difference} | Diff (min): {round(difference / 60)}")
-        return round(difference / 60)
+        return round((epoch_time - current_time_epoch) / 60)
     else:
         return None
 
 
-def check_open(start=start_time, end=end_time):
+# --- WARM BOOT FUNCTIONS ---
+def restore_warm_state():
     """
-    Check if the current time falls within the operating hours.
-
-    Parameters:
-        start (int, optional): The start time of the operating hours. Defaults to start_time.
-        end (int, optional): The end time of the operating hours. Defaults to end_time.
+    Shows the state saved in NVM before the network is up. Trains are restored as historical trains
+    (white minutes) and the current temperature is dimmed until fresh data replaces them.
 
     Returns:
-        bool: True if the current time falls within the operating hours, False otherwise.
+        bool: True if a saved state was restored.
     """
-    weekday = current_time.tm_wday
-    hour = current_time.tm_hour
+    global historical_trains
+    global weather_data
+    global highest_temp
+    global lowest_temp
+    global timezone_offset
+    global current_headline
 
-    # Within operating hours, current day is Sat/Sun
-    if hour < start + 1 and (weekday == 0 or weekday == 6):
-        print("Metro closed: Sat/Sun before 7| D{} H{}".format(weekday, hour))
+    if warm_boot is None:
         return False
-
-    # Within operating hours, current day is M-F
-    elif start <= hour < end:
-        return True
-
-    # Not in operating hours
-    else:
+    try:
+        if not warm_boot.restore():
+            return False
+        snapshot = warm_boot.snapshot
+        for index in range(2):
+            train = snapshot.train(index)
+            if train is not None:
+                historical_trains[index] = Train(train[0], None, train[1])
+        if historical_trains[0] is not None or historical_trains[1] is not None:
+            display_manager.update_trains([None, None], historical_trains)
+
+        if snapshot.fill_weather(weather_data):
+            display_manager.update_weather(weather_data)
+            display_manager.mark_weather_stale()
+        highest_temp = warm_boot.highest_temp
+        lowest_temp = warm_boot.lowest_temp
+        timezone_offset = warm_boot.timezone_offset
+
+        # the current headline is restored so it isn't announced again
+        if ENABLE_HEADLINES and snapshot.title_len:
+            published = time.localtime(warm_boot.saved_epoch)
+            current_headline = headlines.Article(
+                snapshot.text(snapshot.source, snapshot.source_len),
+                time.struct_time(published[:3] + (snapshot.published_hour, snapshot.published_minute) + published[5:]),
+                None,
+                snapshot.text(snapshot.title, snapshot.title_len),
+            )
+            headline_rotation.mark_seen(current_headline.title)
+    except Exception as e:
+        # a record that passes its CRC but can't be shown would fail the same way on every boot
+        log.error("Warm boot state unusable, starting cold: {}", e)
+        warm_boot.invalidate()
+        historical_trains = [None, None]
+        weather_data.clear()
+        highest_temp = [None, None]
+        lowest_temp = [None, None]
+        timezone_offset = None
+        current_headline = None
         return False
+    display_manager.refresh_display()
+    log.info("Warm boot state restored (saved {} times)", warm_boot.writes)
+    return True
 
 
-# --- ADAFRUIT IO FUNCTIONS ---
-
-def send_feed_data(feed_key, data):
+def expire_warm_state():
     """
-    Sends data to Adafruit IO.
-    Args:
-        feed_key:
-        data:
+    Drops restored values that are too old to trust once the current time is known.
+    """
+    global highest_temp
+    global lowest_temp
+    global timezone_offset
 
-    Returns:
+    if warm_boot.expired(current_time_epoch):
+        log.info("Warm boot state is more than a day old, dropping daily min/max and timezone")
+        highest_temp = [None, None]
+        lowest_temp = [None, None]
+        # refetched by the next get_current_time()
+        timezone_offset = None
 
+
+def save_warm_state(force=False):
+    """
+    Saves the current state to NVM (rate limited by WarmBoot.min_interval unless forced).
     """
-    request_url = f"https://io.adafruit.com/api/v2/{secrets['aio username']}/feeds/{feed_key}/data"
-    headers = {'X-AIO-Key': secrets['aio key']}
-    payload = {'value': data}
+    if warm_boot is None or warm_boot.stale:
+        return
+    headline = None
+    if current_headline is not None:
+        headline = {
+            'source': current_headline.source,
+            'title': current_headline.title,
+            'hour': current_headline.publishedTime.tm_hour,
+            'minute': current_headline.publishedTime.tm_min,
+        }
     try:
-        response = wifi.post(request_url, headers=headers, json=payload)
-        return response.status_code, response.json()
+        if warm_boot.save(historical_trains, weather_data, highest_temp, lowest_temp, timezone_offset, headline,
+                          current_time_epoch, force):
+            log.info("Warm boot state saved | NVM writes: {}", warm_boot.writes)
     except Exception as e:
-        print("Failed to send Adafruit IO data: {}".format(e))
-        return None
+        log.error("Warm boot save error: {}", e)
 
 
-def get_feed_data(feed_key, limit=1):
+# --- MISC. FUNCTIONS ---
+def sleep(seconds):
     """
-    Gets data from Adafruit IO.
-    Args:
-        feed_key:
-        limit:
-
-    Returns:
-        'status_code': The HTTP status code from the request
-        'response': The JSON data
+    Sleeps between loops. With remote control enabled, control messages are handled while waiting.
+    The watchdog is fed between steps of at most half its timeout.
     """
-    request_url = f"https://io.adafruit.com/api/v2/{secrets['aio username']}/feeds/{feed_key}/data?limit={limit}"
-    headers = {'X-AIO-Key': secrets['aio key']}
-    try:
-        response = wifi.get(request_url, headers=headers)
-        return response.status_code, response.json()
-    except Exception as e:
-        print("Failed to get Adafruit IO data: {}".format(e))
-        return 400, "{}"
+    with stage_watchdog.stage("sleep", seconds + 10):
+        while seconds > 0:
+            step = seconds if stage_watchdog.feed_interval is None else min(seconds, stage_watchdog.feed_interval)
+            if remote_control is not None:
+                remote_control.wait(step)
+            else:
+                time.sleep(step)
+            stage_watchdog.check()
+            seconds -= step
 
 
-# --- MISC. FUNCTIONS ---
-def send_notification(text):
-    display_manager.scroll_text(text)
+def night_sleep(seconds):
+    """
+    Sleeps through closed hours with the panels blanked. In low-power night mode the ESP32 is held in reset
+    and the CPU light sleeps on a time alarm; with remote control enabled the radio stays up to receive commands.
+    A new boot profiler times the wake to the first train on the display.
+    """
+    global boot_profiler
 
+    display_manager.blank(True)
+    if not ENABLE_LOW_POWER_NIGHT or remote_control is not None:
+        sleep(seconds)
+    else:
+        # the coprocessor draws more than the CPU; reset() below restarts it and WiFi reconnects on the next request
+        esp32_reset.value = False
+        # the watchdog can't be fed in light sleep; ports that can't stop it sleep in fed steps
+        if alarm is not None and stage_watchdog.suspend():
+            alarm.light_sleep_until_alarms(alarm.time.TimeAlarm(monotonic_time=time.monotonic() + seconds))
+            stage_watchdog.resume()
+        else:
+            sleep(seconds)
+        boot_profiler = BootProfiler("Woke from night mode", time.monotonic())
+        esp.reset()
+        boot_profiler.mark("ESP32 restarted")
+    display_manager.blank(False)
 
-def is_valid_integer(string):
-    try:
-        int(string)
-        return True
-    except ValueError:
-        return False
 
+def trains_arriving(trains):
+    """
+    Returns True if either train is boarding, arriving or at most 2 minutes out, when departures change quickly.
+    """
+    for train in trains:
+        if train is None:
+            continue
+        if train.minutes in ("ARR", "BRD") or (is_valid_integer(train.minutes) and int(train.minutes) <= 2):
+            return True
+    return False
 
-def add_commas_to_number(number_str):
-    reversed_number = "".join(reversed(number_str))
-    groups = [reversed_number[i:i + 3] for i in range(0, len(reversed_number), 3)]
-    formatted_number = ",".join("".join(reversed(group)) for group in reversed(groups))
 
-    return formatted_number
+def send_notification(text):
+    # about 0.2 s per character at the default scroll speed, fed as it scrolls
+    with stage_watchdog.stage("scroll", stage_watchdog.deadlines["scroll"] + len(text) // 2):
+        display_manager.scroll_text(text, tick=stage_watchdog.check)
 
 
-def format_time_struct(time_struct):
+def on_watchdog_overrun(stage_name, reason):
+    """
+    Keeps what the reset would lose: the log buffer, the warm boot state and the API budget.
     """
-    Format the given time struct to a 12-hour format.
+    log.dump(force=True)
+    save_warm_state(force=True)
+    budget.save(force=True)
 
-    Args:
-        time_struct (time.struct_time): The time struct to be formatted.
 
-    Returns:
-        str: The formatted time string in the format "HH:MMAM/PM".
-    """
-    if time_struct.tm_hour == 0:
-        hour = 12
-    elif time_struct.tm_hour > 12:
-        hour = time_struct.tm_hour % 12
-    else:
-        hour = time_struct.tm_hour
-    minute = "{:02d}".format(time_struct.tm_min)
-    # Calculate AM/PM suffix
-    suffix = "AM" if time_struct.tm_hour < 12 else "PM"
-    return f"{hour}:{minute} {suffix}"
+def is_valid_integer(string):
+    try:
+        int(string)
+        return True
+    except ValueError:
+        return False
 
 
 # --- OPERATING LOOP ------------------------------------------
@@ -772,23 +831,25 @@ def main():
     The main function that controls the execution of the program.
 
     This function initializes all the global variables and enters into an infinite loop.
-    Within the loop, it checks for a RESET command from the Adafruit IO feed and resets the microcontroller if necessary.
+    If remote control is enabled, start/end hours and the RESET command arrive over Adafruit IO MQTT and are
+    applied while the loop sleeps (see remote_control.py).
     It updates the current time and checks if the display should be in night mode based on the opening hours.
 
     If the display is in day mode, it fetches the weather data, updates the weather display, updates the train data,
     updates the plane data, updates the event data, and updates the top headline.
 
-    If the display is in event mode, it fetches the weather data, calculates the time until departure, and updates
-    the event display.
+    If the display is in event mode, it fetches the weather data and counts down to the departure on the local clock:
+    the event display is redrawn at each minute boundary and the sign returns to day mode at the departure instant,
+    with no time request until the next event check.
 
     It also handles the notification queue, refreshes the display, and performs garbage collection.
 
-    Every 5th loop iteration, or on the first iteration, it outputs local diagnostics and Adafruit IO diagnostics.
-    It checks for an updated start time from the Adafruit IO feed.
+    Every 25th loop iteration, or on the first iteration, it outputs local diagnostics and Adafruit IO diagnostics.
 
     It increments the loop counter and sleeps for a certain amount of time based on the mode.
     """
     global current_time
+    global current_time_epoch
     global start_time
     global end_time
     global weather_data
@@ -796,8 +857,41 @@ def main():
     global nearest_plane
     global next_event
     global current_headline
+    global pushed_trains
+    global pushed_weather
+    global last_train_push
+    global remote_control
+
+    if mqtt is not None:
+        mqtt.subscribe(mqtt.train_topic(station_code), on_trains_message)
+        mqtt.subscribe(mqtt.weather_topic(), on_weather_message)
+
+    if ENABLE_REMOTE_CONTROL:
+        from remote_control import RemoteControl
+        remote_control = RemoteControl(esp, secrets, on_remote_setting, on_remote_command)
+        remote_control.loop()
+
+    boot_profiler.mark("Main loop started")
+
+    # Show the last known state while WiFi connects and the fetchers catch up
+    warm_restored = restore_warm_state()
+    if warm_restored:
+        boot_profiler.mark("Warm boot state shown")
+
+    # Report the stage that stalled before the last reset, then supervise the loop
+    watchdog_report = stage_watchdog.report()
+    if watchdog_report is not None:
+        log.warning("Reset by the watchdog: {}", watchdog_report)
+        if 'aio watchdog' in secrets:
+            telemetry.record('watchdog', watchdog_report)
+    if ENABLE_WATCHDOG:
+        stage_watchdog.listeners.append(on_watchdog_overrun)
+        stage_watchdog.start()
 
     loop_counter = 1
+    # True after a night sleep until the time is synced again
+    woke = False
+    telemetry_due = False
     last_weather_check = None
     last_train_check = None
     last_plane_check = None
@@ -806,19 +900,56 @@ def main():
     mode = "Day"
 
     while True:
+        # Used to tell whether this tick updated trains
+        train_check_at_loop_start = last_train_check
 
-        # Update current time struct and epoch
-        get_current_time()
+        # Event check due this tick (the only network request Event mode needs besides weather)
+        event_check_due = ENABLE_EVENTS and (last_event_check is None or
+                                             time.monotonic() > last_event_check + event_check_interval)
 
-        # Check if display should be in night mode
+        # Update current time struct and epoch; between event checks Event mode reads the local clock
+        if mode == "Event" and event_countdown.active and not event_check_due:
+            current_time_epoch = event_countdown.now()
+            current_time = time.localtime(current_time_epoch)
+        else:
+            with stage_watchdog.stage("time sync"):
+                get_current_time()
+                # never synced yet (WiFi or Adafruit IO down at boot): retry with a growing delay. A finished
+                # attempt is progress, so an outage doesn't reset the board over and over; a hung one still does.
+                retry_delay = TIME_SYNC_RETRY_DELAY
+                while current_time is None:
+                    log.warning("Time not synced, retrying in {} s", retry_delay)
+                    waited = 0
+                    while waited < retry_delay:
+                        sleep_step = 5 if stage_watchdog.feed_interval is None else min(5, stage_watchdog.feed_interval)
+                        time.sleep(sleep_step)
+                        stage_watchdog.progress()
+                        waited += sleep_step
+                    get_current_time()
+                    stage_watchdog.progress()
+                    retry_delay = min(retry_delay * 2, MAX_TIME_SYNC_RETRY_DELAY)
+            if event_countdown is not None:
+                event_countdown.sync(current_time_epoch)
+        if loop_counter == 1 or woke:
+            boot_profiler.mark("Time synced")
+            woke = False
+        if warm_restored:
+            expire_warm_state()
+            warm_restored = False
+
+        # Check if display should be in night mode, once per loop
         try:
+            is_open = schedule.is_open(current_time)
+            # seconds until the sign next opens or closes
+            next_transition = schedule.next_transition(current_time)
+
             # Day mode: within operating hours and not in Event mode
-            if check_open() and mode != "Event":
+            if is_open and mode != "Event":
                 mode = "Day"
                 display_manager.night_mode_toggle(True)
 
             # Event mode: within operating hours and in Event mode
-            elif check_open() and mode == "Event":
+            elif is_open and mode == "Event":
                 pass
 
             # Night mode: outside operating hours
@@ -826,30 +957,60 @@ def main():
                 mode = "Night"
                 display_manager.night_mode_toggle(False)
         except Exception as e:
-            print("Exception: {}".format(e))
-            pass
-        gc.collect()
+            log.error("Schedule error: {}", e)
+            next_transition = None
+        budget.update(current_time, timezone_offset)
+        with tracer.span("gc.collect"):
+            gc.collect()
+
+        # --- MQTT ---
+        if mqtt is not None and mode != "Night":
+            # Service the client in Day and Event mode, so keepalives go out and a dropped session shows as
+            # disconnected, then apply what fleet.py pushed. Trains wait for Day mode.
+            mqtt.loop()
+            if pushed_weather is not None:
+                weather_data.update(pushed_weather)
+                track_daily_temps()
+                display_manager.update_weather(weather_data)
+                pushed_weather = None
+                last_weather_check = time.monotonic()
+            if mode == "Day" and pushed_trains is not None:
+                display_manager.update_trains(pushed_trains, historical_trains)
+                boot_profiler.finish("First train displayed")
+                pushed_trains = None
+                last_train_check = time.monotonic()
+                last_train_push = last_train_check
+            stage_watchdog.check()
 
         # --- DAY MODE ---
         if mode is "Day":
-            # Fetch weather data on start and recurring (default: 10 minutes)
-            if last_weather_check is None or time.monotonic() > last_weather_check + 60 * 10:
+            # Poll directly while nothing is pushed
+            poll_weather = mqtt is None or not mqtt.connected
+            poll_trains = poll_weather or time.monotonic() - last_train_push > MQTT_TRAIN_TIMEOUT
+
+            # Fetch weather data on start and recurring (budgeted, at least 10 minutes apart)
+            if poll_weather and budget.ready('openweather', last_weather_check):
                 try:
+                    budget.spend('openweather')
                     get_weather()
                     # Update weather display component
                     display_manager.update_weather(weather_data)
                     last_weather_check = time.monotonic()
                 except Exception as e:
-                    print(f"Weather error: {e}")
+                    log.error("Weather error: {}", e)
 
-            # Update train data (default: 15 seconds)
-            if last_train_check is None or time.monotonic() > last_train_check + 15:
+            # Update train data (budgeted, 15 seconds apart or 10 while trains are arriving)
+            if poll_trains and budget.ready('wmata', last_train_check, fast=trains_arriving(historical_trains)):
                 try:
-                    trains = get_trains()
+                    budget.spend('wmata')
+                    with stage_watchdog.stage("train fetch"):
+                        trains = get_trains()
                     # Update train display component
-                    display_manager.update_trains(trains, historical_trains)
+                    with stage_watchdog.stage("render"):
+                        display_manager.update_trains(trains, historical_trains)
+                    boot_profiler.finish("First train displayed")
                 except Exception as e:
-                    print(f"Train error: {e}")
+                    log.error("Train error: {}", e)
                 last_train_check = time.monotonic()
 
             # Update plane data (default: 5 minutes)
@@ -858,35 +1019,45 @@ def main():
                     get_nearest_plane()
                     last_plane_check = time.monotonic()
                 except Exception as e:
-                    print(f"Plane error: {e}")
+                    log.error("Plane error: {}", e)
                 # Push plane to notification queue if within 2 miles
                 if nearest_plane is not None:
                     notification_queue.append(nearest_plane.get_plane_string())
                     nearest_plane = None
+                stage_watchdog.check()
 
-            # Update event data (default: 5 minutes)
-            if ENABLE_EVENTS and (last_event_check is None or time.monotonic() > last_event_check + 60 * 5):
+            # Update event data (default: 5 minutes; unchanged files cost a 304, so file_server.py setups can check often)
+            if event_check_due:
                 try:
                     # Check for event departure
                     next_event = get_next_event()
                     last_event_check = time.monotonic()
                     if next_event is not None:
-                        print("next event: {}".format(next_event))
+                        log.info("next event: {}", next_event)
                         # Switch to event mode if time is within an hour
-                        mode = event_mode_switch(next_event['departure_time'])
+                        mode = event_tracker.event_mode_switch(epoch_diff(next_event['departure_time']))
+                        if mode == "Event":
+                            event_countdown.start(next_event)
                     else:
-                        print("no event found.")
+                        log.debug("no event found.")
                 except Exception as e:
-                    print(f"Event error: {e}")
-
-            # Update top headline (default: 12 minutes)
-            if ENABLE_HEADLINES and (last_headline_check is None or time.monotonic() > last_headline_check + 60 * 12):
+                    log.error("Event error: {}", e)
+                # checked; Event mode below starts from this event without checking again
+                event_check_due = False
+                stage_watchdog.check()
+
+            # Update top headline: a new batch once the last one has been shown (budgeted, at least 12 minutes
+            # apart), otherwise the next queued headline when it is due
+            fetch = ENABLE_HEADLINES and not headline_rotation.queue and budget.ready('news', last_headline_check)
+            if fetch or (ENABLE_HEADLINES and headline_rotation.due(time.monotonic())):
+                if fetch:
+                    budget.spend('news')
+                    last_headline_check = time.monotonic()
                 global current_headline
-                # Check for a new headline
                 try:
-                    headline = get_headline()
+                    headline = get_headline(fetch)
                 except Exception as e:
-                    print(f"Headline retrieval error: {e}")
+                    log.error("Headline retrieval error: {}", e)
                     headline = None
 
                 # If a new headline exists, push it to the notification queue
@@ -894,11 +1065,10 @@ def main():
                     try:
                         notification_queue.append(headline.get_headline_string())
                     except Exception as e:
-                        print(f"Headline notification error: {e}")
+                        log.error("Headline notification error: {}", e)
                 # No / No new headline
                 else:
                     pass
-                last_headline_check = time.monotonic()
 
             # Push current time to the top of the notification queue at the top of the hour
             if current_time.tm_min == 0 and current_time.tm_sec <= 15:
@@ -906,116 +1076,140 @@ def main():
 
         # --- EVENT MODE ---
         if mode is "Event":
-            # Fetch weather data on start and recurring (default: 10 minutes)
-            if last_weather_check is None or time.monotonic() > last_weather_check + 60 * 10:
-                weather = get_weather(weather_data)
-                if weather:
-                    last_weather_check = time.monotonic()
+            # Fetch weather data on start and recurring (budgeted, at least 10 minutes apart)
+            if (mqtt is None or not mqtt.connected) and budget.ready('openweather', last_weather_check):
+                try:
+                    budget.spend('openweather')
+                    get_weather()
                     # Update weather display component
                     display_manager.update_weather(weather_data)
+                    last_weather_check = time.monotonic()
+                except Exception as e:
+                    log.error("Weather error: {}", e)
+                stage_watchdog.check()
 
-            # Calculate time until departure
-            if next_event is not None:
-                departure_countdown = epoch_diff(next_event['departure_time'])
-                print("Current time: {}:{} | Departure countdown: {}".format(
-                    current_time.tm_hour, current_time.tm_min, departure_countdown)
-                )
-                if departure_countdown >= 1:
+            # Refresh the event: a moved departure restarts the countdown, a cancelled one ends Event mode
+            if event_check_due:
+                try:
+                    next_event = get_next_event()
+                    last_event_check = time.monotonic()
+                    if next_event is None:
+                        event_countdown.stop()
+                    elif next_event['departure_time'] != event_countdown.departure_time:
+                        event_countdown.start(next_event)
+                except Exception as e:
+                    log.error("Event error: {}", e)
+
+            # Count down to departure, redrawing only when the minute changes
+            departure_countdown = event_countdown.minutes_left() if event_countdown.active else 0
+            if departure_countdown >= 1:
+                if departure_countdown != event_countdown.shown:
+                    log.info("Departure in {} minutes", departure_countdown)
                     # update display with headsign/station and time to departure
-                    display_manager.update_event(departure_countdown, next_event['departure_train'])
-                # If departure time has passed, switch back to day mode
-                else:
-                    next_event = None
-                    mode = "Day"
-            # If next_event is None, switch back to day mode
+                    display_manager.update_event(event_countdown.departure_train, departure_countdown)
+                    event_countdown.shown = departure_countdown
+            # If departure time has passed or the event is gone, switch back to day mode
             else:
+                event_countdown.stop()
+                next_event = None
                 mode = "Day"
 
         # NOTIFICATION QUEUE HANDLER
         if loop_counter > 1 and len(notification_queue) > 0:
-            print(f"Notification Queue:\n{notification_queue}")
+            log.debug("Notification queue: {}", notification_queue)
             try:
                 send_notification(notification_queue.pop(0))
             except Exception as e:
-                print(f"Notification Error: {e}")
+                log.error("Notification error: {}", e)
 
         # Refresh display
-        display_manager.refresh_display()
+        with stage_watchdog.stage("render"):
+            display_manager.refresh_display()
 
         # Output diagnostics loop
         if loop_counter % 25 == 0 or loop_counter == 1:
             try:
-                # Output current time
-                time_info = format_time_struct(current_time)
-                print(f"Current time: {time_info} | Weekday: {current_time.tm_wday}")
-                # Output local diagnostics
-                print(f"Loop {loop_counter} | {mode} Mode | Available memory: {gc.mem_free()} bytes")
+                # the arguments cost allocations, so skip building them when INFO is dropped
+                if log.enabled(logger.INFO):
+                    # Output current time
+                    time_info = format_time_struct(current_time)
+                    log.info("Current time: {} | Weekday: {}", time_info, current_time.tm_wday)
+                    # Output local diagnostics
+                    log.info("Loop {} | {} Mode | Available memory: {} bytes", loop_counter, mode, gc.mem_free())
+                    log.info("API budget: {}", budget.summary())
             except Exception as e:
-                print(f"Time/Loop Calculation Error: {e}")
-
+                log.error("Time/Loop Calculation Error: {}", e)
+
+            # Adafruit IO diagnostics go out with the next telemetry flush
+            telemetry_due = True
+
+        # Record Adafruit IO diagnostics (no I/O, aggregated until the next flush)
+        now = time.monotonic()
+        if last_train_check is not None:
+            telemetry.record('train', now - last_train_check)
+        if last_plane_check is not None:
+            telemetry.record('plane', (now - last_plane_check) / 60)
+        if last_event_check is not None:
+            telemetry.record('event', (now - last_event_check) / 60)
+        if last_headline_check is not None:
+            telemetry.record('headline', (now - last_headline_check) / 60)
+        telemetry.record('loop counter', loop_counter)
+
+        # Flush telemetry in one request, never in the same tick as a train update
+        train_tick = last_train_check != train_check_at_loop_start
+        if telemetry_due and not train_tick:
+            telemetry.record('quota', budget.summary())
+            if ENABLE_TRACING:
+                trace_summary = tracer.summary()
+                log.info("Trace: {}", trace_summary)
+                telemetry.record('trace', trace_summary)
+                tracer.reset()
             try:
-                # Output Adafruit IO diagnostics
-                if last_train_check is not None:
-                    check_diff_seconds = time.monotonic() - last_train_check
-                    response = send_feed_data(secrets['aio train'], check_diff_seconds)
-                    if response is not None and response[0] != 200:
-                        print(f"Last Train Check: {response[1]}")
-                if last_plane_check is not None:
-                    check_diff_seconds = time.monotonic() - last_plane_check
-                    response = send_feed_data(secrets['aio plane'], check_diff_seconds / 60)
-                    if response is not None and response[0] != 200:
-                        print(f"Nearest Plane: {response[1]}")
-                if last_event_check is not None:
-                    check_diff_seconds = time.monotonic() - last_event_check
-                    response = send_feed_data(secrets['aio event'], check_diff_seconds / 60)
-                    if response is not None and response[0] != 200:
-                        print(f"Last Event Check: {response[1]}")
-                if last_headline_check is not None:
-                    check_diff_seconds = time.monotonic() - last_headline_check
-                    response = send_feed_data(secrets['aio headline'], check_diff_seconds / 60)
-                    if response is not None and response[0] != 200:
-                        print(f"Headline: {response[1]}")
-                response = send_feed_data(secrets['aio loop counter'], loop_counter)
-                if response is not None and response[0] != 200:
-                    print(f"Loop Counter: {response[1]}")
+                telemetry.flush(wifi, mqtt=remote_control.mqtt if remote_control is not None else None)
             except Exception as e:
-                print(f"Adafruit IO Error: {e}")
+                log.error("Adafruit IO Error: {}", e)
+            telemetry_due = False
+
+        # Restored state counts as refreshed once trains and weather have been fetched
+        if warm_boot is not None:
+            if warm_boot.stale and last_train_check is not None and last_weather_check is not None:
+                warm_boot.stale = False
+            save_warm_state()
+        budget.save()
 
         # Run garbage collection
-        gc.collect()
+        with tracer.span("gc.collect"):
+            gc.collect()
 
         # Increment loop and sleep
         # Day mode: 10 seconds
-        # Event mode: 50 seconds
+        # Event mode: until the countdown's next minute boundary, or the departure itself
+        # Day and Event mode wake at closing time rather than fetching past it
         loop_counter += 1
         if mode == "Day":
-            time.sleep(10)
+            sleep(10 if next_transition is None else max(1, min(10, next_transition)))
         elif mode == "Event":
-            time.sleep(50)
+            time_to_sleep = event_countdown.seconds_to_change()
+            if next_transition is not None:
+                time_to_sleep = min(time_to_sleep, max(1, next_transition))
+            sleep(time_to_sleep)
         # Night mode
         else:
-            # Calculate the time until the next start_time
-            current_minutes = current_time.tm_hour * 60 + current_time.tm_min
-            start_minutes = start_time * 60
-
-            if 6 * 60 <= current_minutes < 7 * 60 + 5:
-                # WEEKEND HANDLER: If current time is between 6:00 AM and 7:05 AM, add a buffer of 5 minutes
-                time_to_sleep = 5
-                print(
-                    f"Current time: {current_time.tm_hour:02}:{current_time.tm_min:02} | Start Time: {start_time}:00 | Sleeping for {time_to_sleep:02}:{00}")
-            elif current_minutes < start_minutes:
-                # If current time is before the start_time, sleep until start_time
-                time_to_sleep = start_minutes - current_minutes
-                print(
-                    f"Current time: {current_time.tm_hour:02}:{current_time.tm_min:02} | Start Time: {start_time}:00 | Sleeping for {time_to_sleep // 60:02}:{time_to_sleep % 60:02}")
-            else:
-                # If current time is after the end_time, sleep until start_time of the next day
-                time_to_sleep = (24 * 60) - current_minutes + start_minutes
-                print(
-                    f"Current time: {current_time.tm_hour:02}:{current_time.tm_min:02} | Start Time: {start_time}:00 | Sleeping for {time_to_sleep // 60:02}:{time_to_sleep % 60:02}")
-
-            time.sleep(time_to_sleep * 60)
-
+            # Sleep until the schedule opens again
+            time_to_sleep = next_transition
+            if not time_to_sleep:
+                # never opens, or just opened: check again later
+                time_to_sleep = 60 * 60 if time_to_sleep is None else 60
+            log.info("Current time: {:02}:{:02} | Opens in {:02}:{:02} | Sleeping", current_time.tm_hour,
+                     current_time.tm_min, time_to_sleep // 3600, time_to_sleep // 60 % 60)
+            night_sleep(time_to_sleep)
+            woke = True
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    try:
+        main()
+    except Exception as e:
+        if not ENABLE_WATCHDOG:
+            raise
+        # record the crash and reset rather than halt with a frozen display
+        stage_watchdog.fail(e)
\ No newline at end of file
@@ -20,6 +20,9 @@ metro_orange = 0xf06a37
 metro_red = 0xda1b30
 metro_green = 0x49742a
 
+# current temperature color while it shows a restored (warm boot) value
+stale_gray = 0x606060
+
 # custom scroll delay for scroll_text
 scroll_delay = 0.03
 
@@ -208,6 +211,7 @@ class display_manager(displayio.Group):
 
             # set the temperature
             self.temp_text.text = "%d" % weather["current_temp"]
+            self.temp_text.color = 0xFFFFFF
             self.min_temp_text.text = "%d" % weather["daily_temp_min"]
             self.max_temp_text.text = "%d" % weather["daily_temp_max"]
 
@@ -235,6 +239,10 @@ class display_manager(displayio.Group):
         else:
             self.temp_text.text = "..."
 
+    # dim the current temperature until fresh weather replaces a restored value
+    def mark_weather_stale(self):
+        self.temp_text.color = stale_gray
+
     # update train destination text and time to arrival
     # input is a list of train objects
     # TODO abstract default and error handling to support any station
@@ -286,7 +294,7 @@ class display_manager(displayio.Group):
 
     def update_event(self, station, departure_countdown):
         # station is Shady Grove
-        if "shady" in station:
+        if "shady" in station.lower():
             self.top_row_train_text.text = "Shady Grv"
         # station is Glenmont
         else:
@@ -321,17 +329,24 @@ class display_manager(displayio.Group):
             self._train_board_group.hidden = True
             self._night_mode_group.hidden = False
 
+    # turn the panels off (or back on) for low-power night mode; the matrix stops driving the LEDs at brightness 0
+    def blank(self, trigger):
+        self.display.brightness = 0 if trigger else 1
+
     # use \n newline to access bottom row
-    def scroll_text(self, label_text):
+    def scroll_text(self, label_text, tick=None):
+        # tick, if given, is called about once a second while scrolling (code.py feeds the watchdog with it)
         self._scrolling_group.x = self.display.width
         self.scrolling_label.text = label_text
         self._weather_group.hidden = True
         self._train_board_group.hidden = True
         self._scrolling_group.hidden = False
 
-        for _ in range(self.display.width + len(label_text) * 5):
+        for step in range(self.display.width + len(label_text) * 5):
             self._scrolling_group.x = self._scrolling_group.x - 1
             time.sleep(scroll_delay)
+            if tick is not None and step % 32 == 31:
+                tick()
         self._scrolling_group.hidden = True
         self._weather_group.hidden = False
         self._train_board_group.hidden = False
@@ -0,0 +1,223 @@
+# Event Tracker
+# Next scheduled departure published by events.py, as next_event.json or the binary
+# next_event.bin snapshot. Imported by code.py only when ENABLE_EVENTS is on.
+#
+# Requests are conditional: the ETag of the last response is sent back as If-None-Match, and a
+# 304 Not Modified keeps the current event without reading or parsing a body.
+#
+# In Event mode, EventCountdown counts down to the departure on the board's own clock, so the
+# display changes exactly at each minute boundary and at the departure itself without a time
+# request in between.
+
+import time
+
+from snapshot import Snapshot, SECTION_EVENT, SNAPSHOT_SIZE
+
+try:
+    _monotonic_ns = time.monotonic_ns
+except AttributeError:
+    def _monotonic_ns():
+        return int(time.monotonic() * 1000000000)
+
+# Preallocated decode target for binary snapshots (see snapshot.py)
+event_snapshot = Snapshot()
+
+# ETag of the last event response, sent back as If-None-Match
+event_etag = None
+
+
+def response_etag(response):
+    # adafruit_requests keeps header names as the server sent them
+    headers = response.headers
+    return headers.get('etag') or headers.get('ETag')
+
+
+def conditional_get(wifi, url):
+    """
+    Requests url with If-None-Match set to the last event ETag.
+
+    Returns:
+        Response or None: The response, or None if the server answered 304 Not Modified.
+    """
+    global event_etag
+    headers = {'If-None-Match': event_etag} if event_etag else {}
+    response = wifi.get(url, headers=headers)
+    if response.status_code == 304:
+        response.close()
+        return None
+    if response.status_code == 200:
+        event_etag = response_etag(response)
+    return response
+
+
+def fetch_next_event(wifi, secrets, next_event=None):
+    """
+    Retrieves the next scheduled event from the API.
+
+    This function makes a request to the specified event data JSON URL
+    and retrieves the response. It then parses the JSON data to extract
+    the departure time and the departure train information of the next event.
+    Sample format: http://XXX.XXX.X.XXX/next_event.json
+
+    Args:
+        wifi (ESPSPI_WiFiManager): WiFi manager to request with.
+        secrets (dict): Holds 'event data json url' or 'event data snapshot url'.
+        next_event (dict, optional): The current event, kept when the published file is unchanged.
+
+    Returns:
+        dict or None: A dictionary containing the departure time and
+        departure train information of the next event if successful,
+        None otherwise.
+    """
+    global event_etag
+    # Prefer the binary snapshot published next to next_event.json when configured
+    if 'event data snapshot url' in secrets:
+        return fetch_next_event_snapshot(wifi, secrets['event data snapshot url'], next_event)
+    try:
+        response = conditional_get(wifi, secrets['event data json url'])
+        if response is None:
+            return next_event
+        json_data = response.json()
+        del response
+    except Exception as e:
+        print("Failed to get EVENT data: {}".format(e))
+        # fetch the whole file again next time
+        event_etag = None
+        return None
+    if json_data is not None:
+        try:
+            return {
+                'departure_time': json_data['departure_time'],
+                'departure_train': json_data['departure_train'],
+            }
+        except Exception as e:
+            print("Probably no events scheduled: {}".format(e))
+            return None
+    else:
+        return None
+
+
+def fetch_next_event_snapshot(wifi, url, next_event=None):
+    """
+    Retrieves the next scheduled event from the binary snapshot (next_event.bin) written by events.py.
+
+    The response body is copied straight into the preallocated event_snapshot buffer, so no
+    JSON dict or intermediate strings are built unless the event actually changed.
+
+    Returns:
+        dict or None: The next event dict, or None if no event is scheduled.
+    """
+    global event_etag
+    try:
+        response = conditional_get(wifi, url)
+        if response is None:
+            return next_event
+        size = event_snapshot.read_response(response)
+        del response
+    except Exception as e:
+        print("Failed to get EVENT snapshot: {}".format(e))
+        event_etag = None
+        return None
+    if size < SNAPSHOT_SIZE:
+        # Short or truncated body: don't decode it over the last snapshot, and fetch it in full next time
+        print("Short EVENT snapshot: {} of {} bytes".format(size, SNAPSHOT_SIZE))
+        event_etag = None
+        return next_event
+    # Unchanged or invalid snapshot: keep the current event
+    if not event_snapshot.decode_into(length=size):
+        return next_event
+    if not event_snapshot.has(SECTION_EVENT):
+        return None
+    return {
+        'departure_time': event_snapshot.departure_time,
+        'departure_train': Snapshot.text(event_snapshot.departure_train, event_snapshot.departure_train_len)
+    }
+
+
+def event_mode_switch(departure_diff, diff=60):
+    """
+    Returns the mode to switch based on the time until departure.
+
+    Parameters:
+    - departure_diff (int): Minutes until the departure time.
+    - diff (int, optional): The time difference in minutes. Default is 60.
+
+    Returns:
+    - str: The mode to switch based on the departure time. It can be either "Event" or "Day".
+    """
+    # if departure time is within timeframe, switch mode to event
+    if 0 < departure_diff < diff:
+        print(f"Departure in {departure_diff} minutes | Switching to EVENT mode")
+        return "Event"
+    # if departure time is 0 or less than 0, reset mode
+    else:
+        return "Day"
+
+
+class EventCountdown:
+    """
+    Minutes until a departure, kept on the local clock between time syncs.
+
+    Epoch seconds do not fit a CircuitPython float, so the clock is an integer epoch anchored at
+    the last sync plus the integer milliseconds time.monotonic_ns() has counted since.
+    """
+
+    def __init__(self):
+        self.departure_time = None
+        self.departure_train = None
+        # minutes last shown on the display, so it is only redrawn when they change
+        self.shown = None
+        self._epoch = None
+        self._anchor_ms = None
+
+    def sync(self, epoch):
+        """
+        Anchors the local clock to a fetched epoch time (current_time_epoch).
+        """
+        self._epoch = int(epoch)
+        self._anchor_ms = _monotonic_ns() // 1000000
+
+    def now(self):
+        """
+        Returns the current epoch time on the local clock, or None before the first sync.
+        """
+        if self._epoch is None:
+            return None
+        return self._epoch + (_monotonic_ns() // 1000000 - self._anchor_ms) // 1000
+
+    def start(self, event):
+        """
+        Counts down to an event from fetch_next_event().
+        """
+        self.departure_time = int(event['departure_time'])
+        self.departure_train = event['departure_train']
+        self.shown = None
+
+    def stop(self):
+        self.departure_time = None
+        self.departure_train = None
+        self.shown = None
+
+    @property
+    def active(self):
+        return self.departure_time is not None and self._epoch is not None
+
+    def _remaining_ms(self):
+        return (self.departure_time - self._epoch) * 1000 - (_monotonic_ns() // 1000000 - self._anchor_ms)
+
+    def minutes_left(self):
+        """
+        Returns the whole minutes left, rounded up: 1 until the departure instant, then 0 or less.
+        """
+        return -(-self._remaining_ms() // 60000)
+
+    def seconds_to_change(self):
+        """
+        Returns the seconds until minutes_left() next changes, i.e. the next minute boundary before
+        the departure or the departure itself. 0 once the departure has passed.
+        """
+        remaining_ms = self._remaining_ms()
+        if remaining_ms <= 0:
+            return 0
+        # wake just past the boundary so the new minute is already showing
+        return ((remaining_ms - 1) % 60000 + 1 + 5) / 1000
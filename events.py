@@ -3,6 +3,7 @@ import os
 import sys
 import json
 import time
+from bisect import bisect_left, insort
 from datetime import datetime, timedelta
 from datetime import time as datetime_time
 
@@ -11,12 +12,19 @@ import requests
 from dateutil import parser
 import pytz
 
-# Google API-related imports
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
+from publisher import get_publisher
+from snapshot import encode_snapshot
+
+# Google API-related imports (CalendarSync also runs against a stand-in service without them)
+try:
+    from google.auth.transport.requests import Request
+    from google.oauth2.credentials import Credentials
+    from google_auth_oauthlib.flow import InstalledAppFlow
+    from googleapiclient.discovery import build
+    from googleapiclient.errors import HttpError
+except ImportError:
+    build = None
+    HttpError = Exception
 
 # import secrets directory for origin location, Google API key and file locations
 try:
@@ -29,6 +37,7 @@ try:
     from creds import secrets
 except ImportError as e:
     print(f"Import Error: {e}")
+    secrets = {}
 
 # If modifying these scopes, delete the file token.json.
 SCOPES = ['https://www.googleapis.com/auth/calendar.readonly']
@@ -55,76 +64,222 @@ class Event:
 
 
 # --- GOOGLE API CALLS ---
-# retrieves the next event from a specified Google Calendar within the next lookahead_days (default=3)
-# inputs: lookahead_days (default=3), calendar_id from secrets, timezone
-# outputs: Event object
-def retrieve_next_event(lookahead_days=3, calendar_id=secrets['calendarId'],
-                        timezone=pytz.timezone('America/New_York')):
-    # change directory to credentials location
-    os.chdir(secrets['google credentials location'])
+# Authorizes with the token.json/credentials.json in the credentials location and builds the Calendar
+# service. Discovery is expensive, so this runs once per process (see get_calendar()).
+def build_calendar_service(credentials_location=None):
+    if build is None:
+        raise ImportError("google-api-python-client and google-auth-oauthlib are needed for Google Calendar")
+    if credentials_location is None:
+        credentials_location = secrets['google credentials location']
+    token_path = os.path.join(credentials_location, 'token.json')
 
     creds = None
     # The file token.json stores the user's access and refresh tokens, and is
     # created automatically when the authorization flow completes for the first
     # time.
-    if os.path.exists('token.json'):
-        creds = Credentials.from_authorized_user_file('token.json', SCOPES)
+    if os.path.exists(token_path):
+        creds = Credentials.from_authorized_user_file(token_path, SCOPES)
     # If there are no (valid) credentials available, let the user log in.
     if not creds or not creds.valid:
         if creds and creds.expired and creds.refresh_token:
             creds.refresh(Request())
         else:
             flow = InstalledAppFlow.from_client_secrets_file(
-                'credentials.json', SCOPES)
+                os.path.join(credentials_location, 'credentials.json'), SCOPES)
             creds = flow.run_local_server(port=0)
         # Save the credentials for the next run
-        with open('token.json', 'w') as token:
+        with open(token_path, 'w') as token:
             token.write(creds.to_json())
 
-    try:
-        service = build('calendar', 'v3', credentials=creds)
-
-        # Call the Calendar API
-        tz = timezone
-        now = datetime.now(tz).date()
-        start = datetime.combine(now, datetime_time.min).isoformat() + 'Z'  # start of today
-        end = (datetime.combine(now, datetime_time.max) + timedelta(
-            days=lookahead_days)).isoformat() + 'Z'  # end of lookahead
-        events_result = service.events().list(calendarId=calendar_id, timeMin=start,
-                                              timeMax=end, singleEvents=True,
-                                              orderBy='startTime').execute()
-        events = events_result.get('items', [])
-
-        # If no events found, return None
-        if not events:
-            print('No events found.')
-            return None
-        # If events found, pop the first event off the list and turn it into an Event
-        else:
-            next_event_item = events.pop(0)
-            summary = next_event_item['summary']
-            start_time = next_event_item['start'].get('dateTime', next_event_item['start'].get('date'))
-            start_time = int(convert_struct_to_epoch(start_time))
+    # the service refreshes the access token itself when it expires
+    return build('calendar', 'v3', credentials=creds, cache_discovery=False)
+
 
+class CalendarSync:
+    """
+    Keeps a calendar's upcoming events in a sorted in-memory index. The first sync lists the sync window;
+    later syncs pass the syncToken from the previous one, so only events changed since then are fetched.
+    A full sync runs again each day (to slide the window) and whenever Google expires the token (410 Gone).
+    """
+
+    def __init__(self, service, calendar_id, window_days=30, timezone=pytz.timezone('America/New_York')):
+        """
+        Args:
+            service: Calendar v3 service (build_calendar_service()) or a stand-in with the same events().list().
+            calendar_id (str): Calendar to follow.
+            window_days (int, optional): Days ahead covered by a full sync. Defaults to 30.
+            timezone (tzinfo, optional): Timezone for all-day events and the day boundary.
+        """
+        self.service = service
+        self.calendar_id = calendar_id
+        self.window_days = window_days
+        self.timezone = timezone
+        self.sync_token = None
+        # date the last full sync started from
+        self.synced_day = None
+        # (start epoch, event id) sorted by start, and event id -> Event
+        self.index = []
+        self.events = {}
+        # API requests made, and the changes and time of the last sync
+        self.calls = 0
+        self.last_changes = 0
+        self.last_sync_ms = 0
+
+    def _list(self, **params):
+        # follows nextPageToken; the sync token comes with the last page
+        items = []
+        page_token = None
+        while True:
+            result = self.service.events().list(calendarId=self.calendar_id, singleEvents=True,
+                                                pageToken=page_token, **params).execute()
+            self.calls += 1
+            items.extend(result.get('items', []))
+            page_token = result.get('nextPageToken')
+            if not page_token:
+                return items, result.get('nextSyncToken')
+
+    def _start_epoch(self, item):
+        start = item['start'].get('dateTime', item['start'].get('date'))
+        start_time = parser.isoparse(start)
+        # all-day events have a date only, which starts at local midnight
+        if start_time.tzinfo is None:
+            start_time = self.timezone.localize(start_time)
+        return int(start_time.timestamp())
+
+    def _remove(self, event_id):
+        event = self.events.pop(event_id, None)
+        if event is not None:
+            position = bisect_left(self.index, (event.start_time, event_id))
+            if position < len(self.index) and self.index[position] == (event.start_time, event_id):
+                self.index.pop(position)
+
+    def _apply(self, items):
+        for item in items:
+            self._remove(item['id'])
+            if item.get('status') == 'cancelled':
+                continue
             # try to get location, otherwise set to None
+            location = item.get('location')
+            if location is not None:
+                location = location.replace("\n", ", ")
+            event = Event(summary=item.get('summary', ''), start_time=self._start_epoch(item), destination=location)
+            self.events[item['id']] = event
+            insort(self.index, (event.start_time, item['id']))
+
+    def _full_sync(self, today):
+        start = self.timezone.localize(datetime.combine(today, datetime_time.min))
+        end = start + timedelta(days=self.window_days + 1)
+        items, self.sync_token = self._list(timeMin=start.isoformat(), timeMax=end.isoformat())
+        self.index = []
+        self.events = {}
+        self._apply(items)
+        self.synced_day = today
+        return len(items)
+
+    def sync(self):
+        """
+        Brings the index up to date with as few requests as possible.
+
+        Returns:
+            int: Events received (changed or, on a full sync, all in the window).
+        """
+        started = time.perf_counter()
+        today = datetime.now(self.timezone).date()
+        if self.sync_token is None or self.synced_day != today:
+            changes = self._full_sync(today)
+        else:
             try:
-                location = str.replace(next_event_item['location'], "\n", ", ")
-            except Exception as e:
-                location = None
-                print("No location found: {}".format(e))
+                items, sync_token = self._list(syncToken=self.sync_token)
+                self._apply(items)
+                self.sync_token = sync_token or self.sync_token
+                changes = len(items)
+            except HttpError as error:
+                # the sync token expired: start over
+                if getattr(getattr(error, 'resp', None), 'status', None) != 410:
+                    raise
+                print("Calendar sync token expired, running a full sync")
+                changes = self._full_sync(today)
+        self.last_changes = changes
+        self.last_sync_ms = int((time.perf_counter() - started) * 1000)
+        return changes
+
+    def upcoming(self, lookahead_days=3, now=None):
+        """
+        Returns the events starting from now to the end of the lookahead (end of today plus lookahead_days),
+        in start order. Each is a fresh copy the caller can fill in departure details on.
+        """
+        if now is None:
+            now = time.time()
+        today = datetime.fromtimestamp(now, self.timezone).date()
+        end = self.timezone.localize(datetime.combine(today, datetime_time.max) + timedelta(days=lookahead_days))
+        upcoming = []
+        for start_time, event_id in self.index[bisect_left(self.index, (int(now), '')):]:
+            if start_time > end.timestamp():
+                break
+            event = self.events[event_id]
+            upcoming.append(Event(event.summary, event.start_time, event.destination))
+        return upcoming
+
+    def next_event(self, lookahead_days=3, now=None):
+        """
+        Returns the first event starting at or after now and before the end of the lookahead, or None.
+        """
+        if now is None:
+            now = time.time()
+        position = bisect_left(self.index, (int(now), ''))
+        if position == len(self.index):
+            return None
+        today = datetime.fromtimestamp(now, self.timezone).date()
+        end = self.timezone.localize(datetime.combine(today, datetime_time.max) + timedelta(days=lookahead_days))
+        start_time, event_id = self.index[position]
+        if start_time > end.timestamp():
+            return None
+        event = self.events[event_id]
+        # a fresh copy: the caller fills in departure details
+        return Event(event.summary, event.start_time, event.destination)
+
+
+# long-lived calendar client, created on first use
+calendar = None
+
+
+def get_calendar(calendar_id=None, timezone=pytz.timezone('America/New_York')):
+    """
+    Returns the process-wide CalendarSync, authorizing and building the service on the first call.
+    """
+    global calendar
+    if calendar is None:
+        calendar = CalendarSync(build_calendar_service(), calendar_id or secrets['calendarId'], timezone=timezone)
+    return calendar
 
-            # create Event object
-            next_event = Event(summary=summary, start_time=start_time, destination=location)
-            # return event
-            return next_event
 
+# retrieves the next event from a specified Google Calendar within the next lookahead_days (default=3)
+# inputs: lookahead_days (default=3), calendar_id from secrets, timezone
+# outputs: Event object
+def retrieve_next_event(lookahead_days=3, calendar_id=None, timezone=pytz.timezone('America/New_York')):
+    try:
+        calendar_sync = get_calendar(calendar_id, timezone)
+        calls = calendar_sync.calls
+        calendar_sync.sync()
+        print(f"Calendar sync: {calendar_sync.last_changes} events in {calendar_sync.calls - calls} requests, "
+              f"{calendar_sync.last_sync_ms} ms")
     except HttpError as error:
         print('An error occurred: %s' % error)
+        if calendar is None:
+            return None
+
+    next_event = calendar.next_event(lookahead_days)
+    if next_event is None:
+        print('No events found.')
+    elif next_event.destination is None:
+        print("No location found for {}".format(next_event.summary))
+    return next_event
 
 
 # Call the Google Directions API to retrieve a JSON object with directions
 # see https://developers.google.com/maps/documentation/directions/get-directions
-def get_directions(event):
+def get_directions(event, session=None):
+    # session: a requests.Session to reuse pooled connections (see publisher_daemon.py)
     # Craft Google Directions API request
     directions_url = "https://maps.googleapis.com/maps/api/directions/json?"
     directions_url = directions_url + (f"origin={secrets['origin location']}"
@@ -133,10 +288,12 @@ def get_directions(event):
                                        f"&mode=transit&transit_mode=subway"
                                        f"&key={secrets['google api key']}")
 
+    directions_response = None
     try:
-        directions_response = requests.get(directions_url)
+        directions_response = (session or requests).get(directions_url, timeout=20)
     except Exception as e:
         print("Failed to get directions: {}".format(e))
+        return None
 
     if directions_response:
         directions_json = directions_response.json()
@@ -147,6 +304,152 @@ def get_directions(event):
         return None
 
 
+# --- DEPARTURE PLANNING ---
+# seconds a directions result is trusted, by seconds left until departure: transit plans change
+# little until the day of travel, so they are refetched more often as departure gets close
+DIRECTIONS_TTL = ((24 * 60 * 60, 6 * 60 * 60), (2 * 60 * 60, 60 * 60), (30 * 60, 15 * 60), (0, 5 * 60))
+# seconds before a failed directions request is retried
+DIRECTIONS_RETRY = 5 * 60
+
+
+def directions_ttl(seconds_to_departure):
+    for threshold, ttl in DIRECTIONS_TTL:
+        if seconds_to_departure >= threshold:
+            return ttl
+    return DIRECTIONS_TTL[-1][1]
+
+
+class DirectionsCache:
+    """
+    Directions results keyed by (destination, arrival time). An entry is refetched once its TTL
+    (see DIRECTIONS_TTL) has passed; entries for events that left the calendar are pruned.
+    """
+
+    def __init__(self, fetch=None):
+        """
+        Args:
+            fetch (callable, optional): fetch(event) returning a Directions JSON dict or None. Defaults to get_directions.
+        """
+        self.fetch = fetch or get_directions
+        # (destination, arrival time) -> (expires epoch, departure time, departure train)
+        self.entries = {}
+        self.requests = 0
+        self.hits = 0
+
+    def lookup(self, event, now):
+        """
+        Returns (departure time, departure train) for an event, from the cache while it is fresh.
+        Both are None if no transit route was found.
+        """
+        key = (event.destination, event.start_time)
+        entry = self.entries.get(key)
+        if entry is not None and now < entry[0]:
+            self.hits += 1
+            return entry[1], entry[2]
+
+        self.requests += 1
+        directions = self.fetch(event)
+        departure_time = departure_train = None
+        if directions is not None and directions.get('routes'):
+            departure_time = get_departure_time(directions)
+            departure_train = get_departure_train(directions)
+        if not isinstance(departure_time, int):
+            # keep a stale result over a failed refresh, and retry later either way
+            if entry is not None and entry[1] is not None:
+                departure_time, departure_train = entry[1], entry[2]
+            else:
+                departure_time = departure_train = None
+            expires = now + DIRECTIONS_RETRY
+        else:
+            expires = now + directions_ttl(departure_time - now)
+        self.entries[key] = (expires, departure_time, departure_train)
+        return departure_time, departure_train
+
+    def prune(self, keep):
+        """
+        Drops entries whose (destination, arrival time) is not in `keep`.
+        """
+        for key in list(self.entries):
+            if key not in keep:
+                del self.entries[key]
+
+    def next_expiry(self):
+        return min((entry[0] for entry in self.entries.values()), default=None)
+
+
+class DeparturePlanner:
+    """
+    Plans departures for every event in the lookahead window in one pass and keeps them as a timeline
+    sorted by departure time. Directions come from a DirectionsCache, so an unchanged event costs no request.
+    """
+
+    def __init__(self, calendar_sync=None, cache=None, lookahead_days=3, calendar_interval=5 * 60):
+        """
+        Args:
+            calendar_sync (CalendarSync, optional): Event source. Defaults to get_calendar() on first use.
+            cache (DirectionsCache, optional): Directions cache. Defaults to a new one using get_directions.
+            lookahead_days (int, optional): Days ahead to plan. Defaults to 3.
+            calendar_interval (int, optional): Seconds between calendar syncs. Defaults to 5 minutes.
+        """
+        self.calendar_sync = calendar_sync
+        self.cache = cache or DirectionsCache()
+        self.lookahead_days = lookahead_days
+        self.calendar_interval = calendar_interval
+        # upcoming events with departure details, earliest departure first
+        self.timeline = []
+        self.last_sync = None
+
+    def plan(self, now=None):
+        """
+        Syncs the calendar if due, fills in departures for all upcoming events and rebuilds the timeline.
+
+        Returns:
+            list: Events with a departure still ahead, earliest departure first.
+        """
+        if now is None:
+            now = time.time()
+        if self.calendar_sync is None:
+            self.calendar_sync = get_calendar()
+        if self.last_sync is None or now - self.last_sync >= self.calendar_interval:
+            try:
+                self.calendar_sync.sync()
+            except HttpError as error:
+                print('An error occurred: %s' % error)
+            self.last_sync = now
+
+        timeline = []
+        keep = set()
+        for event in self.calendar_sync.upcoming(self.lookahead_days, now):
+            if event.destination is None:
+                continue
+            keep.add((event.destination, event.start_time))
+            event.departure_time, event.departure_train = self.cache.lookup(event, now)
+            if event.departure_time is not None and event.departure_time > now:
+                timeline.append(event)
+        self.cache.prune(keep)
+        timeline.sort(key=lambda event: event.departure_time)
+        self.timeline = timeline
+        return timeline
+
+    def next_departure(self):
+        return self.timeline[0] if self.timeline else None
+
+    def seconds_until_change(self, now=None, minimum=15):
+        """
+        Returns how long the daemon can sleep: until the next departure passes, a directions entry
+        expires or the calendar is due for a sync, whichever comes first (at least `minimum` seconds).
+        """
+        if now is None:
+            now = time.time()
+        wake = (self.last_sync or now) + self.calendar_interval
+        if self.timeline:
+            wake = min(wake, self.timeline[0].departure_time)
+        expiry = self.cache.next_expiry()
+        if expiry is not None:
+            wake = min(wake, expiry)
+        return max(minimum, int(wake - now))
+
+
 # --- UTILITY FUNCTIONS ---
 
 # retrieve the train headsign from the first TRANSIT step
@@ -179,7 +482,7 @@ def get_departure_train(directions_json):
 
 def get_departure_time(directions_json):
     # check if there is at least one route
-    if 'routes' in directions_json:
+    if directions_json.get('routes'):
         # check if the route contains legs
         if 'legs' in directions_json['routes'][0]:
             # return departure time from first leg
@@ -191,79 +494,34 @@ def get_departure_time(directions_json):
 # -- HELPER FUNCTIONS ---
 # Use custom Event JSON serialization to write JSON to file available on local network
 def write_to_json(next_event):
-    # set filepath for JSON file
-    filepath = os.path.join(secrets['JSON file location'], 'next_event.json')
-
-    # write JSON to file
-    with open(filepath, 'w') as json_file:
-        # use custom Event JSON serialization
-        json.dump(next_event, json_file, default=Event.__json__)
-    # confirm file was written
-    if os.path.exists(filepath):
-        print("JSON written successfully to {}".format(filepath))
-    else:
-        print("Error writing to {}".format(filepath))
-
+    # publish next_event.json atomically, only when the event changed (see publisher.py)
+    publisher = get_publisher(secrets['JSON file location'])
+    # use custom Event JSON serialization
+    if publisher.publish_json('next_event.json', next_event, default=Event.__json__):
+        print("JSON written successfully to {} (version {})".format(
+            os.path.join(publisher.directory, 'next_event.json'), publisher.version('next_event.json')))
 
-def convert_struct_to_epoch(time_struct, timezone):
-    # Create a timezone-aware datetime object using the specified timezone
-    dt = datetime.datetime.fromtimestamp(time.mktime(time_struct))
-    tz = pytz.timezone(timezone)
-    dt = tz.localize(dt)
+    write_to_snapshot(next_event, publisher.version('next_event.json'))
 
-    # Convert the timezone-aware datetime object to epoch time
-    epoch_time = dt.timestamp()
 
-    return epoch_time
+# Write the binary snapshot (see snapshot.py) next to next_event.json for signs that decode it in place
+def write_to_snapshot(next_event, sequence):
+    event = None
+    if next_event is not None:
+        event = Event.__json__(next_event)
+    # sequence is next_event.json's manifest version: it moves with every change, so the sign only skips
+    # a snapshot it has already applied (a content hash cut to 16 bits could repeat)
+    get_publisher(secrets['JSON file location']).publish('next_event.bin', encode_snapshot(event=event, sequence=sequence))
 
 
 # --- MAIN ---
 def main(start_time=6, end_time=21):
-    while True:
-        current_hour = time.localtime().tm_hour
-        # If time of day is between start_time (default: 6 AM) and end_time (default: 9 PM) (inclusive)
-        if start_time <= current_hour <= end_time:
-
-            next_event = retrieve_next_event()
-            # check if there is a next event and if it has a destination
-            if next_event is not None and next_event.destination is not None:
-                # retrieve directions JSON from Google Directions API
-                directions = get_directions(next_event)
-                # if the call is successful, populate departure time and train from directions response
-                if directions is not None:
-                    next_event.departure_time = get_departure_time(directions)
-                    next_event.departure_train = get_departure_train(directions)
-
-                    print(repr(next_event))
-                    # write JSON to file
-                    write_to_json(next_event)
-
-                    # calculate time until departure
-                    time_diff = next_event.departure_time - int(datetime.now().timestamp())
-                    # if time is less than half an hour, decrease wait time
-                    if time_diff < 1800:
-                        time.sleep(15)
-                    else:
-                        time.sleep(360 * 5)
-
-                # if the call is unsuccessful, print error
-                else:
-                    print("Could not retrieve directions")
-                    time.sleep(30)
-            # if there is no next event, sleep 5 minutes
-            else:
-                print("No events found")
-                time.sleep(60 * 5)
-        else:
-            # Calculate the time until the next start_time
-            if current_hour < start_time:
-                # If current_hour is before the start_time, sleep until start_time
-                time_to_sleep = (start_time - current_hour) * (60 * 60)
-            else:
-                # If current_hour is after the end_time, sleep until start_time of the next day
-                time_to_sleep = (24 - current_hour + start_time) * (60 * 60)
-
-            time.sleep(time_to_sleep)
+    """
+    Runs the departure publisher alone in the publisher daemon (see publisher_daemon.py), which runs it
+    during operating hours and sleeps through the rest. Run publisher_daemon.py to host both publishers in one process.
+    """
+    import publisher_daemon
+    publisher_daemon.main(('events',), start_time, end_time)
 
 
 if __name__ == '__main__':
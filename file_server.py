@@ -0,0 +1,355 @@
+# File Server
+# Small asyncio HTTP server for the files events.py and news.py publish (see publisher.py), in
+# place of a static web server. Every file carries its content ETag, a matching If-None-Match is
+# answered 304, and clients that send Accept-Encoding: gzip get a gzip body (compressed once per
+# version). Two endpoints return as soon as a file changes instead of on the next poll:
+#   GET /next_event.json?wait=300   long poll: with If-None-Match set, the answer is held until the
+#                                   file changes (200) or `wait` seconds pass (304)
+#   GET /events                     server-sent events: one "changed" event per file on connect,
+#                                   then one each time a file changes
+#
+# Changes are picked up by checking the directory every `poll_interval` seconds, or immediately
+# when a Publisher in the same process is attached with attach().
+#
+# Usage:
+#   python file_server.py [--directory DIR] [--port 8080]
+
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import time
+from urllib.parse import parse_qs, urlsplit
+
+from publisher import MANIFEST_NAME, content_etag
+
+try:
+    from creds import secrets
+except ImportError as e:
+    print(f"Import Error: {e}")
+    secrets = {}
+
+CONTENT_TYPES = {'.json': 'application/json', '.bin': 'application/octet-stream'}
+# bodies smaller than this are sent as they are; gzip would not save a packet
+GZIP_MIN_SIZE = 256
+# seconds between comment lines on idle event streams, so proxies keep them open
+HEARTBEAT_INTERVAL = 15
+REASONS = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed'}
+
+
+class PublishedFile:
+    def __init__(self, name, data, stat_key):
+        self.name = name
+        self.data = data
+        self.etag = content_etag(data)
+        # (mtime_ns, size) the data was read at
+        self.stat_key = stat_key
+        self._gzip = None
+
+    def gzip_data(self):
+        """
+        Returns the gzip body, compressed on first use. None if gzip would not make it smaller.
+        """
+        if self._gzip is None:
+            compressed = gzip.compress(self.data, mtime=0) if len(self.data) >= GZIP_MIN_SIZE else self.data
+            self._gzip = compressed if len(compressed) < len(self.data) else b''
+        return self._gzip or None
+
+
+def etag_matches(if_none_match, etag):
+    """
+    Returns True if an If-None-Match header names `etag`, in either of its encodings.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == etag or candidate == gzip_etag(etag):
+            return True
+    return False
+
+
+def gzip_etag(etag):
+    # the gzip body is a different representation, so it gets its own validator
+    return etag[:-1] + '-gzip"'
+
+
+class FileServer:
+    def __init__(self, directory, host='0.0.0.0', port=8080, poll_interval=0.5, max_wait=300):
+        """
+        Args:
+            directory (str): Directory the publishers write to.
+            host (str, optional): Address to listen on. Defaults to all interfaces.
+            port (int, optional): Port to listen on. Defaults to 8080.
+            poll_interval (float, optional): Seconds between directory checks. Defaults to 0.5.
+            max_wait (int, optional): Longest long poll in seconds. Defaults to 5 minutes.
+        """
+        self.directory = directory
+        self.host = host
+        self.port = port
+        self.poll_interval = poll_interval
+        self.max_wait = max_wait
+        # name -> PublishedFile
+        self.files = {}
+        self.server = None
+        self.loop = None
+        # set and replaced each time a file changes; waiters hold the one current when they started
+        self._changed = asyncio.Event()
+        self._watcher = None
+        # connection handler tasks, cancelled by close()
+        self.connections = set()
+        self.stats = {'requests': 0, 'not_modified': 0, 'gzip': 0, 'long_polls': 0, 'streams': 0, 'changes': 0}
+
+    # --- FILES ---
+    def _load(self, name):
+        """
+        Returns the current PublishedFile for a name, rereading it when its modification time or size changed.
+        """
+        if name == MANIFEST_NAME or name.startswith('.') or name.endswith('.tmp') or os.path.basename(name) != name:
+            return None
+        path = os.path.join(self.directory, name)
+        try:
+            stat = os.stat(path)
+            stat_key = (stat.st_mtime_ns, stat.st_size)
+            current = self.files.get(name)
+            if current is not None and current.stat_key == stat_key:
+                return current
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            if self.files.pop(name, None) is not None:
+                self.notify(name)
+            return None
+        published = PublishedFile(name, data, stat_key)
+        if current is None or current.etag != published.etag:
+            self.files[name] = published
+            self.notify(name)
+        else:
+            # touched but unchanged: keep the cached gzip body
+            current.stat_key = stat_key
+        return self.files[name]
+
+    def notify(self, name):
+        """
+        Wakes long polls and event streams. Safe to call from the event loop only; attach() handles other threads.
+        """
+        self.stats['changes'] += 1
+        changed = self._changed
+        self._changed = asyncio.Event()
+        changed.set()
+
+    def attach(self, publisher):
+        """
+        Wakes waiters as soon as `publisher` (a publisher.Publisher for the same directory) writes a file.
+        """
+        def listener(name, etag):
+            if self.loop is not None:
+                self.loop.call_soon_threadsafe(self._load, name)
+        publisher.listeners.append(listener)
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                names = [entry.name for entry in os.scandir(self.directory) if entry.is_file()]
+            except OSError as e:
+                print(f"Failed to read {self.directory}: {e}")
+                continue
+            for name in names:
+                self._load(name)
+
+    def _versions(self):
+        try:
+            with open(os.path.join(self.directory, MANIFEST_NAME), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    # --- HTTP ---
+    async def _read_request(self, reader):
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            key, _, value = line.decode('latin-1').partition(':')
+            headers[key.strip().lower()] = value.strip()
+        parts = request_line.decode('latin-1').split()
+        if len(parts) != 3:
+            return 'BAD', '', headers, 'HTTP/1.0'
+        return parts[0], parts[1], headers, parts[2]
+
+    def _write_response(self, writer, status, headers, body=b'', head=False):
+        lines = ['HTTP/1.1 {} {}'.format(status, REASONS.get(status, ''))]
+        headers.setdefault('Content-Length', str(len(body)))
+        for key, value in headers.items():
+            if value is None:
+                continue
+            lines.append('{}: {}'.format(key, value))
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+        if body and not head:
+            writer.write(body)
+
+    async def _handle(self, reader, writer):
+        task = asyncio.current_task()
+        self.connections.add(task)
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader), 60)
+                except asyncio.TimeoutError:
+                    break
+                if request is None:
+                    break
+                method, target, headers, version = request
+                self.stats['requests'] += 1
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                if method not in ('GET', 'HEAD'):
+                    self._write_response(writer, 405 if method != 'BAD' else 400, {'Allow': 'GET, HEAD'})
+                    break
+                url = urlsplit(target)
+                name = url.path.lstrip('/')
+                if name == 'events':
+                    await self._stream(writer, parse_qs(url.query))
+                    break
+                await self._serve_file(writer, name, headers, parse_qs(url.query), method == 'HEAD', keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            self.connections.discard(task)
+            writer.close()
+
+    async def _serve_file(self, writer, name, headers, query, head, keep_alive):
+        published = self._load(name)
+        if published is None:
+            self._write_response(writer, 404, {'Connection': 'keep-alive' if keep_alive else 'close'}, b'Not found')
+            return
+        if_none_match = headers.get('if-none-match')
+        try:
+            wait = min(self.max_wait, float(query.get('wait', ['0'])[0] or 0))
+        except ValueError:
+            wait = 0
+        if wait > 0 and etag_matches(if_none_match, published.etag):
+            # long poll: hold the answer until the file changes or the wait is over
+            self.stats['long_polls'] += 1
+            deadline = time.monotonic() + wait
+            while True:
+                # taken before the check so a change in between still wakes this wait
+                changed = self._changed
+                published = self._load(name)
+                if published is None:
+                    self._write_response(writer, 404, {'Connection': 'close'}, b'Not found')
+                    return
+                remaining = deadline - time.monotonic()
+                if not etag_matches(if_none_match, published.etag) or remaining <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(changed.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+
+        response_headers = {
+            'Content-Type': CONTENT_TYPES.get(os.path.splitext(name)[1], 'application/octet-stream'),
+            'Cache-Control': 'no-cache',
+            'Vary': 'Accept-Encoding',
+            'Connection': 'keep-alive' if keep_alive else 'close',
+        }
+        body = published.data
+        etag = published.etag
+        if 'gzip' in headers.get('accept-encoding', ''):
+            compressed = published.gzip_data()
+            if compressed is not None:
+                body = compressed
+                etag = gzip_etag(etag)
+                response_headers['Content-Encoding'] = 'gzip'
+        response_headers['ETag'] = etag
+        if etag_matches(if_none_match, published.etag):
+            self.stats['not_modified'] += 1
+            response_headers.pop('Content-Encoding', None)
+            self._write_response(writer, 304, response_headers)
+            return
+        if 'Content-Encoding' in response_headers:
+            self.stats['gzip'] += 1
+        self._write_response(writer, 200, response_headers, body, head)
+
+    async def _stream(self, writer, query):
+        self.stats['streams'] += 1
+        wanted = query.get('files', [''])[0].split(',') if 'files' in query else None
+        self._write_response(writer, 200, {
+            'Content-Type': 'text/event-stream', 'Cache-Control': 'no-cache', 'Connection': 'close',
+            'Content-Length': None,
+        })
+        sent = {}
+        while True:
+            changed = self._changed
+            versions = None
+            for name in wanted or sorted(self.files):
+                published = self._load(name)
+                if published is None or sent.get(name) == published.etag:
+                    continue
+                if versions is None:
+                    versions = self._versions()
+                sent[name] = published.etag
+                event = {'name': name, 'etag': published.etag, 'version': versions.get(name, {}).get('version')}
+                writer.write('event: changed\ndata: {}\n\n'.format(json.dumps(event)).encode('utf-8'))
+            await writer.drain()
+            try:
+                await asyncio.wait_for(changed.wait(), HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                writer.write(b': keep-alive\n\n')
+
+    # --- LIFECYCLE ---
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        # the event must belong to the running loop on older Pythons
+        self._changed = asyncio.Event()
+        for entry in os.scandir(self.directory):
+            if entry.is_file():
+                self._load(entry.name)
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        self._watcher = asyncio.ensure_future(self._watch())
+        print(f"Serving {self.directory} on http://{self.host}:{self.port}")
+
+    async def close(self):
+        if self._watcher is not None:
+            self._watcher.cancel()
+        if self.server is not None:
+            self.server.close()
+            for task in list(self.connections):
+                task.cancel()
+            await self.server.wait_closed()
+
+
+async def serve(directory, host='0.0.0.0', port=8080):
+    server = FileServer(directory, host, port)
+    await server.start()
+    async with server.server:
+        await server.server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve published event and headline files.")
+    parser.add_argument("--directory", default=secrets.get('JSON file location', '.'), help="publish directory")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    arguments = parser.parse_args()
+    try:
+        asyncio.run(serve(arguments.directory, arguments.host, arguments.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+# Fleet Publisher
+# Fetches WMATA predictions and OpenWeather data once for every sign in the fleet and publishes
+# changes to retained per-station MQTT topics. Signs subscribe through mqtt_manager.py instead of
+# polling the upstream APIs themselves, and a rebooted sign receives the retained state immediately.
+
+import json
+import time
+
+import requests
+
+try:
+    import paho.mqtt.client as paho_mqtt
+except ImportError:
+    paho_mqtt = None
+
+try:
+    from creds import secrets
+except ImportError as e:
+    print(f"Import Error: {e}")
+    secrets = {}
+
+TOPIC_PREFIX = 'dc-metro-sign'
+WMATA_URL = 'https://api.wmata.com/StationPrediction.svc/json/GetPrediction/'
+OPENWEATHER_URL = 'https://api.openweathermap.org/data/3.0/onecall?'
+
+# Only the fields the sign's parse_trains() reads are republished
+TRAIN_FIELDS = ('Line', 'Destination', 'DestinationName', 'Min')
+
+
+def train_topic(station_code, prefix=TOPIC_PREFIX):
+    return f"{prefix}/{station_code}/trains"
+
+
+def weather_topic(prefix=TOPIC_PREFIX):
+    return f"{prefix}/weather"
+
+
+def fetch_json(url, headers=None, session=requests):
+    """
+    Fetches and decodes a JSON document.
+
+    Args:
+        url (str): The URL to request.
+        headers (dict, optional): Request headers.
+        session (optional): Anything with a requests-style get(). Defaults to the requests module.
+
+    Returns:
+        dict: The decoded JSON response.
+    """
+    response = session.get(url, headers=headers or {}, timeout=20)
+    response.raise_for_status()
+    return response.json()
+
+
+def reduce_weather(weather_json):
+    """
+    Reduces a One Call 3.0 response to the weather dict the sign renders (same keys as code.py weather_data).
+    """
+    return {
+        'icon': weather_json['current']['weather'][0]['icon'],
+        'current_temp': weather_json['current']['temp'],
+        'current_feels_like': weather_json['current']['feels_like'],
+        'daily_temp_min': weather_json['daily'][0]['temp']['min'],
+        'daily_temp_max': weather_json['daily'][0]['temp']['max'],
+        'hourly_next_temp': weather_json['hourly'][2]['temp'],
+        'hourly_feels_like': weather_json['hourly'][2]['feels_like'],
+    }
+
+
+class FleetPublisher:
+    """
+    Publishes train and weather updates for a set of stations to an MQTT client.
+
+    The client only needs a paho-style publish(topic, payload, qos, retain), so a local broker
+    stand-in can be used to measure fan-out (see benchmarks/bench_fleet.py).
+    """
+
+    def __init__(self, client, stations, fetch=fetch_json, prefix=TOPIC_PREFIX):
+        self.client = client
+        self.stations = list(stations)
+        self.fetch = fetch
+        self.prefix = prefix
+        # last payload published per topic, used to skip unchanged updates
+        self.last_payloads = {}
+        # counters for measuring upstream and broker load
+        self.upstream_requests = 0
+        self.published = 0
+        self.unchanged = 0
+
+    def publish(self, topic, payload):
+        """
+        Publishes payload as a retained message if it differs from the last one sent on topic.
+
+        Returns:
+            bool: True if the payload was published.
+        """
+        if self.last_payloads.get(topic) == payload:
+            self.unchanged += 1
+            return False
+        self.client.publish(topic, payload, qos=1, retain=True)
+        self.last_payloads[topic] = payload
+        self.published += 1
+        return True
+
+    def poll_trains(self):
+        """
+        Fetches predictions for every station in one WMATA request and publishes each station's trains.
+
+        Returns:
+            int: The number of station topics that changed.
+        """
+        headers = {'api_key': secrets['wmata api key']}
+        json_data = self.fetch(WMATA_URL + ','.join(self.stations), headers=headers)
+        self.upstream_requests += 1
+
+        station_trains = {station: [] for station in self.stations}
+        for train in json_data.get('Trains', []):
+            trains = station_trains.get(train.get('LocationCode'))
+            if trains is not None:
+                trains.append({field: train.get(field) for field in TRAIN_FIELDS})
+
+        changed = 0
+        for station, trains in station_trains.items():
+            payload = json.dumps({'Trains': trains}, separators=(',', ':'))
+            if self.publish(train_topic(station, self.prefix), payload):
+                changed += 1
+        return changed
+
+    def poll_weather(self):
+        """
+        Fetches the fleet's weather once and publishes the reduced weather dict.
+
+        Returns:
+            bool: True if the weather changed.
+        """
+        url = (OPENWEATHER_URL
+               + 'lat=' + secrets['dc coords x']
+               + '&lon=' + secrets['dc coords y']
+               + '&exclude=minutely,alerts'
+               + '&units=imperial'
+               + '&appid=' + secrets['openweather api key'])
+        weather_json = self.fetch(url)
+        self.upstream_requests += 1
+        payload = json.dumps(reduce_weather(weather_json), separators=(',', ':'))
+        return self.publish(weather_topic(self.prefix), payload)
+
+    def run(self, train_interval=15, weather_interval=60 * 10, start_time=6, end_time=21):
+        """
+        Publishes trains every train_interval seconds and weather every weather_interval seconds
+        between start_time and end_time (inclusive hours), sleeping through the night.
+        """
+        last_weather_check = None
+        while True:
+            current_hour = time.localtime().tm_hour
+            if start_time <= current_hour <= end_time:
+                try:
+                    self.poll_trains()
+                except Exception as e:
+                    print(f"Failed to publish train data: {e}")
+
+                if last_weather_check is None or time.monotonic() > last_weather_check + weather_interval:
+                    try:
+                        self.poll_weather()
+                        last_weather_check = time.monotonic()
+                    except Exception as e:
+                        print(f"Failed to publish weather data: {e}")
+
+                time.sleep(train_interval)
+            else:
+                # Calculate the time until the next start_time
+                if current_hour < start_time:
+                    time_to_sleep = (start_time - current_hour) * (60 * 60)
+                else:
+                    time_to_sleep = (24 - current_hour + start_time) * (60 * 60)
+                time.sleep(time_to_sleep)
+
+
+# --- MAIN ---
+def main():
+    if paho_mqtt is None:
+        print("paho-mqtt is required to run the fleet publisher: pip install paho-mqtt")
+        return
+
+    client = paho_mqtt.Client()
+    if secrets.get('mqtt username'):
+        client.username_pw_set(secrets['mqtt username'], secrets.get('mqtt password'))
+    client.connect(secrets['mqtt broker'], int(secrets.get('mqtt port', 1883)))
+    # network loop runs in a background thread so publishes don't block on the broker
+    client.loop_start()
+
+    session = requests.Session()
+    publisher = FleetPublisher(
+        client,
+        secrets['fleet stations'],
+        fetch=lambda url, headers=None: fetch_json(url, headers, session=session),
+        prefix=secrets.get('mqtt topic prefix', TOPIC_PREFIX),
+    )
+    publisher.run()
+
+
+if __name__ == "__main__":
+    main()
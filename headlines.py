@@ -0,0 +1,386 @@
+# Headlines
+# Top headlines from GNews or News API. Imported by code.py only when ENABLE_HEADLINES is on.
+#
+# One request fetches a batch of articles. Their publish times are converted to local time with
+# an offset parsed once per timezone change, and the fresh ones that have not been shown yet are
+# queued in a HeadlineRotation, which hands them out spread evenly over the time until the next
+# request. Shown titles are remembered by hash in a bounded index, so a story that stays at the
+# top of the feed is announced once.
+#
+# Responses are not loaded with response.json(): ArticleExtractor reads them in chunks and keeps
+# only each article's title (cut to what a notification can hold), source name and publishedAt,
+# skipping descriptions, content, URLs and images as the bytes arrive.
+
+import json
+import time
+
+from snapshot import TITLE_SIZE, truncate_utf8
+from time_utils import format_time_struct
+
+# longest title kept, in UTF-8 bytes; the warm boot snapshot holds no more
+MAX_TITLE_LENGTH = TITLE_SIZE
+# longest source name or publishedAt kept, in bytes
+MAX_FIELD_LENGTH = 48
+# longest object key read, in bytes; keys are only compared against the few below
+MAX_KEY_LENGTH = 16
+
+
+class Article:
+    def __init__(self, source, publishedTime, publishedAt, title):
+        self.source = source
+        self.publishedTime = publishedTime
+        self.publishedAt = publishedAt
+        self.title = title
+
+    def __repr__(self):
+        return ('Article(source=\'{self.source}\', title=\'{self.title}\', publishedTime=\'{self.publishedTime}\', '
+                'publishedAt=\'{self.publishedAt}\')').format(
+            self=self)
+
+    def __getitem__(self, key):
+        if key == 'source':
+            return self.source
+        elif key == 'publishedTime':
+            return self.publishedTime
+        elif key == 'publishedAt':
+            return self.publishedAt
+        elif key == 'title':
+            return self.title
+        else:
+            raise KeyError(f"Invalid key: {key}")
+
+    def get_headline_string(self):
+        headline_string = format_time_struct(self.publishedTime)
+        return f"{headline_string} | {self.source}\n{self.title}"
+
+
+def decode_json_string(raw, truncated=False):
+    """
+    Decodes the raw bytes between a JSON string's quotes. A string cut short by a length limit first
+    loses any escape sequence or UTF-8 character the cut split.
+    """
+    raw = bytes(raw)
+    if truncated:
+        backslash = raw.rfind(b'\\', max(0, len(raw) - 6))
+        if backslash >= 0:
+            # an odd run of backslashes ending here means the last one starts an escape
+            run = 1
+            while backslash - run >= 0 and raw[backslash - run] == 0x5C:
+                run += 1
+            if run % 2 and (backslash == len(raw) - 1 or
+                            (raw[backslash + 1] == 0x75 and len(raw) - backslash < 6)):
+                raw = raw[:backslash]
+        start = len(raw) - 1
+        while start > 0 and raw[start] & 0xC0 == 0x80:
+            start -= 1
+        if start >= 0 and raw:
+            lead = raw[start]
+            needed = 1 if lead < 0x80 else 2 if lead < 0xE0 else 3 if lead < 0xF0 else 4
+            if len(raw) - start < needed:
+                raw = raw[:start]
+    try:
+        value = json.loads('"' + raw.decode('utf-8') + '"')
+    except ValueError:
+        return raw.decode('utf-8')
+    # half of a \ud83d\ude00 style pair
+    if truncated and value and 0xD800 <= ord(value[-1]) <= 0xDBFF:
+        value = value[:-1]
+    return value
+
+
+class ArticleExtractor:
+    """
+    Streaming reader for GNews and News API responses. feed() takes the body in chunks of any size;
+    the kept fields of each complete article end up in `articles`, in the shape response.json() gives.
+    """
+
+    def __init__(self, max_articles=10, title_length=MAX_TITLE_LENGTH):
+        """
+        Args:
+            max_articles (int, optional): Articles to keep; `done` is set once they are read. Defaults to 10.
+            title_length (int, optional): UTF-8 bytes of each title kept, cut on a character boundary.
+                Defaults to MAX_TITLE_LENGTH.
+        """
+        self.max_articles = max_articles
+        self.title_length = title_length
+        self.articles = []
+        self.done = False
+        # open containers (True for objects, False for arrays) and the last key read in each object
+        self.stack = []
+        self.keys = []
+        self.expect_key = False
+        # string being read: whether it is a key, which field it fills (None to skip it) and its raw bytes
+        self.in_string = False
+        self.string_is_key = False
+        self.field = None
+        self.raw = bytearray()
+        self.limit = 0
+        self.truncated = False
+        # the last chunk ended on a backslash inside a string
+        self.escape = False
+        self.current = None
+
+    def _field(self):
+        # which kept field a string value at the current position is, if any
+        depth = len(self.stack)
+        if depth < 3 or self.keys[0] != 'articles' or self.stack[1]:
+            return None
+        if depth == 3 and self.keys[2] in ('title', 'publishedAt'):
+            return self.keys[2]
+        if depth == 4 and self.keys[2] == 'source' and self.keys[3] == 'name':
+            return 'source'
+        return None
+
+    def _start_string(self):
+        self.in_string = True
+        self.string_is_key = bool(self.stack) and self.stack[-1] and self.expect_key
+        if self.string_is_key:
+            self.field = 'key'
+            self.limit = MAX_KEY_LENGTH
+        else:
+            self.field = self._field()
+            # room for \u escapes, which take up to 6 raw bytes per 3 encoded ones; the title is cut to
+            # title_length encoded bytes after decoding.
+            self.limit = self.title_length * 4 + 8 if self.field == 'title' else MAX_FIELD_LENGTH
+        self.raw = bytearray()
+        self.truncated = False
+
+    def _append(self, data):
+        room = self.limit - len(self.raw)
+        if len(data) > room:
+            data = data[:room]
+            self.truncated = True
+        self.raw.extend(data)
+
+    def _end_string(self):
+        self.in_string = False
+        if self.field is None:
+            return
+        value = decode_json_string(self.raw, self.truncated)
+        if self.field == 'key':
+            self.keys[-1] = value
+        elif self.current is not None:
+            if self.field == 'title':
+                value = str(truncate_utf8(value.encode('utf-8'), self.title_length), 'utf-8')
+            self.current[self.field] = value
+        self.field = None
+        self.raw = bytearray()
+
+    def _read_string(self, chunk, index, size):
+        # returns the index after the part of the string in this chunk
+        keep = self.field is not None
+        if self.escape:
+            self.escape = False
+            if keep:
+                self._append(chunk[index:index + 1])
+            return index + 1
+        quote = chunk.find(b'"', index)
+        backslash = chunk.find(b'\\', index, size if quote < 0 else quote)
+        if backslash >= 0:
+            if backslash + 1 < size:
+                if keep:
+                    self._append(chunk[index:backslash + 2])
+                return backslash + 2
+            if keep:
+                self._append(chunk[index:backslash + 1])
+            self.escape = True
+            return size
+        if quote < 0:
+            if keep:
+                self._append(chunk[index:size])
+            return size
+        if keep:
+            self._append(chunk[index:quote])
+        self._end_string()
+        return quote + 1
+
+    def _close(self):
+        depth = len(self.stack)
+        self.stack.pop()
+        self.keys.pop()
+        if depth == 3 and self.current is not None:
+            # an article object ended
+            article = self.current
+            self.current = None
+            if 'title' in article and 'publishedAt' in article:
+                self.articles.append({
+                    'title': article['title'],
+                    'publishedAt': article['publishedAt'],
+                    'source': {'name': article.get('source', '')},
+                })
+                if len(self.articles) >= self.max_articles:
+                    self.done = True
+
+    def feed(self, chunk):
+        """
+        Reads the next part of the body. Stops early once `done` is set.
+        """
+        index = 0
+        size = len(chunk)
+        while index < size and not self.done:
+            if self.in_string:
+                index = self._read_string(chunk, index, size)
+                continue
+            byte = chunk[index]
+            index += 1
+            if byte == 0x22:  # "
+                self._start_string()
+            elif byte == 0x7B:  # {
+                self.stack.append(True)
+                self.keys.append(None)
+                self.expect_key = True
+                if len(self.stack) == 3 and self.keys[0] == 'articles' and not self.stack[1]:
+                    self.current = {}
+            elif byte == 0x5B:  # [
+                self.stack.append(False)
+                self.keys.append(None)
+            elif byte == 0x7D or byte == 0x5D:  # } ]
+                if self.stack:
+                    self._close()
+            elif byte == 0x3A:  # :
+                self.expect_key = False
+            elif byte == 0x2C:  # ,
+                self.expect_key = bool(self.stack) and self.stack[-1]
+
+
+def fetch_articles(wifi, secrets, news_source="gnews", article_count=5):
+    """
+    Requests the top articles from a news source.
+
+    Args:
+        wifi (ESPSPI_WiFiManager): WiFi manager to request with.
+        secrets (dict): Holds the 'gnews api key' / 'news api key'.
+        news_source (str, optional): 'gnews', 'newsapi' or 'sample_data'. Defaults to "gnews".
+        article_count (int, optional): The number of articles to retrieve. Defaults to 5.
+
+    Returns:
+        dict or None: {'articles': [...]} with each article's title, source name and publishedAt
+        (see ArticleExtractor), or None if the request failed.
+    """
+    # Make API call to specified news source
+    if news_source == 'newsapi':
+        # Query News API with input count
+        request_url = f'https://newsapi.org/v2/top-headlines?country=us&pageSize={article_count}'
+        headers = {'X-Api-Key': secrets['news api key']}
+    elif news_source == 'gnews':
+        # Query GNews API with input count
+        request_url = f'https://gnews.io/api/v4/top-headlines?category=general&lang=en&country=us&max={article_count}'
+        request_url += f'&apikey={secrets["gnews api key"]}'
+        headers = {}
+    else:
+        # 'sample_data': add sample API output here for testing
+        return None
+
+    try:
+        response = wifi.get(request_url, headers=headers)
+        if response.status_code != 200:
+            print("Failed to retrieve NEWS data from endpoint: {}".format(response.status_code))
+            response.close()
+            return None
+        extractor = ArticleExtractor(article_count)
+        for chunk in response.iter_content(256):
+            extractor.feed(chunk)
+            if extractor.done:
+                break
+        response.close()
+        del response
+        return {'articles': extractor.articles}
+    except Exception as e:
+        print("Failed to retrieve NEWS data from endpoint: {}".format(e))
+        return None
+
+
+def parse_articles(json_data, current_time, utc_offset, recent_within=None):
+    """
+    Builds Articles from a news response, newest first as the source orders them.
+
+    Args:
+        json_data (dict): The news response.
+        current_time (time.struct_time): Current local time.
+        utc_offset (int): Local offset from UTC in minutes (see time_utils.offset_minutes()).
+        recent_within (int, optional): Skip articles published more than this many minutes ago. Defaults to None (keep all).
+
+    Returns:
+        list: Article objects.
+    """
+    articles = []
+    now_minute = current_time.tm_hour * 60 + current_time.tm_min
+    for item in json_data.get('articles', ()):
+        try:
+            # publishedAt is "YYYY-MM-DDTHH:MM:SSZ", in UTC
+            published_at = item['publishedAt']
+            minute = (int(published_at[11:13]) * 60 + int(published_at[14:16]) + utc_offset) % (24 * 60)
+            if recent_within is not None and (now_minute - minute) % (24 * 60) > recent_within:
+                continue
+            published_time = time.struct_time(current_time[:3] + (minute // 60, minute % 60) + current_time[5:])
+            title = item['title'].split(' - ')[0].strip()
+            articles.append(Article(item['source']['name'], published_time, published_at, title))
+        except (KeyError, ValueError, TypeError) as e:
+            print("Skipping article: {}".format(e))
+    return articles
+
+
+class HeadlineRotation:
+    def __init__(self, capacity=32):
+        """
+        Args:
+            capacity (int, optional): Shown titles remembered before the oldest is forgotten. Defaults to 32.
+        """
+        # hashes of shown titles: a set for lookups and a ring for eviction order
+        self.seen = set()
+        self.ring = [None] * capacity
+        self.position = 0
+        # articles waiting to be shown, and when the next one is due (time.monotonic())
+        self.queue = []
+        self.spacing = 0
+        self.next_at = 0
+
+    def mark_seen(self, title):
+        """
+        Remembers a title as shown (e.g. the headline restored by warm boot).
+        """
+        key = hash(title)
+        if key in self.seen:
+            return
+        evicted = self.ring[self.position]
+        if evicted is not None:
+            self.seen.discard(evicted)
+        self.ring[self.position] = key
+        self.position = (self.position + 1) % len(self.ring)
+        self.seen.add(key)
+
+    def was_seen(self, title):
+        return hash(title) in self.seen
+
+    def load(self, articles, window, now):
+        """
+        Queues the articles that have not been shown, spread evenly over `window` seconds from `now`.
+
+        Returns:
+            int: The number of articles queued.
+        """
+        self.queue = []
+        queued = set()
+        for article in articles:
+            key = hash(article.title)
+            if key not in self.seen and key not in queued:
+                queued.add(key)
+                self.queue.append(article)
+        if self.queue:
+            self.spacing = window / len(self.queue)
+            self.next_at = now
+        return len(self.queue)
+
+    def due(self, now):
+        return len(self.queue) > 0 and now >= self.next_at
+
+    def next(self, now):
+        """
+        Returns the next article to show and marks it as shown, or None if none is due.
+        """
+        if not self.due(now):
+            return None
+        article = self.queue.pop(0)
+        self.mark_seen(article.title)
+        self.next_at = now + self.spacing
+        return article
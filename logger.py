@@ -0,0 +1,173 @@
+# Logger
+# Leveled logging for the sign's main loop, in place of print(). Records at or above `level` are
+# kept in a fixed-size ring buffer in RAM; only records at or above `echo_level` are also printed,
+# because USB serial output is synchronous on CircuitPython and slows the loop down. When an
+# error is logged, the buffered records are dumped to a file (if the filesystem is writable; it is
+# rotated to <file>.1 once it outgrows max_file_size) and
+# handed to the dump listeners, e.g. a telemetry feed, so the lead-up to a failure is kept
+# without printing every pass.
+#
+# Messages are str.format() strings whose arguments are only formatted when the record is kept:
+#   log = Logger(level=INFO, echo_level=WARNING)
+#   log.debug("Notification queue: {}", notification_queue)    # dropped without formatting
+#   log.error("Train error: {}", e)                            # printed, buffered and dumped
+#
+# Avoid f-strings for DEBUG and INFO messages: an f-string is formatted before the call, even
+# when the record is dropped.
+
+import os
+import time
+
+try:
+    _monotonic_ns = time.monotonic_ns
+except AttributeError:
+    def _monotonic_ns():
+        return int(time.monotonic() * 1000000000)
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING", ERROR: "ERROR"}
+
+
+class Logger:
+    def __init__(self, capacity=32, level=INFO, echo_level=WARNING, dump_path=None, dump_interval=300,
+                 max_file_size=16 * 1024):
+        """
+        Args:
+            capacity (int, optional): Records kept in the ring buffer. Defaults to 32.
+            level (int, optional): Lowest level recorded. Defaults to INFO.
+            echo_level (int, optional): Lowest level also printed to serial. Defaults to WARNING.
+            dump_path (str, optional): File the buffer is appended to on errors. Needs a writable
+                filesystem (see recorder.py); None only notifies the listeners.
+            dump_interval (int, optional): Fewest seconds between dumps, so an error repeating every
+                loop does not wear the flash. Defaults to 5 minutes.
+            max_file_size (int, optional): Bytes dump_path may grow to before it replaces <dump_path>.1,
+                so at most twice this is kept on the filesystem. Defaults to 16 KB.
+        """
+        self.capacity = capacity
+        self.level = level
+        self.echo_level = echo_level
+        self.dump_path = dump_path
+        self.dump_interval = dump_interval
+        self.max_file_size = max_file_size
+        # preallocated ring: milliseconds since boot, level and message of each record
+        self._times = [0] * capacity
+        self._levels = bytearray(capacity)
+        self._messages = [None] * capacity
+        # slot the next record goes into
+        self._next = 0
+        # records kept since boot
+        self.count = 0
+        self.dumps = 0
+        self._last_dump = None
+        # callables(text) run with each dump
+        self.listeners = []
+
+    def enabled(self, level):
+        """
+        Returns True if records at `level` are kept, for callers whose arguments are costly to build.
+        """
+        return level >= self.level
+
+    def log(self, level, message, *args):
+        if level < self.level:
+            return
+        if args:
+            try:
+                message = message.format(*args)
+            except (IndexError, KeyError, ValueError):
+                message = "{} {}".format(message, args)
+        index = self._next
+        self._times[index] = _monotonic_ns() // 1000000
+        self._levels[index] = level
+        self._messages[index] = message
+        self._next = (index + 1) % self.capacity
+        self.count += 1
+        if level >= self.echo_level:
+            print(message)
+        if level >= ERROR:
+            self.dump()
+
+    def debug(self, message, *args):
+        if DEBUG >= self.level:
+            self.log(DEBUG, message, *args)
+
+    def info(self, message, *args):
+        if INFO >= self.level:
+            self.log(INFO, message, *args)
+
+    def warning(self, message, *args):
+        if WARNING >= self.level:
+            self.log(WARNING, message, *args)
+
+    def error(self, message, *args):
+        self.log(ERROR, message, *args)
+
+    def records(self):
+        """
+        Returns the buffered records, oldest first, as (milliseconds since boot, level, message).
+        """
+        kept = min(self.count, self.capacity)
+        start = (self._next - kept) % self.capacity
+        records = []
+        for offset in range(kept):
+            index = (start + offset) % self.capacity
+            records.append((self._times[index], self._levels[index], self._messages[index]))
+        return records
+
+    def format_records(self, last=None):
+        """
+        Returns the last `last` buffered records (all by default), one "seconds LEVEL message" line each.
+        """
+        records = self.records()
+        if last is not None:
+            records = records[-last:]
+        return "\n".join("{}.{:03d} {} {}".format(milliseconds // 1000, milliseconds % 1000,
+                                                  LEVEL_NAMES.get(level, level), message)
+                         for milliseconds, level, message in records)
+
+    def _rotate(self):
+        try:
+            size = os.stat(self.dump_path)[6]
+        except OSError:
+            # no file yet
+            return
+        if size < self.max_file_size:
+            return
+        rotated = self.dump_path + ".1"
+        try:
+            os.remove(rotated)
+        except OSError:
+            pass
+        os.rename(self.dump_path, rotated)
+
+    def dump(self, force=False):
+        """
+        Writes the buffer to dump_path and passes it to the listeners, at most once per dump_interval.
+
+        Returns:
+            bool: True if the buffer was dumped.
+        """
+        now = time.monotonic()
+        if not force and self._last_dump is not None and now - self._last_dump < self.dump_interval:
+            return False
+        self._last_dump = now
+        self.dumps += 1
+        text = self.format_records()
+        if self.dump_path is not None:
+            try:
+                self._rotate()
+                with open(self.dump_path, "a") as f:
+                    f.write("--- dump {} ---\n{}\n".format(self.dumps, text))
+            except OSError as e:
+                # read-only filesystem: stop trying
+                print("Log dump to {} failed, disabling it: {}".format(self.dump_path, e))
+                self.dump_path = None
+        for listener in self.listeners:
+            try:
+                listener(text)
+            except Exception as e:
+                print("Log dump listener failed: {}".format(e))
+        return True
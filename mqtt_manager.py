@@ -0,0 +1,140 @@
+# MQTT Manager
+# Subscribes the sign to the retained topics published by fleet.py and dispatches incoming
+# messages to per-topic handlers, so the sign no longer polls WMATA/OpenWeather on its own timers.
+# The same class carries the Adafruit IO control channel (see remote_control.py).
+
+import time
+import adafruit_minimqtt.adafruit_minimqtt as MQTT
+import adafruit_esp32spi.adafruit_esp32spi_socket as socket
+
+TOPIC_PREFIX = "dc-metro-sign"
+
+# MQTT over TLS; the ESP32 coprocessor handles the TLS session
+TLS_PORT = 8883
+
+# seconds between reconnect attempts, doubling after each failure
+RECONNECT_DELAY = 5
+MAX_RECONNECT_DELAY = 5 * 60
+
+
+class MQTTManager:
+    def __init__(self, esp, secrets, broker=None, port=None, username=None, password=None, is_ssl=None):
+        """
+        Broker settings default to the fleet broker in secrets ('mqtt broker', 'mqtt port',
+        'mqtt username', 'mqtt password'); pass them explicitly for another broker such as Adafruit IO.
+        TLS is used on port 8883 unless is_ssl says otherwise.
+        """
+        self.secrets = secrets
+        self.prefix = secrets.get("mqtt topic prefix", TOPIC_PREFIX)
+        # topic -> handler(topic, message)
+        self.handlers = {}
+        self.connected = False
+        # connect() blocks, so after a failure the next attempt waits reconnect_delay seconds
+        self.reconnect_delay = RECONNECT_DELAY
+        self.retry_at = None
+        # optional callback run after every (re)connect, once subscriptions are in place
+        self.on_connect = None
+
+        port = port or secrets.get("mqtt port", 1883)
+        MQTT.set_socket(socket, esp)
+        self.client = MQTT.MQTT(
+            broker=broker or secrets["mqtt broker"],
+            port=port,
+            username=username or secrets.get("mqtt username"),
+            password=password or secrets.get("mqtt password"),
+            is_ssl=port == TLS_PORT if is_ssl is None else is_ssl,
+        )
+        self.client.on_message = self._on_message
+        self.client.on_disconnect = self._on_disconnect
+
+    def train_topic(self, station_code):
+        return "{}/{}/trains".format(self.prefix, station_code)
+
+    def weather_topic(self):
+        return "{}/weather".format(self.prefix)
+
+    def subscribe(self, topic, handler):
+        """
+        Registers handler(topic, message) for topic and subscribes if already connected.
+        Retained messages on the topic are delivered right after the subscription.
+        """
+        self.handlers[topic] = handler
+        if self.connected:
+            self.client.subscribe(topic, 1)
+
+    def connect(self):
+        """
+        Connects to the broker and (re)subscribes to every registered topic.
+
+        Returns:
+            bool: True if connected.
+        """
+        try:
+            self.client.connect()
+            self.connected = True
+            for topic in self.handlers:
+                self.client.subscribe(topic, 1)
+            if self.on_connect is not None:
+                self.on_connect(self)
+            self.reconnect_delay = RECONNECT_DELAY
+            self.retry_at = None
+        except Exception as e:
+            print("Failed to connect to MQTT broker, retrying in {} s: {}".format(self.reconnect_delay, e))
+            self.connected = False
+            self.retry_at = time.monotonic() + self.reconnect_delay
+            self.reconnect_delay = min(self.reconnect_delay * 2, MAX_RECONNECT_DELAY)
+        return self.connected
+
+    def loop(self, timeout=1):
+        """
+        Processes any pending messages, waiting at most timeout seconds. Reconnects if needed, backing
+        off after failed attempts.
+
+        Returns:
+            bool: True if the client is connected after the call.
+        """
+        if not self.connected:
+            if self.retry_at is not None and time.monotonic() < self.retry_at:
+                return False
+            if not self.connect():
+                return False
+        try:
+            self.client.loop(timeout)
+        except Exception as e:
+            print("MQTT loop error, reconnecting: {}".format(e))
+            self.connected = False
+        return self.connected
+
+    def wait(self, seconds):
+        """
+        Sleeps for up to seconds while handling messages as they arrive, so handlers run on
+        arrival instead of at the next loop. Falls back to time.sleep() when disconnected.
+        """
+        deadline = time.monotonic() + seconds
+        remaining = seconds
+        while remaining > 0:
+            if not self.loop(min(remaining, 1)):
+                time.sleep(remaining)
+                return
+            remaining = deadline - time.monotonic()
+
+    def publish(self, topic, message, retain=False):
+        try:
+            self.client.publish(topic, message, retain)
+            return True
+        except Exception as e:
+            print("MQTT publish error on {}: {}".format(topic, e))
+            self.connected = False
+            return False
+
+    def _on_message(self, client, topic, message):
+        handler = self.handlers.get(topic)
+        if handler is None:
+            return
+        try:
+            handler(topic, message)
+        except Exception as e:
+            print("MQTT handler error on {}: {}".format(topic, e))
+
+    def _on_disconnect(self, client, userdata, rc):
+        self.connected = False
@@ -1,10 +1,11 @@
 import os
-import time
 from datetime import datetime
-import json
 import requests
 import pytz
 
+from publisher import get_publisher
+from snapshot import encode_snapshot
+
 try:
     from creds import secrets
 except ImportError as e:
@@ -51,13 +52,14 @@ class Article:
 
 # --- NEWS API CALL AND FUNCTIONS---
 
-def retrieve_headlines(news_source='gnews', count=3):
+def retrieve_headlines(news_source='gnews', count=3, session=None):
     """
     Retrieves the top headlines from the News API.
 
     Args:
         count (int, optional): The number of headlines to retrieve. Defaults to 5.
         news_source (str, optional): The news source to use. Defaults to 'gnews'.
+        session (requests.Session, optional): Session to reuse pooled connections. Defaults to None.
 
     Returns:
         dict: A dictionary containing the JSON response from the News API.
@@ -74,7 +76,7 @@ def retrieve_headlines(news_source='gnews', count=3):
         headers = {}
 
     if request_url is not None:
-        response = requests.get(request_url, headers=headers)
+        response = (session or requests).get(request_url, headers=headers, timeout=20)
         json_data = response.json()
         del response
         return json_data
@@ -111,59 +113,46 @@ def write_to_json(article):
         Returns:
             None
     """
-    # set filepath for JSON file
-    filepath = os.path.join(secrets['JSON file location'], 'headline.json')
-
-    # write JSON to file
-    with open(filepath, 'w') as json_file:
-        # use custom Article JSON serialization
-        json.dump(article, json_file, default=Article.__json__)
-    # confirm file was written
-    if os.path.exists(filepath):
-        print("Headline written successfully to {}".format(filepath))
-    else:
-        print("Error writing to {}".format(filepath))
+    # publish headline.json atomically, only when the headline changed (see publisher.py)
+    publisher = get_publisher(secrets['JSON file location'])
+    # use custom Article JSON serialization
+    if publisher.publish_json('headline.json', article, default=Article.__json__):
+        print("Headline written successfully to {} (version {})".format(
+            os.path.join(publisher.directory, 'headline.json'), publisher.version('headline.json')))
+
+    write_to_snapshot(article, publisher.version('headline.json'))
+
+
+def write_to_snapshot(article, sequence):
+    """
+        Write the given article to headline.bin as a binary snapshot (see snapshot.py).
+        Parameters:
+            article (object): The article to be written to the snapshot.
+            sequence (int): Snapshot sequence number, headline.json's manifest version. It moves with every
+                change, so the sign only skips a snapshot it has already applied.
+        Returns:
+            None
+    """
+    fields = article.__json__()
+    published = datetime.strptime(fields['publishedTime'], "%I:%M%p")
+    headline = {
+        'source': fields['source'],
+        'title': fields['title'],
+        'hour': published.hour,
+        'minute': published.minute
+    }
+    get_publisher(secrets['JSON file location']).publish('headline.bin',
+                                                        encode_snapshot(headline=headline, sequence=sequence))
 
 
 # --- MAIN ---
 def main(start_time=6, end_time=21, news_source="gnews"):
     """
-    Continuously retrieve headlines, create article list, and write the most recent article to JSON.
-    Sleep for 15 minutes between each iteration during operating hours.
+    Runs the headline publisher alone in the publisher daemon (see publisher_daemon.py), which runs it
+    during operating hours and sleeps through the rest. Run publisher_daemon.py to host both publishers in one process.
     """
-    while True:
-        current_hour = time.localtime().tm_hour
-
-        # If time of day is between start_time (default: 6 AM) and end_time (default: 9 PM) (inclusive)
-        if start_time <= current_hour <= end_time:
-            json_data = None
-            try:
-                # Retrieve headlines
-                json_data = retrieve_headlines(news_source)
-            except Exception as e:
-                print(e)
-
-            if json_data is not None:
-                # Create article list
-                article_list = create_article_list(json_data)
-                # Write the most recent article to JSON
-                write_to_json(article_list.pop(0))
-            else:
-                print("No headlines found")
-
-            # NOTE: Free GNews plan allows for up to 100 requests per day, change this if operating hours change
-            # Sleep for 12 minutes
-            time.sleep(60 * 12)
-        else:
-            # Calculate the time until the next start_time
-            if current_hour < start_time:
-                # If current_hour is before the start_time, sleep until start_time
-                time_to_sleep = (start_time - current_hour) * (60 * 60)
-            else:
-                # If current_hour is after the end_time, sleep until start_time of the next day
-                time_to_sleep = (24 - current_hour + start_time) * (60 * 60)
-
-            time.sleep(time_to_sleep)
+    import publisher_daemon
+    publisher_daemon.main(('news',), start_time, end_time, news_source)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,99 @@
+# Planes
+# Nearest aircraft from a local ADS-B receiver (readsb/tar1090). Imported by code.py only when
+# ENABLE_PLANES is on.
+
+import gc
+
+
+class Plane:
+    def __init__(self, flight, altitude, distance, emergency=None):
+        self.flight = flight
+        self.altitude = altitude
+        self.distance = distance
+        self.emergency = emergency
+
+    def __getitem__(self, key):
+        if key == 'flight':
+            return self.flight
+        elif key == 'altitude':
+            return self.altitude
+        elif key == 'distance':
+            return self.distance
+        elif key == 'emergency':
+            return self.emergency
+        else:
+            raise KeyError(f"Invalid key: {key}")
+
+    def get_plane_string(self):
+        return (f"Flight: {self.flight}\nAlt: {add_commas_to_number(str(self.altitude))}ft" +
+                f" | Dist: {self.distance}nmi")
+
+
+def add_commas_to_number(number_str):
+    reversed_number = "".join(reversed(number_str))
+    groups = [reversed_number[i:i + 3] for i in range(0, len(reversed_number), 3)]
+    formatted_number = ",".join("".join(reversed(group)) for group in reversed(groups))
+
+    return formatted_number
+
+
+def find_nearest_plane(wifi, url, range=2.0, nearest_plane=None):
+    """
+    Retrieves the nearest plane within a given range by requesting plane.json from local ADS-B receiver (default
+    location for readsb)
+    Sample format: http://XXX.XXX.X.XXX/tar1090/data/aircraft.json
+
+    Args:
+        wifi (ESPSPI_WiFiManager): WiFi manager to request with.
+        url (str): aircraft.json URL.
+        range (float, optional): The range within which to search for planes. Defaults to 2.0.
+        nearest_plane (Plane, optional): Current nearest plane; only a closer one replaces it.
+
+    Returns:
+        Plane or None: The nearest plane within range.
+    """
+    json_data = None
+
+    try:
+        response = wifi.get(url)
+        json_data = response.json()
+    except OSError as e:
+        print("Failed to get PLANE data, retrying\n", e)
+        wifi.reset()
+    except RuntimeError as e:
+        print("Failed to get PLANE data, retrying\n", e)
+        wifi.reset()
+    except Exception as e:
+        print("Failed to get PLANE data", e)
+        pass
+    gc.collect()
+
+    # If aircraft data exists
+    if json_data is not None and json_data["aircraft"] is not None:
+        try:
+            for entry in json_data["aircraft"]:
+                # Check if flight callsign and distance exists, check distance against range
+                if "flight" and "alt_geom" and "r_dst" in entry and float(entry["r_dst"]) <= range:
+                    entry_distance = round(float(entry["r_dst"]), 2)
+                    if nearest_plane is None or (
+                            nearest_plane is not None and nearest_plane.distance > entry_distance):
+                        try:
+                            nearest_plane = Plane(
+                                entry["flight"].strip(),
+                                entry["alt_geom"],
+                                float(entry_distance)
+                            )
+                            # print(nearest_plane.get_plane_string())
+                            # Separate emergency field as optional
+                            if "emergency" in entry:
+                                nearest_plane.emergency = entry["emergency"]
+                        except Exception as e:
+                            print(f"couldn't update nearest plane entry: {e}")
+                else:
+                    # print("Plane data didn't meet object criteria")
+                    pass
+        except Exception as e:
+            print("Failed to create PLANE object:", e)
+    else:
+        print("Failed to get PLANE data")
+    return nearest_plane
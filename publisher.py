@@ -0,0 +1,123 @@
+# Publisher
+# Host-side writer for the files the signs poll (next_event.json, headline.json and their .bin
+# snapshots). A file is written to a temporary file in the same directory and moved into place
+# with os.replace(), so a sign or web server never reads a half-written file, and it is only
+# written when its content changed, so its modification time (and a static server's ETag) stays put.
+#
+# Every published file has an ETag derived from its content hash and a version that counts its
+# changes. Both are kept in manifest.json next to the files, so they survive restarts:
+#   {"next_event.json": {"etag": "\"3f2a...\"", "version": 12, "updated": 1718000000}}
+
+import hashlib
+import json
+import os
+import time
+
+MANIFEST_NAME = 'manifest.json'
+
+
+def content_etag(data):
+    """
+    Returns the strong ETag (quoted) for a file's bytes.
+    """
+    return '"{}"'.format(hashlib.sha1(data).hexdigest()[:16])
+
+
+def write_atomic(filepath, data):
+    """
+    Writes bytes to filepath through a temporary file and os.replace(), so readers see either the
+    old or the new content.
+    """
+    temporary = '{}.{}.tmp'.format(filepath, os.getpid())
+    try:
+        with open(temporary, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, filepath)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+
+class Publisher:
+    def __init__(self, directory):
+        """
+        Args:
+            directory (str): Directory the files are published to (secrets['JSON file location']).
+        """
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, MANIFEST_NAME)
+        # file name -> {'etag', 'version', 'updated'}
+        self.manifest = self._load_manifest()
+        self.writes = 0
+        self.skipped = 0
+        # callables(name, etag) run after a file changes, e.g. file_server.py waking its long polls
+        self.listeners = []
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _current_etag(self, name):
+        entry = self.manifest.get(name)
+        if entry is not None:
+            return entry['etag']
+        # published before the manifest existed: compare against the file itself
+        try:
+            with open(os.path.join(self.directory, name), 'rb') as f:
+                return content_etag(f.read())
+        except OSError:
+            return None
+
+    def publish(self, name, data):
+        """
+        Publishes bytes as `name` if they differ from what is published.
+
+        Returns:
+            bool: True if the file was written, False if it was unchanged.
+        """
+        etag = content_etag(data)
+        if etag == self._current_etag(name):
+            self.skipped += 1
+            return False
+        write_atomic(os.path.join(self.directory, name), data)
+        # events.py and news.py may run as separate processes sharing the manifest
+        self.manifest.update({key: value for key, value in self._load_manifest().items() if key != name})
+        entry = self.manifest.get(name, {'version': 0})
+        self.manifest[name] = {'etag': etag, 'version': entry['version'] + 1, 'updated': int(time.time())}
+        write_atomic(self.manifest_path, json.dumps(self.manifest, sort_keys=True).encode('utf-8'))
+        self.writes += 1
+        for listener in self.listeners:
+            listener(name, etag)
+        return True
+
+    def publish_json(self, name, value, default=None):
+        """
+        Publishes a value as JSON. Keys are sorted so equal values always give the same bytes (and ETag).
+        """
+        return self.publish(name, json.dumps(value, default=default, sort_keys=True).encode('utf-8'))
+
+    def etag(self, name):
+        entry = self.manifest.get(name)
+        return entry['etag'] if entry else None
+
+    def version(self, name):
+        entry = self.manifest.get(name)
+        return entry['version'] if entry else 0
+
+
+# one publisher per directory, shared by events.py and news.py when they run in the same process
+_publishers = {}
+
+
+def get_publisher(directory):
+    """
+    Returns the Publisher for a directory, creating it on first use.
+    """
+    if directory not in _publishers:
+        _publishers[directory] = Publisher(directory)
+    return _publishers[directory]
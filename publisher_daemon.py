@@ -0,0 +1,228 @@
+# Publisher Daemon
+# One asyncio service on the host that runs every publisher (events.py departures, news.py
+# headlines) as a scheduled job, in place of one blocking `while True` loop per script. The jobs
+# share:
+#   - one requests.Session, so connections to Google and GNews are pooled and kept alive
+#   - one QuotaBudget (see quota.py) for the upstream daily quotas
+#   - one Schedule (see schedule.py): the sign's operating hours and schedule.json overrides
+#   - one clock: each tick hands every due job the same local time
+# Blocking API calls run on a single worker thread so the loop stays free for file_server.py,
+# which the daemon can host in the same process (--port) and wake as soon as a file is published.
+#
+# To add a publisher, subclass Job and add it in build_jobs().
+#
+# Usage:
+#   python publisher_daemon.py [--jobs events,news] [--start 6] [--end 21] [--port 8080]
+
+import argparse
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from publisher import get_publisher
+from quota import QuotaBudget
+from schedule import Schedule, load_overrides, weekly_hours
+
+try:
+    from creds import secrets
+except ImportError as e:
+    print(f"Import Error: {e}")
+    secrets = {}
+
+SCHEDULE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'schedule.json')
+# seconds before a job that raised is run again
+RETRY_INTERVAL = 60
+
+
+class Job:
+    """
+    A scheduled publisher. run() does one pass and returns the seconds until it wants to run again.
+    """
+    name = 'job'
+
+    def __init__(self, session, budget):
+        self.session = session
+        self.budget = budget
+
+    def run(self, now):
+        """
+        Args:
+            now (float): Epoch time of this tick, shared by every job.
+
+        Returns:
+            float: Seconds until the next run.
+        """
+        raise NotImplementedError
+
+
+class EventsJob(Job):
+    """
+    Plans departures for upcoming calendar events and publishes the next one (see events.py).
+    """
+    name = 'events'
+
+    def __init__(self, session, budget, lookahead_days=3):
+        super().__init__(session, budget)
+        import events
+        self.events = events
+        budget.register('directions', secrets.get('directions daily quota', 1000), 0)
+        self.planner = events.DeparturePlanner(cache=events.DirectionsCache(self.fetch_directions),
+                                               lookahead_days=lookahead_days)
+        self.published = None
+
+    def fetch_directions(self, event):
+        if self.budget.remaining('directions') <= 0:
+            print("Directions quota used up, keeping cached departures")
+            return None
+        self.budget.spend('directions')
+        return self.events.get_directions(event, self.session)
+
+    def run(self, now):
+        self.planner.plan(now)
+        next_event = self.planner.next_departure()
+        if next_event is not None or self.published is not None:
+            self.events.write_to_json(next_event)
+        self.published = next_event
+        return self.planner.seconds_until_change(now)
+
+
+class NewsJob(Job):
+    """
+    Publishes top headlines (see news.py). Each request fetches a batch, and the fresh articles that
+    have not been published yet are rotated through until the news quota allows the next request.
+    """
+    name = 'news'
+
+    def __init__(self, session, budget, news_source='gnews', article_count=5):
+        super().__init__(session, budget)
+        import news
+        from headlines import HeadlineRotation
+        self.news = news
+        self.news_source = news_source
+        self.article_count = article_count
+        self.rotation = HeadlineRotation()
+        # Free GNews plan allows for up to 100 requests per day
+        budget.register('news', secrets.get('news daily quota', 100), 60 * 12)
+        self.last_request = None
+
+    def run(self, now):
+        monotonic = time.monotonic()
+        if not self.rotation.queue and self.budget.ready('news', self.last_request):
+            self.budget.spend('news')
+            self.last_request = monotonic
+            json_data = self.news.retrieve_headlines(self.news_source, self.article_count, session=self.session)
+            if json_data is not None and json_data.get('articles'):
+                queued = self.rotation.load(self.news.create_article_list(json_data), self.budget.interval('news'),
+                                            monotonic)
+                print(f"Headlines: {queued} new of {len(json_data['articles'])}")
+            else:
+                print("No headlines found")
+        article = self.rotation.next(monotonic)
+        if article is not None:
+            self.news.write_to_json(article)
+        if self.rotation.queue:
+            return self.rotation.next_at - monotonic
+        return self.budget.interval('news')
+
+
+class PublisherDaemon:
+    def __init__(self, schedule, budget=None, session=None):
+        """
+        Args:
+            schedule (Schedule): Operating hours; jobs only run while open.
+            budget (QuotaBudget, optional): Shared quota budget. Defaults to one over `schedule`.
+            session (requests.Session, optional): Shared HTTP session. Defaults to a new one.
+        """
+        self.schedule = schedule
+        self.budget = budget or QuotaBudget(schedule)
+        self.session = session or requests.Session()
+        self.jobs = []
+        # job -> monotonic time it is next due
+        self.due = {}
+        # blocking API calls run here, one at a time
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+    def add(self, job):
+        self.jobs.append(job)
+        self.due[job] = 0.0
+        return job
+
+    def _run_job(self, job, now):
+        try:
+            return job.run(now)
+        except Exception as e:
+            print(f"{job.name} failed: {e}")
+            return RETRY_INTERVAL
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            local_time = time.localtime()
+            transition = self.schedule.next_transition(local_time)
+            if not self.schedule.is_open(local_time):
+                # sleep until opening (re-checked hourly in case the clock jumps)
+                wait = min(transition or 3600, 3600)
+                print(f"Closed, sleeping {int(wait)} seconds")
+                await asyncio.sleep(wait)
+                continue
+
+            self.budget.update(local_time, time.strftime('%z', local_time))
+            now = time.time()
+            monotonic = time.monotonic()
+            for job in self.jobs:
+                if self.due[job] <= monotonic:
+                    delay = await loop.run_in_executor(self.executor, self._run_job, job, now)
+                    self.due[job] = time.monotonic() + delay
+
+            wait = min(self.due.values()) - time.monotonic() if self.jobs else 3600
+            if transition is not None:
+                wait = min(wait, transition)
+            await asyncio.sleep(max(1, wait))
+
+
+def build_jobs(daemon, names, news_source='gnews'):
+    """
+    Adds the named jobs to the daemon. New publishers go here.
+    """
+    for name in names:
+        if name == 'events':
+            daemon.add(EventsJob(daemon.session, daemon.budget))
+        elif name == 'news':
+            daemon.add(NewsJob(daemon.session, daemon.budget, news_source))
+        else:
+            print(f"Unknown job: {name}")
+
+
+async def serve(names, start_time=6, end_time=21, news_source='gnews', port=None):
+    # hours are inclusive in the old scripts: 6-21 ran until 21:59
+    schedule = Schedule(weekly_hours(start_time, end_time + 1, weekend_delay=0), load_overrides(SCHEDULE_PATH))
+    daemon = PublisherDaemon(schedule)
+    build_jobs(daemon, names, news_source)
+    if port is not None:
+        import file_server
+        directory = secrets['JSON file location']
+        server = file_server.FileServer(directory, port=port)
+        server.attach(get_publisher(directory))
+        await server.start()
+    await daemon.run()
+
+
+def main(names=('events', 'news'), start_time=6, end_time=21, news_source='gnews', port=None):
+    try:
+        asyncio.run(serve(names, start_time, end_time, news_source, port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the event and headline publishers.")
+    parser.add_argument("--jobs", default="events,news", help="comma-separated jobs to run")
+    parser.add_argument("--start", type=int, default=6, help="opening hour")
+    parser.add_argument("--end", type=int, default=21, help="last operating hour (inclusive)")
+    parser.add_argument("--news-source", default="gnews", help="gnews or newsapi")
+    parser.add_argument("--port", type=int, help="also serve the published files on this port (see file_server.py)")
+    arguments = parser.parse_args()
+    main(arguments.jobs.split(','), arguments.start, arguments.end, arguments.news_source, arguments.port)
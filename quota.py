@@ -0,0 +1,261 @@
+# Quota
+# Token-bucket budget for upstream API quotas. Each provider has a daily quota; its bucket refills
+# at the rate that spreads what is left of the quota evenly over the operating hours left in the
+# quota day, so a sign that opens late or reboots mid-day still lands on its quota. A fetch needs a
+# token and must wait the provider's interval: the longer of its configured minimum and the even
+# spread (less a reserve). The reserve builds up spare tokens that are spent at the fast interval
+# while data is changing quickly (trains arriving).
+#
+# Quotas reset at UTC midnight (OpenWeather, GNews, WMATA), so the quota day follows UTC. Usage is
+# kept in microcontroller.nvm and survives reboots within the same quota day. NVM is flash, so usage
+# is only written when a provider's usage crosses another save_step share of its quota (and on
+# forced saves before a reset); a power loss undercounts at most that share.
+#
+# Layout at `offset` in NVM (little-endian):
+#   magic "DCQB" | version u8 | provider count u8 | quota day u32
+#   per provider: name tag 4s | requests used u16 | tokens (hundredths) u16
+
+import struct
+import time
+
+from schedule import DAY_MINUTES, day_number
+from time_utils import offset_minutes
+
+MAGIC = b"DCQB"
+VERSION = 1
+
+HEADER_FORMAT = "<4sBBI"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+PROVIDER_FORMAT = "<4sHH"
+PROVIDER_SIZE = struct.calcsize(PROVIDER_FORMAT)
+MAX_PROVIDERS = 8
+RECORD_SIZE = HEADER_SIZE + PROVIDER_SIZE * MAX_PROVIDERS
+
+
+class QuotaBudget:
+    def __init__(self, schedule, nvm=None, offset=512, min_interval=15 * 60, save_step=0.05):
+        """
+        Args:
+            schedule (Schedule): Operating hours the quotas are spread over.
+            nvm (ByteArray, optional): microcontroller.nvm to keep usage in across reboots. Defaults to None.
+            offset (int, optional): Where the record starts in NVM, clear of warm_boot.py's. Defaults to 512.
+            min_interval (int, optional): Minimum seconds between NVM writes. Defaults to 15 minutes.
+            save_step (float, optional): Share of a daily quota used between NVM writes. Defaults to 5%.
+        """
+        self.schedule = schedule
+        self.nvm = nvm
+        self.offset = offset
+        self.min_interval = min_interval
+        self.save_step = save_step
+        # provider name -> slot index, and per-slot settings and state
+        self.slots = {}
+        self.names = []
+        self.quota = []
+        self.min_wait = []
+        self.fast_wait = []
+        self.reserve = []
+        self.used = []
+        self.tokens = []
+        self.refilled = []
+        # quota day (days since 1 Jan of year 1, UTC) and the open seconds left in it
+        self.day = None
+        self.open_seconds_left = 0
+        self.last_save = time.monotonic()
+        # quota day and per-slot usage last written to NVM
+        self._saved_day = None
+        self._saved_used = []
+
+    def register(self, name, daily_quota, min_interval, fast_interval=None, reserve=0.1):
+        """
+        Adds a provider.
+
+        Args:
+            name (str): Provider name used with ready() and spend(). The first 4 characters tag its NVM slot.
+            daily_quota (int): Requests allowed per UTC day.
+            min_interval (int): Seconds between requests when the quota allows it (the sign's usual refresh).
+            fast_interval (int, optional): Seconds between requests while data is changing fast, using spare
+                tokens. Defaults to min_interval.
+            reserve (float, optional): Share of the quota held back from the even spread for fast periods.
+                Defaults to 0.1.
+        """
+        if len(self.names) >= MAX_PROVIDERS:
+            print("Quota budget full, not registering {}".format(name))
+            return
+        self.slots[name] = len(self.names)
+        self.names.append(name)
+        self.quota.append(daily_quota)
+        self.min_wait.append(min_interval)
+        self.fast_wait.append(min_interval if fast_interval is None else fast_interval)
+        self.reserve.append(reserve)
+        self.used.append(0)
+        self._saved_used.append(0)
+        # a fresh bucket allows the first fetch right away
+        self.tokens.append(1.0)
+        self.refilled.append(time.monotonic())
+
+    def _rate(self, index):
+        # tokens per second that spread the rest of today's quota over the open time left
+        remaining = self.quota[index] - self.used[index]
+        if remaining <= 0:
+            return 0.0
+        return remaining / max(60, self.open_seconds_left)
+
+    def _refill(self, index, now):
+        rate = self._rate(index)
+        # holding a few requests' worth lets fast periods draw ahead of the even spread
+        capacity = max(1.0, min(10.0, self.quota[index] * self.reserve[index]))
+        self.tokens[index] = min(capacity, self.tokens[index] + (now - self.refilled[index]) * rate)
+        self.refilled[index] = now
+
+    def update(self, now, timezone_offset=None):
+        """
+        Starts a new quota day when UTC midnight has passed and recomputes the open time left in it.
+        Call once per loop with the local time.
+
+        Args:
+            now (time.struct_time): Current local time.
+            timezone_offset (str, optional): Local UTC offset like "-0400". Treated as UTC if unknown.
+        """
+        offset = offset_minutes(timezone_offset)
+        minute = now.tm_hour * 60 + now.tm_min
+        local_day = day_number(now.tm_year, now.tm_mon, now.tm_mday)
+        day = local_day + (minute - offset) // DAY_MINUTES
+        monotonic = time.monotonic()
+        for index in range(len(self.names)):
+            self._refill(index, monotonic)
+        if day != self.day:
+            if self.day is not None:
+                print("New quota day, resetting API budgets")
+            self.day = day
+            for index in range(len(self.names)):
+                self.used[index] = 0
+                self.tokens[index] = 1.0
+        # next UTC midnight in minutes after today's local midnight
+        self.open_seconds_left = self.schedule.open_seconds(now, (day - local_day + 1) * DAY_MINUTES + offset)
+
+    def interval(self, name, fast=False):
+        """
+        Returns the seconds to wait between requests to a provider right now.
+        """
+        index = self.slots[name]
+        if fast:
+            return self.fast_wait[index]
+        rate = self._rate(index) * (1 - self.reserve[index])
+        if rate <= 0:
+            return self.open_seconds_left or DAY_MINUTES * 60
+        return max(self.min_wait[index], 1 / rate)
+
+    def ready(self, name, last_request, fast=False):
+        """
+        Returns True if a request to the provider fits the budget now.
+
+        Args:
+            name (str): Provider name.
+            last_request (float): time.monotonic() of the last request, or None if there was none.
+            fast (bool, optional): Data is changing fast, spend spare tokens. Defaults to False.
+        """
+        if name not in self.slots:
+            return last_request is None
+        index = self.slots[name]
+        now = time.monotonic()
+        self._refill(index, now)
+        if self.tokens[index] < 1 or self.used[index] >= self.quota[index]:
+            return False
+        return last_request is None or now - last_request >= self.interval(name, fast)
+
+    def spend(self, name, count=1):
+        """
+        Records requests made to a provider.
+        """
+        if name not in self.slots:
+            return
+        index = self.slots[name]
+        self.tokens[index] = max(0.0, self.tokens[index] - count)
+        self.used[index] += count
+
+    def remaining(self, name):
+        """
+        Returns the requests left in today's quota for a provider.
+        """
+        index = self.slots[name]
+        return max(0, self.quota[index] - self.used[index])
+
+    def summary(self):
+        """
+        Returns the remaining budget as text: name:remaining/quota@interval s, per provider.
+        """
+        return " ".join("{}:{}/{}@{}s".format(name, self.remaining(name), self.quota[index], int(self.interval(name)))
+                        for index, name in enumerate(self.names))
+
+    # --- PERSISTENCE ---
+    def encode(self):
+        record = bytearray(RECORD_SIZE)
+        struct.pack_into(HEADER_FORMAT, record, 0, MAGIC, VERSION, len(self.names), self.day or 0)
+        for index, name in enumerate(self.names):
+            struct.pack_into(PROVIDER_FORMAT, record, HEADER_SIZE + index * PROVIDER_SIZE,
+                             name.encode("utf-8")[:4], min(self.used[index], 0xFFFF),
+                             int(self.tokens[index] * 100) & 0xFFFF)
+        return record
+
+    def restore(self):
+        """
+        Reads usage saved in NVM. Usage from an earlier quota day is dropped by the next update().
+
+        Returns:
+            bool: True if a saved budget was found.
+        """
+        if self.nvm is None or len(self.nvm) < self.offset + RECORD_SIZE:
+            return False
+        record = self.nvm[self.offset:self.offset + RECORD_SIZE]
+        magic, version, count, day = struct.unpack_from(HEADER_FORMAT, record, 0)
+        if magic != MAGIC or version != VERSION:
+            return False
+        for slot in range(min(count, MAX_PROVIDERS)):
+            tag, used, tokens = struct.unpack_from(PROVIDER_FORMAT, record, HEADER_SIZE + slot * PROVIDER_SIZE)
+            for index, name in enumerate(self.names):
+                if name.encode("utf-8")[:4] == tag.rstrip(b"\x00"):
+                    self.used[index] = used
+                    self._saved_used[index] = used
+                    self.tokens[index] = tokens / 100
+        self.day = day
+        self._saved_day = day
+        return True
+
+    def _usage_changed(self, force):
+        # tokens drift every loop; only usage and the day are worth a flash write
+        if self.day != self._saved_day:
+            return True
+        for index in range(len(self.names)):
+            used, saved = self.used[index], self._saved_used[index]
+            if used == saved:
+                continue
+            if force:
+                return True
+            step = max(1, int(self.quota[index] * self.save_step))
+            if used // step != saved // step:
+                return True
+        return False
+
+    def save(self, force=False):
+        """
+        Writes the budget to NVM if usage crossed another save_step of a quota (or, when forced, changed
+        at all) and min_interval has passed since the last write.
+
+        Returns:
+            bool: True if NVM was written.
+        """
+        if self.nvm is None or self.day is None:
+            return False
+        if not force and time.monotonic() - self.last_save < self.min_interval:
+            return False
+        self.last_save = time.monotonic()
+        if not self._usage_changed(force):
+            return False
+        try:
+            self.nvm[self.offset:self.offset + RECORD_SIZE] = self.encode()
+        except Exception as e:
+            print("Failed to save API budget: {}".format(e))
+            return False
+        self._saved_day = self.day
+        self._saved_used = list(self.used)
+        return True
@@ -0,0 +1,128 @@
+# Recorder
+# Wraps the WiFi manager and appends every upstream response (WMATA, OpenWeather, Adafruit IO,
+# tar1090, the publisher) to a trace file so field problems can be replayed on the host with
+# sim/replay.py. API keys in query strings are masked before anything is written.
+#
+# Trace format: JSON Lines. The first line is a header, every other line one response:
+#   {"trace": 1, "start": <epoch>}
+#   {"t": <seconds since start>, "m": "GET", "u": <url>, "s": <status>, "ms": <latency>, "b": <body>}
+# Bodies that aren't UTF-8 are stored as hex in "x" instead of "b". A request that raised is
+# stored with "e": <error message> and no status. CircuitPython only lets code.py write to the
+# filesystem once boot.py has remounted it (storage.remount("/", readonly=False)).
+
+import json
+import time
+
+TRACE_VERSION = 1
+
+# query parameters whose values are never written to a trace
+SECRET_PARAMETERS = ("key", "appid", "apikey", "api_key", "token", "x-aio-key")
+
+
+def redact_url(url):
+    """
+    Masks secret query parameter values in a URL.
+
+    Returns:
+        str: The URL with e.g. appid=abc123 replaced by appid=*.
+    """
+    if "?" not in url:
+        return url
+    base, query = url.split("?", 1)
+    parameters = []
+    for parameter in query.split("&"):
+        name = parameter.split("=", 1)[0]
+        if name.lower() in SECRET_PARAMETERS:
+            parameter = name + "=*"
+        parameters.append(parameter)
+    return base + "?" + "&".join(parameters)
+
+
+class RecordedResponse:
+    """
+    Stand-in for the adafruit_requests response once its body has been read for the trace.
+    """
+
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    @property
+    def text(self):
+        return str(self.content, "utf-8")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def iter_content(self, chunk_size=1, decode_unicode=False):
+        for offset in range(0, len(self.content), chunk_size):
+            yield self.content[offset:offset + chunk_size]
+
+    def close(self):
+        pass
+
+
+class TraceRecorder:
+    def __init__(self, wifi, path="/trace.jsonl"):
+        """
+        Args:
+            wifi (ESPSPI_WiFiManager): WiFi manager whose requests are recorded. Everything other than
+                get()/post() (reset(), connect(), timeout, ...) is passed through.
+            path (str, optional): Trace file, appended to. Defaults to /trace.jsonl.
+        """
+        # set through __dict__ so __setattr__ doesn't forward them to the WiFi manager
+        self.__dict__["wifi"] = wifi
+        self.__dict__["path"] = path
+        self.__dict__["started"] = time.monotonic()
+        self.__dict__["records"] = 0
+        self.__dict__["enabled"] = self._write({"trace": TRACE_VERSION, "start": time.time()})
+
+    def __getattr__(self, name):
+        return getattr(self.wifi, name)
+
+    def __setattr__(self, name, value):
+        setattr(self.wifi, name, value)
+
+    def _write(self, record):
+        try:
+            with open(self.path, "a") as trace_file:
+                trace_file.write(json.dumps(record))
+                trace_file.write("\n")
+            return True
+        except OSError as e:
+            print("Trace recording disabled, can't write {}: {}".format(self.path, e))
+            return False
+
+    def _record(self, method, url, *args, **kwargs):
+        request = getattr(self.wifi, method.lower())
+        if not self.enabled:
+            return request(url, *args, **kwargs)
+        record = {"t": round(time.monotonic() - self.started, 3), "m": method, "u": redact_url(url)}
+        start = time.monotonic()
+        try:
+            response = request(url, *args, **kwargs)
+            content = response.content
+        except Exception as e:
+            record["ms"] = int((time.monotonic() - start) * 1000)
+            record["e"] = str(e)
+            self._write(record)
+            raise
+        record["ms"] = int((time.monotonic() - start) * 1000)
+        record["s"] = response.status_code
+        try:
+            record["b"] = str(content, "utf-8")
+        except UnicodeError:
+            record["x"] = "".join("{:02x}".format(byte) for byte in content)
+        recorded = RecordedResponse(response.status_code, response.headers, content)
+        response.close()
+        del response
+        self.__dict__["enabled"] = self._write(record)
+        self.__dict__["records"] = self.records + 1
+        return recorded
+
+    def get(self, url, *args, **kwargs):
+        return self._record("GET", url, *args, **kwargs)
+
+    def post(self, url, *args, **kwargs):
+        return self._record("POST", url, *args, **kwargs)
@@ -0,0 +1,87 @@
+# Remote Control
+# Event-driven control channel over Adafruit IO MQTT. Settings feeds (start/end hour) and the
+# command feed are subscribed once; values apply as soon as they arrive instead of being polled
+# with an HTTPS request every loop.
+
+from mqtt_manager import MQTTManager, TLS_PORT
+
+AIO_BROKER = "io.adafruit.com"
+
+# setting name -> (secrets key for the feed, default feed key)
+SETTING_FEEDS = {
+    "start_time": ("aio start time", "start-time"),
+    "end_time": ("aio end time", "end-time"),
+}
+COMMAND_FEED = ("aio command", "command")
+
+
+class RemoteControl:
+    def __init__(self, esp, secrets, on_setting, on_command):
+        """
+        Args:
+            esp: The ESP32SPI control object used for sockets.
+            secrets (dict): secrets.py dict with 'aio username', 'aio key' and optional feed keys.
+            on_setting (callable): on_setting(name, value) called with a validated setting.
+            on_command (callable): on_command(command) called with an upper-cased command string.
+        """
+        self.username = secrets["aio username"]
+        self.on_setting = on_setting
+        self.on_command = on_command
+        # last applied value per setting, to ignore repeats
+        self.settings = {}
+
+        self.mqtt = MQTTManager(
+            esp,
+            secrets,
+            broker=AIO_BROKER,
+            # the AIO key is the password, so it only goes out over TLS
+            port=TLS_PORT,
+            username=self.username,
+            password=secrets["aio key"],
+            is_ssl=True,
+        )
+        # feed topic -> setting name
+        self._setting_topics = {}
+        for name in SETTING_FEEDS:
+            secrets_key, default_feed = SETTING_FEEDS[name]
+            topic = self.feed_topic(secrets.get(secrets_key, default_feed))
+            self._setting_topics[topic] = name
+            self.mqtt.subscribe(topic, self._handle_setting)
+        self.command_topic = self.feed_topic(secrets.get(COMMAND_FEED[0], COMMAND_FEED[1]))
+        self.mqtt.subscribe(self.command_topic, self._handle_command)
+        self.mqtt.on_connect = self._request_settings
+
+    def feed_topic(self, feed_key):
+        return "{}/feeds/{}".format(self.username, feed_key)
+
+    def loop(self, timeout=1):
+        return self.mqtt.loop(timeout)
+
+    def wait(self, seconds):
+        self.mqtt.wait(seconds)
+
+    def _request_settings(self, mqtt):
+        # Adafruit IO re-sends a feed's last value when anything is published to <feed>/get,
+        # so settings are current right after boot without an HTTP request
+        for topic in self._setting_topics:
+            mqtt.publish(topic + "/get", "")
+
+    def _handle_setting(self, topic, message):
+        name = self._setting_topics[topic]
+        try:
+            value = int(message)
+        except ValueError:
+            print("Ignoring invalid {} value: {}".format(name, message))
+            return
+        if not 0 <= value <= 23:
+            print("Ignoring out of range {} value: {}".format(name, value))
+            return
+        if self.settings.get(name) == value:
+            return
+        self.settings[name] = value
+        self.on_setting(name, value)
+
+    def _handle_command(self, topic, message):
+        command = message.strip().upper()
+        if command:
+            self.on_command(command)
@@ -0,0 +1,196 @@
+# Schedule
+# Operating hours: when the sign shows trains and how long it can sleep when it doesn't. A weekly
+# table gives each weekday's (open minute, close minute) and a date-keyed override list replaces
+# single days (holidays, late-night service). Weekdays follow time.struct_time (Monday = 0) and
+# minutes count from local midnight; a close past 24:00 runs into the next day, and a day whose
+# opening is not before its closing stays closed.
+#
+# The hours that apply today (including yesterday's service running past midnight) and the next
+# opening are worked out once per day, so is_open() and next_transition() are constant time.
+#
+# /schedule.json holds the overrides, loaded once at boot:
+#   {"overrides": [{"date": "2025-12-25", "open": "07:00", "close": "21:00"},
+#                  {"date": "2025-12-31", "open": "06:00", "close": "26:00"},
+#                  {"date": "2026-01-01", "closed": true}]}
+
+import json
+
+DAY_MINUTES = 24 * 60
+
+_DAYS_BEFORE_MONTH = (0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334)
+
+
+def day_number(year, month, day):
+    """
+    Returns the proleptic Gregorian ordinal of a date (1 Jan of year 1 is 1), as datetime.date.toordinal().
+    """
+    previous_year = year - 1
+    leap_day = 1 if month > 2 and year % 4 == 0 and (year % 100 != 0 or year % 400 == 0) else 0
+    return (previous_year * 365 + previous_year // 4 - previous_year // 100 + previous_year // 400
+            + _DAYS_BEFORE_MONTH[month - 1] + leap_day + day)
+
+
+def parse_minutes(text):
+    """
+    Converts "HH:MM" to minutes after midnight. Hours past 23 mean the next morning.
+    """
+    hours, minutes = text.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def weekly_hours(start_hour, end_hour, weekend_delay=60):
+    """
+    Builds the default weekly table from the sign's start_time/end_time hours.
+
+    Args:
+        start_hour (int): Opening hour on weekdays.
+        end_hour (int): Closing hour.
+        weekend_delay (int, optional): Minutes the Metro opens later on Saturday and Sunday. Defaults to 60.
+
+    Returns:
+        tuple: Seven (open minute, close minute) pairs, Monday first.
+    """
+    weekday = (start_hour * 60, end_hour * 60)
+    weekend = (start_hour * 60 + weekend_delay, end_hour * 60)
+    return (weekday,) * 5 + (weekend,) * 2
+
+
+def load_overrides(path):
+    """
+    Reads date overrides from a schedule file (format above).
+
+    Returns:
+        dict: day_number() -> (open minute, close minute); empty if the file is missing or invalid.
+    """
+    try:
+        with open(path, "r") as f:
+            entries = json.load(f).get("overrides", [])
+    except OSError:
+        return {}
+    except ValueError as e:
+        print("Failed to read schedule overrides: {}".format(e))
+        return {}
+
+    overrides = {}
+    for entry in entries:
+        try:
+            year, month, day = (int(part) for part in entry["date"].split("-"))
+            if entry.get("closed"):
+                hours = (0, 0)
+            else:
+                hours = (parse_minutes(entry["open"]), parse_minutes(entry["close"]))
+            overrides[day_number(year, month, day)] = hours
+        except (KeyError, ValueError) as e:
+            print("Skipping schedule override {}: {}".format(entry, e))
+    return overrides
+
+
+class Schedule:
+    def __init__(self, hours, overrides=None):
+        """
+        Args:
+            hours (tuple): Seven (open minute, close minute) pairs, Monday first (see weekly_hours()).
+            overrides (dict, optional): day_number() -> (open minute, close minute) (see load_overrides()).
+        """
+        self.hours = hours
+        self.overrides = overrides or {}
+        # day_number() the cached answers below are for
+        self._day = None
+        # open intervals today as (start, end) minutes after midnight, and the next opening after them
+        self._intervals = ()
+        self._next_open = None
+        # tomorrow's hours in minutes after today's midnight, or None if closed
+        self._tomorrow = None
+
+    def set_hours(self, hours):
+        """
+        Replaces the weekly table (e.g. after a remote start/end hour change), keeping the overrides.
+        """
+        self.hours = hours
+        self._day = None
+
+    def hours_on(self, day, weekday):
+        """
+        Returns the (open minute, close minute) pair for a day_number() falling on `weekday`.
+        """
+        return self.overrides.get(day, self.hours[weekday])
+
+    def _load_day(self, now):
+        day = day_number(now.tm_year, now.tm_mon, now.tm_mday)
+        if day == self._day:
+            return
+        intervals = []
+        # yesterday's service running past midnight
+        open_minute, close_minute = self.hours_on(day - 1, (now.tm_wday - 1) % 7)
+        if open_minute < close_minute and close_minute > DAY_MINUTES:
+            intervals.append((0, close_minute - DAY_MINUTES))
+        open_minute, close_minute = self.hours_on(day, now.tm_wday)
+        if open_minute < close_minute:
+            if intervals and open_minute <= intervals[-1][1]:
+                intervals[-1] = (0, max(close_minute, intervals[-1][1]))
+            else:
+                intervals.append((open_minute, close_minute))
+        open_minute, close_minute = self.hours_on(day + 1, (now.tm_wday + 1) % 7)
+        self._tomorrow = (DAY_MINUTES + open_minute, DAY_MINUTES + close_minute) if open_minute < close_minute else None
+        # first opening after today's hours, within the next week
+        self._next_open = None
+        for days in range(1, 8):
+            open_minute, close_minute = self.hours_on(day + days, (now.tm_wday + days) % 7)
+            if open_minute < close_minute:
+                self._next_open = days * DAY_MINUTES + open_minute
+                break
+        self._intervals = tuple(intervals)
+        self._day = day
+
+    def is_open(self, now):
+        """
+        Returns True if the sign should be showing trains at `now` (a local time.struct_time).
+        """
+        self._load_day(now)
+        minute = now.tm_hour * 60 + now.tm_min
+        for start, end in self._intervals:
+            if start <= minute < end:
+                return True
+        return False
+
+    def next_transition(self, now):
+        """
+        Returns the seconds from `now` (a local time.struct_time) until the sign next opens (if closed)
+        or closes (if open), or None if it doesn't open again within a week.
+        """
+        self._load_day(now)
+        minute = now.tm_hour * 60 + now.tm_min
+        for start, end in self._intervals:
+            if minute < start:
+                return (start - minute) * 60 - now.tm_sec
+            if minute < end:
+                return (end - minute) * 60 - now.tm_sec
+        if self._next_open is None:
+            return None
+        return (self._next_open - minute) * 60 - now.tm_sec
+
+    def open_seconds(self, now, until):
+        """
+        Returns how many seconds the sign is open from `now` to `until`, given in minutes after
+        today's midnight (up to the end of tomorrow).
+        """
+        self._load_day(now)
+        minute = now.tm_hour * 60 + now.tm_min + now.tm_sec / 60
+        total = 0
+        covered = minute
+        intervals = self._intervals + ((self._tomorrow,) if self._tomorrow else ())
+        for start, end in intervals:
+            start = max(start, covered)
+            end = min(end, until)
+            if end > start:
+                total += end - start
+                covered = end
+        return int(total * 60)
+
+    def seconds_until_open(self, now):
+        """
+        Returns the seconds from `now` to the next opening: 0 while open, None if it doesn't open within a week.
+        """
+        if self.is_open(now):
+            return 0
+        return self.next_transition(now)
@@ -0,0 +1,257 @@
+# DC Metro Sign host simulator
+# Runs code.py, display_manager.py and the parsers unmodified on CPython by putting drop-in
+# stand-ins for board, busio, digitalio, neopixel, microcontroller, displayio, terminalio and the
+# Adafruit hardware libraries (sim/modules) first on the import path. A virtual clock replaces
+# time.sleep()/time.monotonic(), the fake WiFi manager answers from recorded responses
+# (sim/fixtures) and the display renders into a virtual 128x32 framebuffer.
+#
+# Usage:
+#   python -m sim --duration 3600            # one virtual hour, as fast as possible
+#
+#   from sim import Simulation
+#   with Simulation(duration=600) as simulation:
+#       sign = simulation.load_code()        # code.py globals, main() not started
+#       sign["get_trains"]()
+#
+# Simulation(backend="numpy") rasterizes frames with sim/raster.py (requires numpy).
+
+import builtins
+import gc
+import json
+import os
+import runpy
+import sys
+import time
+
+from sim import runtime
+from sim.clock import SimulationFinished, VirtualClock
+from sim.http import FakeResponse, ResponseTable
+
+SIM_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIRECTORY = os.path.dirname(SIM_DIRECTORY)
+MODULES_DIRECTORY = os.path.join(SIM_DIRECTORY, "modules")
+DEFAULT_FIXTURES = os.path.join(SIM_DIRECTORY, "fixtures", "responses.json")
+
+# simulated heap size reported by gc.mem_free()
+HEAP_SIZE = 192 * 1024
+
+DEFAULT_SECRETS = {
+    "ssid": "simulated",
+    "password": "simulated",
+    "timezone": "America/New_York",
+    "station code": "A03",
+    "station index": 14,
+    "wmata api key": "sim",
+    "openweather api key": "sim",
+    "dc coords x": "38.9096",
+    "dc coords y": "-77.0434",
+    "aio username": "sim",
+    "aio key": "sim",
+    "aio train": "train",
+    "aio plane": "plane",
+    "aio event": "event",
+    "aio headline": "headline",
+    "aio loop counter": "loop-counter",
+    "plane data json url": "http://tar1090.local/tar1090/data/aircraft.json",
+    "event data json url": "http://publisher.local/next_event.json",
+    "gnews api key": "sim",
+    "news api key": "sim",
+}
+
+
+def aio_time_struct(method, url, headers, body):
+    """
+    Answers Adafruit IO's time/struct integration from the virtual clock. Like Adafruit IO,
+    wday counts from Sunday = 0 and yday from 1.
+    """
+    now = time.localtime()
+    return FakeResponse(200, json.dumps({
+        "year": now.tm_year, "mon": now.tm_mon, "mday": now.tm_mday,
+        "hour": now.tm_hour, "min": now.tm_min, "sec": now.tm_sec,
+        "wday": (now.tm_wday + 1) % 7, "yday": now.tm_yday, "isdst": max(now.tm_isdst, 0),
+    }))
+
+
+def aio_time_strftime(method, url, headers, body):
+    return FakeResponse(200, time.strftime("%z", time.localtime()))
+
+
+class Simulation:
+    def __init__(self, duration=None, speed=0, start_epoch=None, fixtures=DEFAULT_FIXTURES, secrets=None,
+                 root=ROOT_DIRECTORY, timezone="America/New_York", backend="python", latency=0.0, esp_restart=0.0):
+        """
+        Args:
+            duration (float, optional): Virtual seconds to run before stopping. None runs until stopped.
+            speed (float, optional): Virtual seconds per real second, 0 for unthrottled. Defaults to 0.
+            start_epoch (float, optional): Virtual wall clock start. Defaults to now.
+            fixtures (str or ResponseTable, optional): Recorded responses file or a prepared table.
+            secrets (dict, optional): Overrides merged into DEFAULT_SECRETS.
+            root (str, optional): Directory holding code.py and the device filesystem.
+            timezone (str, optional): TZ used for the virtual local time. Defaults to America/New_York.
+            backend (str, optional): Framebuffer backend, "python" or "numpy". Defaults to "python".
+            latency (float, optional): Virtual seconds charged to every request, on top of a trace's
+                own latency. Defaults to 0.
+            esp_restart (float, optional): Virtual seconds charged to the first request after the
+                ESP32 is reset (boot and WiFi join). Defaults to 0.
+        """
+        self.root = root
+        self.timezone = timezone
+        if backend not in ("python", "numpy"):
+            raise ValueError("Unknown framebuffer backend: {}".format(backend))
+        self.backend = backend
+        self.latency = latency
+        self.esp_restart = esp_restart
+        self.clock = VirtualClock(start_epoch, speed, duration)
+        if isinstance(fixtures, ResponseTable):
+            self.responses = fixtures
+        else:
+            self.responses = ResponseTable()
+            if fixtures:
+                self.responses.load(fixtures)
+        # time integrations always follow the virtual clock
+        self.responses.add(r"/integrations/time/struct", handler=aio_time_struct, first=True)
+        self.responses.add(r"/integrations/time/strftime", handler=aio_time_strftime, first=True)
+        self.secrets = dict(DEFAULT_SECRETS)
+        self.secrets.update(secrets or {})
+        self.code = None
+        self._saved = None
+        # idle power proxies: virtual seconds with the panels lit, the ESP32 out of reset, and the CPU in light sleep
+        self.power = {"panel_on_seconds": 0.0, "radio_on_seconds": 0.0, "light_sleep_seconds": 0.0}
+        self._metered = 0.0
+
+    # --- INSTALL ---
+    def _open(self, file, *args, **kwargs):
+        # device paths like /stations/RD_Ordered.txt resolve against the repo root
+        if isinstance(file, str) and file.startswith("/") and not os.path.exists(file):
+            candidate = os.path.join(self.root, file.lstrip("/"))
+            if os.path.exists(candidate):
+                file = candidate
+        return self._saved["open"](file, *args, **kwargs)
+
+    def _mem_free(self):
+        import tracemalloc
+        used = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+        return max(0, HEAP_SIZE - used)
+
+    def install(self):
+        secrets_module = type(sys)("secrets")
+        secrets_module.secrets = self.secrets
+        self._saved = {
+            "open": builtins.open,
+            "path": list(sys.path),
+            "modules": set(sys.modules),
+            "secrets": sys.modules.get("secrets"),
+            "TZ": os.environ.get("TZ"),
+            "mem_free": getattr(gc, "mem_free", None),
+        }
+        sys.path.insert(0, MODULES_DIRECTORY)
+        sys.path.insert(1, self.root)
+        sys.modules["secrets"] = secrets_module
+        builtins.open = self._open
+        gc.mem_free = self._mem_free
+        os.environ["TZ"] = self.timezone
+        time.tzset()
+        self.clock.install()
+        runtime.clock = self.clock
+        runtime.responses = self.responses
+        runtime.backend = self.backend
+        runtime.latency = self.latency
+        runtime.esp_restart = self.esp_restart
+        self.clock.listeners.append(self._meter)
+        return self
+
+    def uninstall(self):
+        if self._saved is None:
+            return
+        self.clock.uninstall()
+        if self._meter in self.clock.listeners:
+            self.clock.listeners.remove(self._meter)
+        builtins.open = self._saved["open"]
+        sys.path[:] = self._saved["path"]
+        for name in set(sys.modules) - self._saved["modules"]:
+            if not name.startswith("sim"):
+                del sys.modules[name]
+        if self._saved["secrets"] is not None:
+            sys.modules["secrets"] = self._saved["secrets"]
+        else:
+            sys.modules.pop("secrets", None)
+        if self._saved["mem_free"] is None:
+            del gc.mem_free
+        if self._saved["TZ"] is None:
+            os.environ.pop("TZ", None)
+        else:
+            os.environ["TZ"] = self._saved["TZ"]
+        time.tzset()
+        runtime.clock = runtime.responses = runtime.wifi = runtime.display = runtime.esp = None
+        runtime.light_sleeping = False
+        runtime.backend = "python"
+        runtime.latency = runtime.esp_restart = 0.0
+        self._saved = None
+
+    def _meter(self, elapsed):
+        # the state at the end of a sleep is the state it was taken in
+        seconds = elapsed - self._metered
+        self._metered = elapsed
+        if runtime.display is not None and runtime.display.brightness:
+            self.power["panel_on_seconds"] += seconds
+        if runtime.esp is not None and runtime.esp.powered:
+            self.power["radio_on_seconds"] += seconds
+        if runtime.light_sleeping:
+            self.power["light_sleep_seconds"] += seconds
+
+    def __enter__(self):
+        return self.install()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.uninstall()
+        return False
+
+    # --- RUN ---
+    def load_code(self):
+        """
+        Executes code.py's module level setup without starting main().
+
+        Returns:
+            dict: code.py's globals; functions in it use the simulated hardware.
+        """
+        namespace = runpy.run_path(os.path.join(self.root, "code.py"), run_name="sign_code")
+        # run_path returns a copy; the functions' own globals are what main() actually reads
+        self.code = namespace["main"].__globals__
+        return self.code
+
+    def run(self):
+        """
+        Runs code.py's main() until the virtual duration elapses or the sign resets.
+
+        Returns:
+            dict: Run statistics (see stats()).
+        """
+        from microcontroller import SimulationReset
+
+        if self.code is None:
+            self.load_code()
+        try:
+            self.code["main"]()
+        except SimulationFinished:
+            pass
+        except SimulationReset:
+            print("Simulated microcontroller.reset()")
+        return self.stats()
+
+    def frame(self):
+        """
+        Returns the current framebuffer of the virtual display (see VirtualDisplay.frame()).
+        """
+        return runtime.display.frame() if runtime.display is not None else None
+
+    def stats(self):
+        return {
+            "virtual_seconds": round(self.clock.elapsed, 3),
+            "sleep_calls": self.clock.sleep_calls,
+            "requests": len(self.responses.log),
+            "requests_by_host": self.responses.counts(),
+            "wifi_resets": runtime.wifi.resets if runtime.wifi is not None else 0,
+            "display_refreshes": runtime.display.root_group_sets if runtime.display is not None else 0,
+            "resets": runtime.resets,
+            "power": {name: round(value, 1) for name, value in self.power.items()},
+        }
@@ -0,0 +1,68 @@
+# Command line entry point: python -m sim [--duration SECONDS] [--speed FACTOR] [--fixtures FILE] [--trace FILE]
+
+import argparse
+import json
+import time
+
+from sim import DEFAULT_FIXTURES, Simulation
+from sim.framebuffer import to_text
+from sim.http import ResponseTable
+from sim.replay import TraceReplay
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the DC Metro Sign main loop on a virtual clock.")
+    parser.add_argument("--duration", type=float, default=3600, help="virtual seconds to run (default: 3600)")
+    parser.add_argument("--speed", type=float, default=0,
+                        help="virtual seconds per real second, 0 for unthrottled (default: 0)")
+    parser.add_argument("--start", help="virtual start time as YYYY-MM-DDTHH:MM (local), default: now")
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES, help="recorded responses JSON")
+    parser.add_argument("--trace", help="recorded trace (recorder.py) served ahead of the fixtures")
+    parser.add_argument("--trace-speed", type=float, default=1.0,
+                        help="trace seconds per virtual second (default: 1)")
+    parser.add_argument("--latency", type=float,
+                        help="upstream latency in ms for every request (with --trace: instead of the recorded one)")
+    parser.add_argument("--esp-restart", type=float, default=0.0,
+                        help="seconds the first request after an ESP32 reset waits for boot and WiFi join")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of trace requests answered with 503")
+    parser.add_argument("--truncate-rate", type=float, default=0.0, help="fraction of trace bodies cut short")
+    parser.add_argument("--seed", type=int, help="seed for injected faults")
+    parser.add_argument("--backend", choices=("python", "numpy"), default="python", help="framebuffer backend")
+    parser.add_argument("--show", action="store_true", help="print the final frame as text")
+    parser.add_argument("--png", help="write the final frame to a PNG file (numpy backend)")
+    arguments = parser.parse_args()
+
+    fixtures = arguments.fixtures
+    replay = None
+    if arguments.trace:
+        fixtures = ResponseTable()
+        if arguments.fixtures:
+            fixtures.load(arguments.fixtures)
+        replay = TraceReplay.from_file(arguments.trace, speed=arguments.trace_speed, latency=arguments.latency,
+                                       error_rate=arguments.error_rate, truncate_rate=arguments.truncate_rate,
+                                       seed=arguments.seed)
+        replay.attach(fixtures)
+
+    simulation = Simulation(duration=arguments.duration, speed=arguments.speed, fixtures=fixtures,
+                            backend=arguments.backend,
+                            latency=arguments.latency / 1000 if arguments.latency and replay is None else 0.0,
+                            esp_restart=arguments.esp_restart)
+    with simulation:
+        if arguments.start:
+            # parsed after install so the start is local to the simulation's timezone
+            simulation.clock.start_epoch = time.mktime(time.strptime(arguments.start, "%Y-%m-%dT%H:%M"))
+        stats = simulation.run()
+        if replay is not None:
+            stats["replay"] = replay.stats()
+        frame = simulation.frame()
+    if arguments.show and frame is not None:
+        print(to_text(frame))
+    if arguments.png and frame is not None:
+        from sim.raster import to_png
+        with open(arguments.png, "wb") as png_file:
+            png_file.write(to_png(frame))
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
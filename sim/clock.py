@@ -0,0 +1,90 @@
+# Virtual clock for the simulator. Replaces time.sleep(), time.monotonic() and time.time()
+# so the sign's loop runs at accelerated (or unthrottled) speed against a virtual wall clock.
+
+import time
+
+
+class SimulationFinished(BaseException):
+    """
+    Raised from sleep() once the simulated duration has elapsed. Derives from BaseException so
+    the sign's `except Exception` handlers don't swallow it.
+    """
+
+
+class VirtualClock:
+    def __init__(self, start_epoch=None, speed=0, duration=None):
+        """
+        Args:
+            start_epoch (float, optional): Virtual wall clock start. Defaults to the real current time.
+            speed (float, optional): Virtual seconds per real second. 0 runs as fast as possible. Defaults to 0.
+            duration (float, optional): Virtual seconds after which sleep() raises SimulationFinished.
+        """
+        self.start_epoch = time.time() if start_epoch is None else start_epoch
+        self.speed = speed
+        self.duration = duration
+        # virtual seconds since the start
+        self.elapsed = 0.0
+        self.sleep_calls = 0
+        self.slept = 0.0
+        self._real_sleep = time.sleep
+        # callables run with the elapsed virtual time after every sleep (e.g. frame capture)
+        self.listeners = []
+        self._originals = None
+
+    def monotonic(self):
+        return self.elapsed
+
+    def monotonic_ns(self):
+        return int(self.elapsed * 1000000000)
+
+    def time(self):
+        return self.start_epoch + self.elapsed
+
+    def localtime(self, seconds=None):
+        return self._originals["localtime"](self.time() if seconds is None else seconds)
+
+    def advance(self, seconds):
+        """
+        Moves virtual time forward without sleeping (used to charge simulated work such as network latency).
+        """
+        self.elapsed += max(0.0, seconds)
+
+    def sleep(self, seconds):
+        if self.duration is not None and self.elapsed >= self.duration:
+            raise SimulationFinished()
+        seconds = max(0.0, seconds)
+        if self.duration is not None:
+            seconds = min(seconds, self.duration - self.elapsed)
+        self.sleep_calls += 1
+        self.slept += seconds
+        self.elapsed += seconds
+        if self.speed:
+            self._real_sleep(seconds / self.speed)
+        for listener in self.listeners:
+            listener(self.elapsed)
+        if self.duration is not None and self.elapsed >= self.duration:
+            raise SimulationFinished()
+
+    def install(self):
+        """
+        Patches the time module in place. Modules that did `import time` see the virtual clock.
+        """
+        self._originals = {
+            "sleep": time.sleep,
+            "monotonic": time.monotonic,
+            "monotonic_ns": time.monotonic_ns,
+            "time": time.time,
+            "localtime": time.localtime,
+        }
+        time.sleep = self.sleep
+        time.monotonic = self.monotonic
+        time.monotonic_ns = self.monotonic_ns
+        time.time = self.time
+        time.localtime = self.localtime
+
+    def uninstall(self):
+        if self._originals is None:
+            return
+        for name, function in self._originals.items():
+            setattr(time, name, function)
+        self._originals = None
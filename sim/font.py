@@ -0,0 +1,134 @@
+# Fonts for the simulator: a built-in 5x7 font standing in for terminalio.FONT, and a small
+# BDF reader for the custom fonts in /bdf (used by the adafruit_bitmap_font stand-in).
+#
+# Glyph rows are ints with the leftmost pixel in the highest bit of a `width` bit row.
+
+
+class Glyph:
+    def __init__(self, width, height, dx, dy, shift_x, rows):
+        self.width = width
+        self.height = height
+        # offset of the bitmap's left edge from the pen position
+        self.dx = dx
+        # offset of the bitmap's bottom edge from the baseline (positive is up)
+        self.dy = dy
+        # pen advance
+        self.shift_x = shift_x
+        self.rows = rows
+
+    def pixel(self, column, row):
+        return (self.rows[row] >> (self.width - 1 - column)) & 1
+
+
+# 5x7 glyphs, seven 5-bit rows per character as hex pairs
+_FONT_5X7 = {
+    " ": "00000000000000", "!": "04040404040004", '"': "0A0A0A00000000", "#": "0A0A1F0A1F0A0A",
+    "$": "040F140E051E04", "%": "18190204081303", "&": "0C12140815120D", "'": "0C040800000000",
+    "(": "02040808080402", ")": "08040202020408", "*": "0004150E150400", "+": "0004041F040400",
+    ",": "000000000C0408", "-": "0000001F000000", ".": "00000000000C0C", "/": "00010204081000",
+    "0": "0E11131519110E", "1": "040C040404040E", "2": "0E11010204081F",
+    "3": "1F02040201110E", "4": "02060A121F0202", "5": "1F101E0101110E",
+    "6": "0608101E11110E", "7": "1F010204080808", "8": "0E11110E11110E", "9": "0E11110F01020C",
+    ":": "000C0C000C0C00", ";": "000C0C000C0408", "<": "02040810080402", "=": "00001F001F0000",
+    ">": "08040201020408", "?": "0E110102040004", "@": "0E11010D15150E",
+    "A": "0E1111111F1111", "B": "1E11111E11111E", "C": "0E11101010110E", "D": "1C12111111121C",
+    "E": "1F10101E10101F", "F": "1F10101E101010", "G": "0E11101711110F", "H": "1111111F111111",
+    "I": "0E04040404040E", "J": "0702020202120C", "K": "11121418141211", "L": "1010101010101F",
+    "M": "111B1515111111", "N": "11111915131111", "O": "0E11111111110E", "P": "1E11111E101010",
+    "Q": "0E11111115120D", "R": "1E11111E141211", "S": "0F10100E01011E", "T": "1F040404040404",
+    "U": "1111111111110E", "V": "11111111110A04", "W": "1111111515150A", "X": "11110A040A1111",
+    "Y": "1111110A040404", "Z": "1F01020408101F",
+    "[": "0E08080808080E", "\\": "00100804020100", "]": "0E02020202020E", "^": "040A1100000000",
+    "_": "0000000000001F", "`": "08040200000000",
+    "a": "00000E010F110F", "b": "1010161911111E", "c": "00000E1010110E", "d": "01010D1311110F",
+    "e": "00000E111F100E", "f": "0609081C080808", "g": "000F11110F010E", "h": "10101619111111",
+    "i": "04000C0404040E", "j": "0200060202120C", "k": "10101214181412", "l": "0C04040404040E",
+    "m": "00001A15151111", "n": "00001619111111", "o": "00000E1111110E", "p": "00001E111E1010",
+    "q": "00000D130F0101", "r": "00001619101010", "s": "00000E100E011E", "t": "08081C08080906",
+    "u": "0000111111130D", "v": "00001111110A04", "w": "0000111115150A", "x": "0000110A040A11",
+    "y": "000011110F010E", "z": "00001F0204081F",
+    "{": "02040408040402", "|": "04040404040404", "}": "08040402040408", "~": "00000815020000",
+}
+
+
+class BuiltinFont:
+    """
+    Stand-in for terminalio.FONT: 5x7 glyphs on a 6 pixel advance.
+    """
+
+    ascent = 7
+    descent = 0
+
+    def __init__(self):
+        self._glyphs = {}
+        for char, hex_rows in _FONT_5X7.items():
+            rows = [int(hex_rows[index:index + 2], 16) for index in range(0, 14, 2)]
+            self._glyphs[ord(char)] = Glyph(5, 7, 0, 0, 6, rows)
+        # unknown characters render as a hollow box
+        self._missing = Glyph(5, 7, 0, 0, 6, [0x1F, 0x11, 0x11, 0x11, 0x11, 0x11, 0x1F])
+
+    def get_glyph(self, code):
+        return self._glyphs.get(code, self._missing)
+
+    def get_bounding_box(self):
+        return 6, 12, 0, -2
+
+
+class BDFFont:
+    """
+    Minimal BDF reader: ENCODING, DWIDTH, BBX and BITMAP of every glyph, plus FONT_ASCENT/FONT_DESCENT.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.ascent = 0
+        self.descent = 0
+        self.bounding_box = (0, 0, 0, 0)
+        self._glyphs = {}
+        self._load(path)
+
+    def _load(self, path):
+        with open(path) as bdf_file:
+            lines = iter(bdf_file.read().splitlines())
+        encoding = shift_x = None
+        bbx = (0, 0, 0, 0)
+        for line in lines:
+            parts = line.split()
+            if not parts:
+                continue
+            keyword = parts[0]
+            if keyword == "FONT_ASCENT":
+                self.ascent = int(parts[1])
+            elif keyword == "FONT_DESCENT":
+                self.descent = int(parts[1])
+            elif keyword == "FONTBOUNDINGBOX":
+                self.bounding_box = tuple(int(value) for value in parts[1:5])
+            elif keyword == "ENCODING":
+                encoding = int(parts[1])
+            elif keyword == "DWIDTH":
+                shift_x = int(parts[1])
+            elif keyword == "BBX":
+                bbx = tuple(int(value) for value in parts[1:5])
+            elif keyword == "BITMAP":
+                width, height, dx, dy = bbx
+                rows = []
+                for hex_row in lines:
+                    hex_row = hex_row.strip()
+                    if hex_row == "ENDCHAR":
+                        break
+                    # rows are padded to whole bytes, keep only the leftmost `width` bits
+                    rows.append(int(hex_row, 16) >> (len(hex_row) * 4 - width))
+                # some glyphs in /bdf list fewer rows than their BBX height
+                rows = (rows + [0] * height)[:height]
+                if encoding is not None and encoding >= 0:
+                    self._glyphs[encoding] = Glyph(width, height, dx, dy, shift_x or width, rows)
+                encoding = shift_x = None
+
+    def get_glyph(self, code):
+        return self._glyphs.get(code)
+
+    def get_bounding_box(self):
+        return self.bounding_box
+
+
+FONT = BuiltinFont()
@@ -0,0 +1,164 @@
+# Virtual framebuffer for the simulator. Rasterizes the displayio stand-in group tree (Groups,
+# Labels and TileGrids) into a packed RGB888 bytearray the size of the panel, and reads the BMP
+# sprite sheets used by OnDiskBitmap.
+
+import struct
+
+
+def read_bmp(data):
+    """
+    Decodes an uncompressed 8, 16, 24 or 32 bit BMP.
+
+    Returns:
+        tuple: (width, height, pixels) with pixels as top-down, row-major 0xRRGGBB ints.
+    """
+    if data[:2] != b"BM":
+        raise ValueError("Not a BMP file")
+    pixel_offset = struct.unpack_from("<I", data, 10)[0]
+    header_size, width, height, _, bits, compression = struct.unpack_from("<IiiHHI", data, 14)
+    top_down = height < 0
+    height = abs(height)
+    row_size = ((width * bits + 31) // 32) * 4
+
+    palette = []
+    if bits <= 8:
+        colors = struct.unpack_from("<I", data, 46)[0] or (1 << bits)
+        for index in range(colors):
+            blue, green, red, _ = struct.unpack_from("<BBBB", data, 14 + header_size + index * 4)
+            palette.append((red << 16) | (green << 8) | blue)
+
+    # 16 bit BI_BITFIELDS carries its channel masks after the header; BI_RGB is 5-5-5
+    masks = (0x7C00, 0x03E0, 0x001F)
+    if bits == 16 and compression == 3:
+        masks = struct.unpack_from("<III", data, 14 + 40)
+
+    pixels = [0] * (width * height)
+    for row in range(height):
+        source_row = row if top_down else height - 1 - row
+        offset = pixel_offset + source_row * row_size
+        for column in range(width):
+            if bits == 8:
+                color = palette[data[offset + column]]
+            elif bits == 16:
+                value = struct.unpack_from("<H", data, offset + column * 2)[0]
+                color = 0
+                for shift, mask in zip((16, 8, 0), masks):
+                    channel = value & mask
+                    low_bit = (mask & -mask).bit_length() - 1
+                    channel_max = mask >> low_bit
+                    color |= ((channel >> low_bit) * 255 // channel_max) << shift
+            else:
+                step = bits // 8
+                blue, green, red = data[offset + column * step:offset + column * step + 3]
+                color = (red << 16) | (green << 8) | blue
+            pixels[row * width + column] = color
+    return width, height, pixels
+
+
+def _set_pixel(frame, width, height, x, y, color):
+    if 0 <= x < width and 0 <= y < height:
+        index = (y * width + x) * 3
+        frame[index] = (color >> 16) & 0xFF
+        frame[index + 1] = (color >> 8) & 0xFF
+        frame[index + 2] = color & 0xFF
+
+
+def label_lines(label):
+    """
+    Yields (line_text, baseline_offset) for a label, honoring newlines like adafruit_display_text.
+    """
+    _, box_height, _, _ = label.font.get_bounding_box()
+    line_height = int(box_height * label.line_spacing)
+    for index, line in enumerate((label.text or "").split("\n")):
+        yield line, index * line_height
+
+
+def label_baseline(label, origin_y):
+    # the label's y is the vertical middle of its first line
+    return origin_y + (label.font.ascent - label.font.descent) // 2
+
+
+def _draw_label(frame, width, height, label, origin_x, origin_y):
+    if label.color is None or not label.text:
+        return
+    baseline = label_baseline(label, origin_y)
+    for line, line_offset in label_lines(label):
+        pen_x = origin_x
+        for char in line:
+            glyph = label.font.get_glyph(ord(char))
+            if glyph is None:
+                continue
+            top = baseline + line_offset - glyph.dy - glyph.height
+            for row in range(glyph.height):
+                for column in range(glyph.width):
+                    if glyph.pixel(column, row):
+                        _set_pixel(frame, width, height, pen_x + glyph.dx + column, top + row, label.color)
+            pen_x += glyph.shift_x
+
+
+def _draw_tilegrid(frame, width, height, grid, origin_x, origin_y):
+    bitmap = grid.bitmap
+    tiles_per_row = bitmap.width // grid.tile_width
+    for tile_row in range(grid.height):
+        for tile_column in range(grid.width):
+            tile = grid[tile_column, tile_row]
+            source_x = (tile % tiles_per_row) * grid.tile_width
+            source_y = (tile // tiles_per_row) * grid.tile_height
+            for y in range(grid.tile_height):
+                for x in range(grid.tile_width):
+                    color = bitmap.pixels[(source_y + y) * bitmap.width + source_x + x]
+                    _set_pixel(frame, width, height,
+                               origin_x + tile_column * grid.tile_width + x,
+                               origin_y + tile_row * grid.tile_height + y, color)
+
+
+def _draw(frame, width, height, node, offset_x, offset_y):
+    if getattr(node, "hidden", False):
+        return
+    x = offset_x + node.x
+    y = offset_y + node.y
+    if hasattr(node, "font"):
+        _draw_label(frame, width, height, node, x, y)
+    elif hasattr(node, "tile_width"):
+        _draw_tilegrid(frame, width, height, node, x, y)
+    else:
+        for child in node:
+            _draw(frame, width, height, child, x, y)
+
+
+def render(root_group, width=128, height=32, frame=None):
+    """
+    Rasterizes a group tree into an RGB888 framebuffer.
+
+    Args:
+        root_group: The display's root group.
+        width (int, optional): Panel width. Defaults to 128.
+        height (int, optional): Panel height. Defaults to 32.
+        frame (bytearray, optional): Buffer to reuse; cleared before drawing.
+
+    Returns:
+        bytearray: width * height * 3 bytes, row-major RGB.
+    """
+    if frame is None:
+        frame = bytearray(width * height * 3)
+    else:
+        frame[:] = bytes(len(frame))
+    if root_group is not None:
+        _draw(frame, width, height, root_group, 0, 0)
+    return frame
+
+
+def to_text(frame, width=128, height=32):
+    """
+    Returns the framebuffer as text, one character per pixel ('#' lit, '.' dark), for terminals and diffs.
+    """
+    if hasattr(frame, "tobytes"):
+        frame = frame.tobytes()
+    lines = []
+    for y in range(height):
+        row = []
+        for x in range(width):
+            index = (y * width + x) * 3
+            row.append("#" if frame[index] or frame[index + 1] or frame[index + 2] else ".")
+        lines.append("".join(row))
+    return "\n".join(lines)
@@ -0,0 +1,115 @@
+# Golden frames for display_manager. Puts a fresh display_manager into each state below
+# (update_trains, update_weather, update_event and night mode variants), renders it with the
+# numpy backend and compares the frame with the PNG stored in sim/golden/. A failing state writes
+# the actual frame next to the golden one as <state>.actual.png.
+#
+# Usage:
+#   python -m sim.golden             # check every state, exit status 1 on a mismatch
+#   python -m sim.golden --update    # rewrite the golden PNGs after an intended display change
+#   python -m sim.golden --backend python   # check the pure Python renderer against the same goldens
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from sim import SIM_DIRECTORY, Simulation, runtime
+from sim.raster import from_png, to_png
+
+GOLDEN_DIRECTORY = os.path.join(SIM_DIRECTORY, "golden")
+
+WEATHER = {"icon": "03d", "current_temp": 64, "daily_temp_min": 55, "daily_temp_max": 70, "hourly_next_temp": 64}
+
+
+def _trains(sign, *rows):
+    return [sign["Train"](destination, name, minutes) if destination else None for destination, name, minutes in rows]
+
+
+# state name -> function(display, sign) putting a fresh display_manager into that state
+STATES = {
+    "trains": lambda display, sign: display.update_trains(
+        _trains(sign, ("Shady Grv", "Shady Grove", "3"), ("Glenmont", "Glenmont", "12")), [None, None]),
+    "trains_arriving": lambda display, sign: display.update_trains(
+        _trains(sign, ("Grosvenor", "Grosvenor-Strathmore", "ARR"), ("Silver Spring", "Silver Spring", "BRD")),
+        [None, None]),
+    "trains_historical": lambda display, sign: display.update_trains(
+        [None, None], _trains(sign, ("Shady Grv", "Shady Grove", "7"), ("Glenmont", "Glenmont", "9"))),
+    "trains_missing": lambda display, sign: display.update_trains([None, None], [None, None]),
+    "weather_steady": lambda display, sign: display.update_weather(dict(WEATHER)),
+    "weather_rising": lambda display, sign: display.update_weather(dict(WEATHER, hourly_next_temp=68)),
+    "weather_falling_night": lambda display, sign: display.update_weather(
+        dict(WEATHER, icon="10n", hourly_next_temp=59)),
+    "weather_missing": lambda display, sign: display.update_weather({}),
+    "event_far": lambda display, sign: display.update_event("shady grove", 25),
+    "event_near": lambda display, sign: display.update_event("glenmont", 8),
+    "event_one_minute": lambda display, sign: display.update_event("glenmont", 1),
+    "night": lambda display, sign: display.night_mode_toggle(False),
+}
+
+
+def render_states(backend="numpy", names=None):
+    """
+    Renders each state on a fresh display_manager.
+
+    Returns:
+        dict: state name -> ((height, width, 3) uint8 array, render milliseconds)
+    """
+    frames = {}
+    with Simulation(backend=backend) as simulation:
+        sign = simulation.load_code()
+        display_class = type(sign["display_manager"])
+        for name in names or STATES:
+            display = display_class(runtime.display)
+            STATES[name](display, sign)
+            display.refresh_display()
+            start = time.perf_counter()
+            frame = simulation.frame()
+            elapsed = (time.perf_counter() - start) * 1000
+            if not isinstance(frame, np.ndarray):
+                frame = np.frombuffer(bytes(frame), dtype=np.uint8).reshape(runtime.display.height,
+                                                                             runtime.display.width, 3)
+            frames[name] = (frame.copy(), elapsed)
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check display_manager frames against golden PNGs.")
+    parser.add_argument("--update", action="store_true", help="rewrite the golden PNGs")
+    parser.add_argument("--backend", choices=("python", "numpy"), default="numpy")
+    parser.add_argument("states", nargs="*", help="states to check (default: all)")
+    arguments = parser.parse_args()
+
+    unknown = [name for name in arguments.states if name not in STATES]
+    if unknown:
+        parser.error("unknown states: " + ", ".join(unknown))
+    frames = render_states(arguments.backend, arguments.states)
+    os.makedirs(GOLDEN_DIRECTORY, exist_ok=True)
+    failures = 0
+    for name, (frame, elapsed) in frames.items():
+        path = os.path.join(GOLDEN_DIRECTORY, name + ".png")
+        if arguments.update:
+            with open(path, "wb") as golden_file:
+                golden_file.write(to_png(frame))
+            print(f"{name:<24} updated  ({elapsed:.2f} ms)")
+            continue
+        if not os.path.exists(path):
+            print(f"{name:<24} MISSING  (run with --update)")
+            failures += 1
+            continue
+        with open(path, "rb") as golden_file:
+            golden = from_png(golden_file.read())
+        different = int(np.any(golden != frame, axis=-1).sum()) if golden.shape == frame.shape else frame.size
+        if different:
+            failures += 1
+            with open(os.path.join(GOLDEN_DIRECTORY, name + ".actual.png"), "wb") as actual_file:
+                actual_file.write(to_png(frame))
+            print(f"{name:<24} FAILED   {different} pixels differ ({elapsed:.2f} ms)")
+        else:
+            print(f"{name:<24} ok       ({elapsed:.2f} ms)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
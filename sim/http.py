@@ -0,0 +1,135 @@
+# Fake HTTP layer for the simulator. A ResponseTable maps URL patterns to recorded responses
+# (loaded from a fixtures JSON file) or to handler functions, and FakeResponse mimics the
+# adafruit_requests response object the sign uses.
+#
+# Fixture file format:
+#   {"routes": [
+#       {"match": "api.wmata.com/StationPrediction", "status": 200, "json": {...}},
+#       {"match": "gnews.io", "sequence": [{"json": {...}}, {"status": 429, "text": "..."}]}
+#   ]}
+# "match" is a regular expression searched in the URL. A route with "sequence" answers with each
+# entry in turn and repeats the last one. Routes are tried in order, first match wins.
+# published_directory() serves files written by publisher.py with ETags and 304 responses.
+
+import json
+import re
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, body=b"", headers=None):
+        self.status_code = status_code
+        self.content = body if isinstance(body, bytes) else body.encode("utf-8")
+        self.headers = headers or {}
+        self.closed = False
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def iter_content(self, chunk_size=1, decode_unicode=False):
+        for offset in range(0, len(self.content), chunk_size):
+            yield self.content[offset:offset + chunk_size]
+
+    def close(self):
+        self.closed = True
+
+
+def response_from_entry(entry):
+    """
+    Builds a FakeResponse from a fixture entry with "status" and one of "json", "text" or "body_hex".
+    """
+    if "json" in entry:
+        body = json.dumps(entry["json"])
+    elif "body_hex" in entry:
+        body = bytes.fromhex(entry["body_hex"])
+    else:
+        body = entry.get("text", "")
+    return FakeResponse(entry.get("status", 200), body, entry.get("headers"))
+
+
+def published_directory(directory):
+    """
+    Returns a route handler serving files from a publisher.py directory the way a static web server
+    does: 200 with the file's ETag, or 304 when If-None-Match matches it.
+    """
+    import os
+    from publisher import content_etag
+
+    def handler(method, url, headers, body):
+        name = url.split("?", 1)[0].rsplit("/", 1)[-1]
+        try:
+            with open(os.path.join(directory, name), "rb") as published:
+                data = published.read()
+        except OSError:
+            return FakeResponse(404, "Not found")
+        etag = content_etag(data)
+        if headers.get("If-None-Match") == etag:
+            return FakeResponse(304, b"", {"ETag": etag})
+        return FakeResponse(200, data, {"ETag": etag})
+    return handler
+
+
+class Route:
+    def __init__(self, pattern, entries=None, handler=None):
+        self.pattern = re.compile(pattern)
+        self.entries = entries or []
+        self.handler = handler
+        self.hits = 0
+
+    def respond(self, method, url, headers, body):
+        self.hits += 1
+        if self.handler is not None:
+            return self.handler(method, url, headers, body)
+        entry = self.entries[min(self.hits, len(self.entries)) - 1]
+        return response_from_entry(entry)
+
+
+class ResponseTable:
+    def __init__(self):
+        self.routes = []
+        # (method, url, status) for every request, in order
+        self.log = []
+
+    def add(self, pattern, entry=None, handler=None, sequence=None, first=False):
+        """
+        Adds a route answering with a fixed entry, a sequence of entries or a handler(method, url, headers, body).
+        Routes added with first=True take precedence over the existing ones.
+        """
+        entries = sequence if sequence is not None else ([entry] if entry is not None else [])
+        route = Route(pattern, entries, handler)
+        if first:
+            self.routes.insert(0, route)
+        else:
+            self.routes.append(route)
+        return route
+
+    def load(self, path):
+        with open(path) as fixture_file:
+            fixtures = json.load(fixture_file)
+        for route in fixtures.get("routes", []):
+            self.add(route["match"], entry=route if "sequence" not in route else None,
+                     sequence=route.get("sequence"))
+        return self
+
+    def request(self, method, url, headers=None, body=None):
+        for route in self.routes:
+            if route.pattern.search(url):
+                response = route.respond(method, url, headers or {}, body)
+                break
+        else:
+            response = FakeResponse(404, "No simulated response for " + url)
+        self.log.append((method, url, response.status_code))
+        return response
+
+    def counts(self):
+        """
+        Returns the number of requests per host.
+        """
+        hosts = {}
+        for _, url, _ in self.log:
+            host = url.split("://", 1)[-1].split("/", 1)[0]
+            hosts[host] = hosts.get(host, 0) + 1
+        return hosts
@@ -0,0 +1,7 @@
+# Simulator stand-in for adafruit_bitmap_font.bitmap_font (BDF only)
+
+from sim.font import BDFFont
+
+
+def load_font(filename, bitmap=None):
+    return BDFFont(filename)
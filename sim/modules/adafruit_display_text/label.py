@@ -0,0 +1,19 @@
+# Simulator stand-in for adafruit_display_text.label
+
+import displayio
+
+
+class Label(displayio.Group):
+    def __init__(self, font, *, text="", color=0xFFFFFF, x=0, y=0, scale=1, line_spacing=1.25, **kwargs):
+        super().__init__(scale=scale, x=x, y=y)
+        self.font = font
+        self.text = text
+        self.color = color
+        self.line_spacing = line_spacing
+        self.background_color = kwargs.get("background_color")
+
+    @property
+    def bounding_box(self):
+        box_width, box_height, _, _ = self.font.get_bounding_box()
+        lines = (self.text or "").split("\n")
+        return 0, 0, max(len(line) for line in lines) * box_width, len(lines) * box_height
@@ -0,0 +1,35 @@
+# Simulator stand-in for the ESP32 SPI coprocessor driver. Driving the reset pin low holds the
+# coprocessor in reset (radio off) until reset() restarts it. After a restart the next request
+# pays runtime.esp_restart for the boot and WiFi join.
+
+from sim import runtime
+
+WL_CONNECTED = 3
+
+
+class ESP_SPIcontrol:
+    def __init__(self, spi, cs_dio, ready_dio, reset_dio, gpio0_dio=None, *, debug=False):
+        self.status = WL_CONNECTED
+        self.is_connected = True
+        self.firmware_version = b"1.7.7"
+        self.resets = 0
+        # restarted since the last request: the WiFi join is still ahead
+        self.rejoin = False
+        self._reset = reset_dio
+        self._reset.switch_to_output(True)
+        runtime.esp = self
+
+    @property
+    def powered(self):
+        return bool(self._reset.value)
+
+    def reset(self):
+        self.resets += 1
+        self.rejoin = True
+        self._reset.value = True
+
+    def connect(self, secrets):
+        self.is_connected = True
+
+    def disconnect(self):
+        self.is_connected = False
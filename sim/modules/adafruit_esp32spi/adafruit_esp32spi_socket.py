@@ -0,0 +1,8 @@
+# Simulator stand-in for the ESP32 SPI socket module (only set_interface is used by clients)
+
+_the_interface = None
+
+
+def set_interface(iface):
+    global _the_interface
+    _the_interface = iface
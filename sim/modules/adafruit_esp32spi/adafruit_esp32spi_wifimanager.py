@@ -0,0 +1,56 @@
+# Simulator stand-in for ESPSPI_WiFiManager. Requests are answered by the simulation's
+# ResponseTable (sim/http.py) instead of the network.
+
+from sim import runtime
+
+
+class ESPSPI_WiFiManager:
+    NORMAL = 1
+    ENTERPRISE = 2
+
+    def __init__(self, esp, secrets, status_pixel=None, attempts=2, connection_type=1, debug=False):
+        self.esp = esp
+        self.secrets = secrets
+        self.attempts = attempts
+        self.timeout = 10
+        self.resets = 0
+        runtime.wifi = self
+
+    def connect(self):
+        self.esp.connect(self.secrets)
+
+    def reset(self):
+        self.resets += 1
+        self.esp.reset()
+
+    def _request(self, method, url, headers=None, body=None):
+        if runtime.responses is None:
+            raise RuntimeError("No simulated network")
+        if not self.esp.powered:
+            raise OSError("ESP32 not responding (held in reset)")
+        if self.esp.rejoin:
+            self.esp.rejoin = False
+            runtime.clock.advance(runtime.esp_restart)
+        runtime.clock.advance(runtime.latency)
+        return runtime.responses.request(method, url, headers, body)
+
+    def get(self, url, **kw):
+        return self._request("GET", url, kw.get("headers"))
+
+    def post(self, url, **kw):
+        return self._request("POST", url, kw.get("headers"), kw.get("json", kw.get("data")))
+
+    def put(self, url, **kw):
+        return self._request("PUT", url, kw.get("headers"), kw.get("json", kw.get("data")))
+
+    def patch(self, url, **kw):
+        return self._request("PATCH", url, kw.get("headers"), kw.get("json", kw.get("data")))
+
+    def delete(self, url, **kw):
+        return self._request("DELETE", url, kw.get("headers"))
+
+    def ip_address(self):
+        return "10.0.0.2"
+
+    def signal_strength(self):
+        return -50
@@ -0,0 +1,57 @@
+# Simulator stand-in for adafruit_matrixportal.matrix: the display is a VirtualDisplay whose
+# frames are rasterized on demand by sim/framebuffer.py, or sim/raster.py with the numpy backend.
+
+from sim import runtime
+from sim.framebuffer import render
+
+
+class VirtualDisplay:
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.auto_refresh = True
+        self.brightness = 1.0
+        self._root_group = None
+        # number of root_group assignments and refresh() calls, as a proxy for render work
+        self.root_group_sets = 0
+        self.refreshes = 0
+        self._frame = None
+
+    @property
+    def root_group(self):
+        return self._root_group
+
+    @root_group.setter
+    def root_group(self, group):
+        self._root_group = group
+        self.root_group_sets += 1
+
+    def show(self, group):
+        self.root_group = group
+
+    def refresh(self, *, target_frames_per_second=None, minimum_frames_per_second=0):
+        self.refreshes += 1
+        return True
+
+    def frame(self):
+        """
+        Rasterizes the current root group and returns the framebuffer: packed RGB888 bytes, or a
+        (height, width, 3) array with the numpy backend.
+        """
+        if runtime.backend == "numpy":
+            from sim import raster
+            if not hasattr(self._frame, "shape"):
+                self._frame = None
+            self._frame = raster.render(self._root_group, self.width, self.height, self._frame)
+        else:
+            if not isinstance(self._frame, bytearray):
+                self._frame = None
+            self._frame = render(self._root_group, self.width, self.height, self._frame)
+        return self._frame
+
+
+class Matrix:
+    def __init__(self, *, width=64, height=32, bit_depth=2, alt_addr_pins=None, color_order="RGB",
+                 serpentine=True, tile_rows=1, rotation=0):
+        self.display = VirtualDisplay(width, height)
+        runtime.display = self.display
@@ -0,0 +1,23 @@
+# Simulator stand-in for CircuitPython's alarm module. light_sleep_until_alarms() sleeps the
+# virtual clock until the earliest time alarm and counts the time as light sleep in sim.runtime.
+
+from sim import runtime
+
+from alarm import time  # noqa: F401  (alarm.time.TimeAlarm, as on the device)
+
+sleep_memory = bytearray(256)
+wake_alarm = None
+
+
+def light_sleep_until_alarms(*alarms):
+    global wake_alarm
+    if not alarms:
+        raise ValueError("No alarms set")
+    first = min(alarms, key=lambda alarm: alarm.monotonic_time)
+    runtime.light_sleeping = True
+    try:
+        runtime.clock.sleep(first.monotonic_time - runtime.clock.monotonic())
+    finally:
+        runtime.light_sleeping = False
+    wake_alarm = first
+    return first
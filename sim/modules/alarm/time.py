@@ -0,0 +1,13 @@
+# Simulator stand-in for alarm.time
+
+import time
+
+
+class TimeAlarm:
+    def __init__(self, *, monotonic_time=None, epoch_time=None):
+        if (monotonic_time is None) == (epoch_time is None):
+            raise ValueError("Supply exactly one of monotonic_time or epoch_time")
+        if epoch_time is not None:
+            monotonic_time = time.monotonic() + epoch_time - time.time()
+        self.monotonic_time = monotonic_time
+        self.epoch_time = epoch_time
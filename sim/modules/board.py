@@ -0,0 +1,13 @@
+# Simulator stand-in for the MatrixPortal M4 board pin names
+
+ESP_CS = "ESP_CS"
+ESP_BUSY = "ESP_BUSY"
+ESP_RESET = "ESP_RESET"
+ESP_GPIO0 = "ESP_GPIO0"
+SCK = "SCK"
+MOSI = "MOSI"
+MISO = "MISO"
+NEOPIXEL = "NEOPIXEL"
+BUTTON_UP = "BUTTON_UP"
+BUTTON_DOWN = "BUTTON_DOWN"
+L = "L"
@@ -0,0 +1,9 @@
+# Simulator stand-in for CircuitPython's busio
+
+
+class SPI:
+    def __init__(self, clock, MOSI=None, MISO=None):
+        self.clock = clock
+
+    def deinit(self):
+        pass
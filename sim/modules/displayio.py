@@ -0,0 +1,118 @@
+# Simulator stand-in for CircuitPython's displayio: Groups, TileGrids and bitmaps as plain Python
+# objects that sim/framebuffer.py rasterizes.
+
+from sim.framebuffer import read_bmp
+
+
+class Group:
+    def __init__(self, *, scale=1, x=0, y=0):
+        self.scale = scale
+        self.x = x
+        self.y = y
+        self.hidden = False
+        self._children = []
+
+    def append(self, layer):
+        self._children.append(layer)
+
+    def insert(self, index, layer):
+        self._children.insert(index, layer)
+
+    def remove(self, layer):
+        self._children.remove(layer)
+
+    def pop(self, index=-1):
+        return self._children.pop(index)
+
+    def index(self, layer):
+        return self._children.index(layer)
+
+    def __len__(self):
+        return len(self._children)
+
+    def __getitem__(self, index):
+        return self._children[index]
+
+    def __setitem__(self, index, layer):
+        self._children[index] = layer
+
+    def __iter__(self):
+        return iter(self._children)
+
+    def __contains__(self, layer):
+        return layer in self._children
+
+
+class ColorConverter:
+    def convert(self, color):
+        return color
+
+
+class Palette:
+    def __init__(self, color_count):
+        self._colors = [0] * color_count
+
+    def __len__(self):
+        return len(self._colors)
+
+    def __getitem__(self, index):
+        return self._colors[index]
+
+    def __setitem__(self, index, color):
+        self._colors[index] = color
+
+
+class Bitmap:
+    def __init__(self, width, height, value_count):
+        self.width = width
+        self.height = height
+        self.pixels = [0] * (width * height)
+
+    def __getitem__(self, index):
+        x, y = index
+        return self.pixels[y * self.width + x]
+
+    def __setitem__(self, index, value):
+        x, y = index
+        self.pixels[y * self.width + x] = value
+
+
+class OnDiskBitmap:
+    def __init__(self, file):
+        if isinstance(file, str):
+            with open(file, "rb") as bitmap_file:
+                data = bitmap_file.read()
+        else:
+            data = file.read()
+        self.width, self.height, self.pixels = read_bmp(data)
+        self.pixel_shader = ColorConverter()
+
+
+class TileGrid:
+    def __init__(self, bitmap, *, pixel_shader, width=1, height=1, tile_width=None, tile_height=None,
+                 default_tile=0, x=0, y=0):
+        self.bitmap = bitmap
+        self.pixel_shader = pixel_shader
+        self.width = width
+        self.height = height
+        self.tile_width = tile_width or bitmap.width
+        self.tile_height = tile_height or bitmap.height
+        self.x = x
+        self.y = y
+        self.hidden = False
+        self._tiles = [default_tile] * (width * height)
+
+    def _index(self, index):
+        if isinstance(index, tuple):
+            return index[1] * self.width + index[0]
+        return index
+
+    def __getitem__(self, index):
+        return self._tiles[self._index(index)]
+
+    def __setitem__(self, index, tile):
+        self._tiles[self._index(index)] = tile
+
+
+def release_displays():
+    pass
@@ -0,0 +1,58 @@
+# Simulator stand-in for CircuitPython's microcontroller module. nvm is shared through
+# sim.runtime so it survives simulated resets. watchdog expires on the virtual clock: it is
+# checked after every sleep, so a stage that sleeps (or is charged latency) past its timeout
+# without a feed() raises WatchDogTimeout in RAISE mode or resets in RESET mode.
+
+from sim import runtime
+
+
+class SimulationReset(BaseException):
+    """
+    Raised by reset(). Derives from BaseException so the sign's `except Exception` handlers don't swallow it.
+    """
+
+
+class _CPU:
+    temperature = 35.0
+    frequency = 120000000
+
+
+class _WatchDogTimer:
+    def __init__(self):
+        self.timeout = None
+        self.mode = None
+        self.feeds = 0
+        self.expirations = 0
+        self._fed_at = 0.0
+
+    def feed(self):
+        if self.mode is None:
+            raise ValueError("WatchDogTimer is not active")
+        self.feeds += 1
+        self._fed_at = runtime.clock.monotonic()
+
+    def deinit(self):
+        self.mode = None
+
+    def _check(self, elapsed):
+        if self.mode is None or self.timeout is None or elapsed - self._fed_at < self.timeout:
+            return
+        self.expirations += 1
+        from watchdog import WatchDogMode, WatchDogTimeout
+        if self.mode == WatchDogMode.RAISE:
+            # the device stops the timer once it has raised
+            self.mode = None
+            raise WatchDogTimeout()
+        reset()
+
+
+cpu = _CPU()
+nvm = runtime.nvm
+watchdog = _WatchDogTimer()
+if runtime.clock is not None:
+    runtime.clock.listeners.append(watchdog._check)
+
+
+def reset():
+    runtime.resets += 1
+    raise SimulationReset()
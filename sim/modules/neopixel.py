@@ -0,0 +1,23 @@
+# Simulator stand-in for the neopixel library
+
+
+class NeoPixel:
+    def __init__(self, pin, n, brightness=1.0, auto_write=True, pixel_order=None):
+        self.pin = pin
+        self.brightness = brightness
+        self._pixels = [(0, 0, 0)] * n
+
+    def fill(self, color):
+        self._pixels = [color] * len(self._pixels)
+
+    def show(self):
+        pass
+
+    def __len__(self):
+        return len(self._pixels)
+
+    def __getitem__(self, index):
+        return self._pixels[index]
+
+    def __setitem__(self, index, color):
+        self._pixels[index] = color
@@ -0,0 +1,3 @@
+# Simulator stand-in for CircuitPython's terminalio
+
+from sim.font import FONT  # noqa: F401
@@ -0,0 +1,14 @@
+# Simulator stand-in for CircuitPython's watchdog module. The timer itself is
+# microcontroller.watchdog (see microcontroller.py).
+
+
+class WatchDogMode:
+    RAISE = "RAISE"
+    RESET = "RESET"
+
+
+class WatchDogTimeout(Exception):
+    """
+    Raised in RAISE mode when the timer expires. An Exception, as on the device, so `except Exception`
+    handlers can swallow it.
+    """
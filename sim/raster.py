@@ -0,0 +1,247 @@
+# Numpy framebuffer backend. Rasterizes the same displayio stand-in group tree as
+# sim/framebuffer.py, but into a (height, width, 3) uint8 array with one masked slice assignment
+# per label and per tile instead of a Python loop per pixel. Label masks and sprite sheets are
+# converted once and cached, so re-rendering an unchanged screen is a handful of array copies.
+# Frames export as PNG (no imaging library needed) or raw RGB888 bytes.
+#
+# Select it with Simulation(backend="numpy") or python -m sim --backend numpy. It renders the sim's
+# displayio stand-ins, so display_manager.py only reaches it through a Simulation (see README).
+
+import struct
+import zlib
+
+import numpy as np
+
+from sim.framebuffer import label_baseline, label_lines
+
+# label masks are keyed by (font, text, line spacing); bounded so long scrolls don't grow it forever
+MASK_CACHE_SIZE = 256
+_mask_cache = {}
+
+
+def _rgb(color):
+    return ((color >> 16) & 0xFF, (color >> 8) & 0xFF, color & 0xFF)
+
+
+def label_mask(label):
+    """
+    Returns a label's text as a boolean mask plus the offset of its top left corner from
+    (label x, baseline).
+
+    Returns:
+        tuple: (mask array of shape (height, width), left offset, top offset)
+    """
+    key = (id(label.font), label.text, label.line_spacing)
+    cached = _mask_cache.get(key)
+    if cached is not None:
+        return cached
+    placed = []
+    for line, line_offset in label_lines(label):
+        pen_x = 0
+        for char in line:
+            glyph = label.font.get_glyph(ord(char))
+            if glyph is not None:
+                placed.append((glyph, pen_x + glyph.dx, line_offset - glyph.dy - glyph.height))
+                pen_x += glyph.shift_x
+    if not placed:
+        cached = (np.zeros((0, 0), dtype=bool), 0, 0)
+    else:
+        left = min(x for _, x, _ in placed)
+        top = min(y for _, _, y in placed)
+        right = max(x + glyph.width for glyph, x, _ in placed)
+        bottom = max(y + glyph.height for glyph, _, y in placed)
+        mask = np.zeros((bottom - top, right - left), dtype=bool)
+        for glyph, x, y in placed:
+            mask[y - top:y - top + glyph.height, x - left:x - left + glyph.width] |= glyph_mask(glyph)
+        cached = (mask, left, top)
+    if len(_mask_cache) >= MASK_CACHE_SIZE:
+        _mask_cache.clear()
+    _mask_cache[key] = cached
+    return cached
+
+
+def glyph_mask(glyph):
+    mask = getattr(glyph, "_mask", None)
+    if mask is None:
+        rows = np.array(glyph.rows, dtype=np.uint32).reshape(-1, 1)
+        shifts = np.arange(glyph.width - 1, -1, -1, dtype=np.uint32)
+        mask = ((rows >> shifts) & 1).astype(bool)
+        glyph._mask = mask
+    return mask
+
+
+def bitmap_array(bitmap):
+    """
+    Returns a bitmap's pixels as a (height, width, 3) uint8 array. Read-only bitmaps
+    (OnDiskBitmap) are converted once; writable ones on every call.
+    """
+    array = getattr(bitmap, "_raster", None)
+    if array is not None:
+        return array
+    pixels = np.array(bitmap.pixels, dtype=np.uint32).reshape(bitmap.height, bitmap.width)
+    array = np.stack(((pixels >> 16) & 0xFF, (pixels >> 8) & 0xFF, pixels & 0xFF), axis=-1).astype(np.uint8)
+    if not hasattr(bitmap, "__setitem__"):
+        bitmap._raster = array
+    return array
+
+
+def _clip(frame, x, y, width, height):
+    """
+    Returns the frame and source slices of a width x height block placed at (x, y), or None if it is off screen.
+    """
+    frame_height, frame_width = frame.shape[:2]
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + width, frame_width), min(y + height, frame_height)
+    if x0 >= x1 or y0 >= y1:
+        return None
+    return (slice(y0, y1), slice(x0, x1)), (slice(y0 - y, y1 - y), slice(x0 - x, x1 - x))
+
+
+def _draw_label(frame, label, origin_x, origin_y):
+    if label.color is None or not label.text:
+        return
+    mask, left, top = label_mask(label)
+    clipped = _clip(frame, origin_x + left, label_baseline(label, origin_y) + top, mask.shape[1], mask.shape[0])
+    if clipped is None:
+        return
+    target, source = clipped
+    frame[target][mask[source]] = _rgb(label.color)
+
+
+def _draw_tilegrid(frame, grid, origin_x, origin_y):
+    sheet = bitmap_array(grid.bitmap)
+    tiles_per_row = grid.bitmap.width // grid.tile_width
+    for tile_row in range(grid.height):
+        for tile_column in range(grid.width):
+            tile = grid[tile_column, tile_row]
+            source_x = (tile % tiles_per_row) * grid.tile_width
+            source_y = (tile // tiles_per_row) * grid.tile_height
+            clipped = _clip(frame, origin_x + tile_column * grid.tile_width,
+                            origin_y + tile_row * grid.tile_height, grid.tile_width, grid.tile_height)
+            if clipped is None:
+                continue
+            target, (rows, columns) = clipped
+            frame[target] = sheet[source_y + rows.start:source_y + rows.stop,
+                                  source_x + columns.start:source_x + columns.stop]
+
+
+def _draw(frame, node, offset_x, offset_y):
+    if getattr(node, "hidden", False):
+        return
+    x = offset_x + node.x
+    y = offset_y + node.y
+    if hasattr(node, "font"):
+        _draw_label(frame, node, x, y)
+    elif hasattr(node, "tile_width"):
+        _draw_tilegrid(frame, node, x, y)
+    else:
+        for child in node:
+            _draw(frame, child, x, y)
+
+
+def render(root_group, width=128, height=32, frame=None):
+    """
+    Rasterizes a group tree into an RGB array.
+
+    Args:
+        root_group: The display's root group.
+        width (int, optional): Panel width. Defaults to 128.
+        height (int, optional): Panel height. Defaults to 32.
+        frame (numpy.ndarray, optional): (height, width, 3) uint8 array to reuse; cleared before drawing.
+
+    Returns:
+        numpy.ndarray: (height, width, 3) uint8 array.
+    """
+    if frame is None:
+        frame = np.zeros((height, width, 3), dtype=np.uint8)
+    else:
+        frame.fill(0)
+    if root_group is not None:
+        _draw(frame, root_group, 0, 0)
+    return frame
+
+
+# --- EXPORT ---
+def to_raw(frame):
+    """
+    Returns the frame as packed row-major RGB888 bytes (the layout of sim/framebuffer.py).
+    """
+    return np.ascontiguousarray(frame, dtype=np.uint8).tobytes()
+
+
+def _chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+
+def to_png(frame):
+    """
+    Encodes an RGB frame (numpy array or packed RGB888 of a 128x32 panel) as an 8 bit RGB PNG.
+
+    Returns:
+        bytes: The PNG file.
+    """
+    if not isinstance(frame, np.ndarray):
+        frame = np.frombuffer(bytes(frame), dtype=np.uint8).reshape(32, 128, 3)
+    height, width = frame.shape[:2]
+    # filter type 0 (none) in front of every row
+    rows = np.zeros((height, width * 3 + 1), dtype=np.uint8)
+    rows[:, 1:] = frame.reshape(height, width * 3)
+    return (b"\x89PNG\r\n\x1a\n"
+            + _chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + _chunk(b"IDAT", zlib.compress(rows.tobytes(), 9))
+            + _chunk(b"IEND", b""))
+
+
+def from_png(data):
+    """
+    Decodes an 8 bit RGB, non-interlaced PNG such as those written by to_png().
+
+    Returns:
+        numpy.ndarray: (height, width, 3) uint8 array.
+    """
+    if data[:8] != b"\x89PNG\r\n\x1a\n":
+        raise ValueError("Not a PNG file")
+    offset = 8
+    idat = b""
+    width = height = None
+    while offset < len(data):
+        length, kind = struct.unpack_from(">I4s", data, offset)
+        body = data[offset + 8:offset + 8 + length]
+        if kind == b"IHDR":
+            width, height, depth, color_type, _, _, interlace = struct.unpack(">IIBBBBB", body)
+            if (depth, color_type, interlace) != (8, 2, 0):
+                raise ValueError("Only 8 bit RGB, non-interlaced PNGs are supported")
+        elif kind == b"IDAT":
+            idat += body
+        offset += 12 + length
+    raw = np.frombuffer(zlib.decompress(idat), dtype=np.uint8).reshape(height, width * 3 + 1)
+    stride = width * 3
+    pixels = np.zeros((height, stride), dtype=np.int32)
+    for row in range(height):
+        kind = raw[row, 0]
+        line = raw[row, 1:].astype(np.int32)
+        previous = pixels[row - 1] if row else np.zeros(stride, dtype=np.int32)
+        if kind == 0:
+            pixels[row] = line
+        elif kind == 2:
+            pixels[row] = (line + previous) & 0xFF
+        elif kind in (1, 3, 4):
+            # left-dependent filters need a per-pixel pass
+            current = np.zeros(stride, dtype=np.int32)
+            for index in range(stride):
+                left = current[index - 3] if index >= 3 else 0
+                up = previous[index]
+                up_left = previous[index - 3] if index >= 3 else 0
+                if kind == 1:
+                    predictor = left
+                elif kind == 3:
+                    predictor = (left + up) // 2
+                else:
+                    estimate = left + up - up_left
+                    distances = (abs(estimate - left), abs(estimate - up), abs(estimate - up_left))
+                    predictor = (left, up, up_left)[distances.index(min(distances))]
+                current[index] = (line[index] + predictor) & 0xFF
+            pixels[row] = current
+        else:
+            raise ValueError("Unknown PNG filter type {}".format(kind))
+    return pixels.astype(np.uint8).reshape(height, width, 3)
@@ -0,0 +1,310 @@
+# Trace replay. Serves a trace written by recorder.py (or record_trace() below) either inside the
+# simulator, as a route in its ResponseTable, or as a standalone HTTP server for the board, the
+# benchmarks and fleet.py. Replay follows the trace's own timeline: a request at trace time T gets
+# the latest response recorded for the same endpoint at or before T, at 1x or accelerated speed.
+# Latency, errors and truncated bodies can be injected on top of what was recorded.
+#
+# Usage:
+#   python -m sim --trace field.jsonl --error-rate 0.05            # simulator upstream
+#   python -m sim.replay field.jsonl --port 8080 --speed 10        # HTTP server
+#
+# The server answers both proxy style requests (GET http://api.wmata.com/... ) and requests with
+# the upstream host as the first path segment (GET /api.wmata.com/StationPrediction.svc/...).
+
+import argparse
+import bisect
+import gzip
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from sim import runtime
+from sim.http import FakeResponse
+
+
+class ReplayError(OSError):
+    """
+    Raised in place of a request that failed when it was recorded, or an injected connection error.
+    """
+
+
+def endpoint(method, url):
+    """
+    Returns the key responses are grouped by: method, host and path, without scheme or query.
+    """
+    address = url.split("://", 1)[-1].split("?", 1)[0]
+    return method.upper() + " " + address.rstrip("/")
+
+
+def load_trace(path):
+    """
+    Reads a trace file (optionally gzip compressed).
+
+    Returns:
+        tuple: (header dict, list of records in time order)
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    header = {}
+    records = []
+    with opener(path, "rt", encoding="utf-8") as trace_file:
+        for line in trace_file:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if "trace" in record:
+                # a recorder restarted by a reset appends a new header; keep the timeline continuous
+                offset = records[-1]["t"] if records else 0.0
+                header = header or record
+                header["_offset"] = offset
+                continue
+            record["t"] = record.get("t", 0.0) + header.get("_offset", 0.0)
+            records.append(record)
+    header.pop("_offset", None)
+    records.sort(key=lambda record: record["t"])
+    return header, records
+
+
+def record_trace(path, requests, session=None, interval=0, rounds=1):
+    """
+    Records a trace from the host by requesting URLs directly, for when the board can't write one.
+
+    Args:
+        path (str): Trace file to write.
+        requests (list): (method, url, headers) tuples requested each round.
+        session (requests.Session, optional): HTTP session. Defaults to a new one.
+        interval (float, optional): Seconds between rounds. Defaults to 0.
+        rounds (int, optional): Number of rounds. Defaults to 1.
+    """
+    import requests as http
+    from recorder import TRACE_VERSION, redact_url
+
+    session = session or http.Session()
+    started = time.monotonic()
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "wt", encoding="utf-8") as trace_file:
+        trace_file.write(json.dumps({"trace": TRACE_VERSION, "start": time.time()}) + "\n")
+        for round_index in range(rounds):
+            if round_index:
+                time.sleep(interval)
+            for method, url, headers in requests:
+                record = {"t": round(time.monotonic() - started, 3), "m": method, "u": redact_url(url)}
+                start = time.monotonic()
+                try:
+                    response = session.request(method, url, headers=headers, timeout=20)
+                    record["s"] = response.status_code
+                    try:
+                        record["b"] = response.content.decode("utf-8")
+                    except UnicodeDecodeError:
+                        record["x"] = response.content.hex()
+                except http.RequestException as e:
+                    record["e"] = str(e)
+                record["ms"] = int((time.monotonic() - start) * 1000)
+                trace_file.write(json.dumps(record) + "\n")
+
+
+class TraceReplay:
+    def __init__(self, records, speed=1.0, latency=None, error_rate=0.0, error_status=503,
+                 truncate_rate=0.0, loop=False, seed=None):
+        """
+        Args:
+            records (list): Trace records, as returned by load_trace().
+            speed (float, optional): Trace seconds per replay second. Defaults to 1.0.
+            latency (float, optional): Latency in ms added to every response. None replays the recorded latency.
+            error_rate (float, optional): Fraction of requests answered with error_status. Defaults to 0.
+            error_status (int, optional): Status of injected errors, 0 for a connection error. Defaults to 503.
+            truncate_rate (float, optional): Fraction of responses whose body is cut short. Defaults to 0.
+            loop (bool, optional): Start the trace over after its last record. Defaults to False.
+            seed (int, optional): Seed for injected faults, for reproducible runs.
+        """
+        self.speed = speed
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.truncate_rate = truncate_rate
+        self.loop = loop
+        self.random = random.Random(seed)
+        self.duration = records[-1]["t"] if records else 0.0
+        # endpoint -> (times, records)
+        self.endpoints = {}
+        for record in records:
+            times, entries = self.endpoints.setdefault(endpoint(record["m"], record["u"]), ([], []))
+            times.append(record["t"])
+            entries.append(record)
+        self.served = 0
+        self.injected_errors = 0
+        self.truncated = 0
+        self.misses = 0
+
+    @classmethod
+    def from_file(cls, path, **options):
+        return cls(load_trace(path)[1], **options)
+
+    def pattern(self):
+        """
+        Returns a regular expression matching every URL the trace holds responses for.
+        """
+        addresses = sorted({key.split(" ", 1)[1] for key in self.endpoints})
+        return "://(" + "|".join(re.escape(address) for address in addresses) + r")/?(\?|$)"
+
+    def find(self, method, url, trace_time):
+        """
+        Returns the latest record for the request's endpoint at or before trace_time (the first one
+        if the request comes before any was recorded), or None.
+        """
+        key = endpoint(method, url)
+        found = self.endpoints.get(key)
+        if found is None:
+            # host as first path segment, or a bare path: match on the tail of the recorded address
+            path = key.split(" ", 1)[1].split("/", 1)[-1]
+            for candidate, entries in self.endpoints.items():
+                if candidate.startswith(method.upper() + " ") and candidate.endswith("/" + path):
+                    found = entries
+                    break
+        if found is None:
+            return None
+        times, entries = found
+        if self.loop and self.duration:
+            trace_time %= self.duration
+        return entries[max(0, bisect.bisect_right(times, trace_time) - 1)]
+
+    def respond(self, method, url, trace_time):
+        """
+        Builds the replayed response.
+
+        Returns:
+            tuple: (FakeResponse or None, latency in seconds). None means no record matched.
+
+        Raises:
+            ReplayError: The recorded request failed or a connection error was injected.
+        """
+        record = self.find(method, url, trace_time)
+        if record is None:
+            self.misses += 1
+            return None, 0.0
+        self.served += 1
+        latency = (record.get("ms", 0) if self.latency is None else self.latency) / 1000
+        if self.error_rate and self.random.random() < self.error_rate:
+            self.injected_errors += 1
+            if not self.error_status:
+                raise ReplayError("Injected connection error")
+            return FakeResponse(self.error_status, "Injected error"), latency
+        if "e" in record:
+            raise ReplayError(record["e"])
+        body = bytes.fromhex(record["x"]) if "x" in record else record.get("b", "").encode("utf-8")
+        if self.truncate_rate and body and self.random.random() < self.truncate_rate:
+            self.truncated += 1
+            body = body[:self.random.randrange(len(body))]
+        return FakeResponse(record.get("s", 200), body), latency
+
+    def attach(self, responses):
+        """
+        Adds the trace as a route of a simulator ResponseTable, ahead of its existing routes. Replay
+        time follows the simulation's virtual clock and latency is charged to it.
+
+        Returns:
+            Route: The added route.
+        """
+        def handler(method, url, headers, body):
+            trace_time = runtime.clock.elapsed * self.speed if runtime.clock is not None else 0.0
+            response, latency = self.respond(method, url, trace_time)
+            if runtime.clock is not None:
+                runtime.clock.advance(latency)
+            if response is None:
+                return FakeResponse(404, "Not in trace: " + url)
+            return response
+
+        return responses.add(self.pattern(), handler=handler, first=True)
+
+    def stats(self):
+        return {
+            "served": self.served,
+            "misses": self.misses,
+            "injected_errors": self.injected_errors,
+            "truncated": self.truncated,
+        }
+
+
+# --- SERVER ---
+def make_handler(replay, started):
+    class ReplayRequestHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _replay(self):
+            if self.path.startswith("http"):
+                url = self.path
+            else:
+                url = "http://" + self.path.lstrip("/")
+            length = int(self.headers.get("Content-Length") or 0)
+            if length:
+                self.rfile.read(length)
+            trace_time = (time.monotonic() - started) * replay.speed
+            try:
+                response, latency = replay.respond(self.command, url, trace_time)
+            except ReplayError:
+                # a failed upstream request: drop the connection without answering
+                self.close_connection = True
+                return
+            if response is None:
+                response, latency = FakeResponse(404, "Not in trace: " + url), 0.0
+            time.sleep(latency / replay.speed if replay.speed else 0)
+            self.send_response(response.status_code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(response.content)))
+            self.end_headers()
+            self.wfile.write(response.content)
+
+        do_GET = _replay
+        do_POST = _replay
+
+        def log_message(self, format, *args):
+            pass
+
+    return ReplayRequestHandler
+
+
+def serve(replay, host="0.0.0.0", port=8080):
+    """
+    Starts the replay HTTP server in a background thread.
+
+    Returns:
+        ThreadingHTTPServer: The running server; call shutdown() to stop it.
+    """
+    server = ThreadingHTTPServer((host, port), make_handler(replay, time.monotonic()))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a recorded trace over HTTP.")
+    parser.add_argument("trace", help="trace file (.jsonl or .jsonl.gz)")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--speed", type=float, default=1.0, help="trace seconds per real second (default: 1)")
+    parser.add_argument("--latency", type=float, help="fixed latency in ms instead of the recorded one")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with an error")
+    parser.add_argument("--error-status", type=int, default=503, help="status of injected errors, 0 drops the connection")
+    parser.add_argument("--truncate-rate", type=float, default=0.0, help="fraction of bodies cut short")
+    parser.add_argument("--loop", action="store_true", help="start over after the last record")
+    parser.add_argument("--seed", type=int, help="seed for injected faults")
+    arguments = parser.parse_args()
+
+    replay = TraceReplay.from_file(arguments.trace, speed=arguments.speed, latency=arguments.latency,
+                                   error_rate=arguments.error_rate, error_status=arguments.error_status,
+                                   truncate_rate=arguments.truncate_rate, loop=arguments.loop, seed=arguments.seed)
+    server = serve(replay, arguments.host, arguments.port)
+    print(f"Replaying {arguments.trace} ({len(replay.endpoints)} endpoints, {replay.duration:.0f} s) "
+          f"on {arguments.host}:{arguments.port} at {arguments.speed}x")
+    try:
+        while True:
+            time.sleep(60)
+            print(json.dumps(replay.stats()))
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
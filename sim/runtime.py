@@ -0,0 +1,34 @@
+# Shared state of the running simulation. The stand-in hardware modules in sim/modules read
+# the active clock, HTTP response table and non-volatile memory from here.
+
+# VirtualClock driving time.sleep()/time.monotonic() (see sim/clock.py)
+clock = None
+
+# ResponseTable answering the fake WiFi manager (see sim/http.py)
+responses = None
+
+# the WiFi manager created by code.py, kept for request statistics
+wifi = None
+
+# the virtual display created by the Matrix stand-in
+display = None
+
+# the ESP32 control object created by code.py
+esp = None
+
+# virtual seconds charged to every request, and to the first request after the ESP32 restarts
+# (coprocessor boot and WiFi join)
+latency = 0.0
+esp_restart = 0.0
+
+# True while the CPU is in alarm.light_sleep_until_alarms()
+light_sleeping = False
+
+# framebuffer backend: "python" (sim/framebuffer.py) or "numpy" (sim/raster.py)
+backend = "python"
+
+# microcontroller.nvm contents, kept across simulated resets
+nvm = bytearray(8192)
+
+# number of microcontroller.reset() calls
+resets = 0
@@ -0,0 +1,355 @@
+# Frame streaming to networked LED panels. A host runs the sign (or any display_manager output)
+# and streams its frames over UDP to one or more remote panels. Only rows that changed since the
+# previous frame are sent, each run-length encoded, with a full keyframe every `keyframe_every`
+# frames so a panel that dropped packets or joined late converges.
+#
+# Packet format (big endian):
+#   header  magic "DCFS", version (B), flags (B), frame sequence (I), packet index (H),
+#           packets in frame (H), width (H), height (B)
+#   rows    row index (B), encoded length (H), runs of (count (B), red (B), green (B), blue (B))
+# A frame with no changed rows is still sent as one empty packet, so receivers see the sequence
+# advance. Every packet holds whole rows and can be applied on its own.
+#
+# Usage:
+#   python -m sim.stream send --to 10.0.0.21:5005 --to 10.0.0.22:5005 --speed 1 --fps 30
+#   python -m sim.stream receive --port 5005 --show
+
+import argparse
+import socket
+import struct
+import time
+
+MAGIC = b"DCFS"
+VERSION = 1
+FLAG_KEYFRAME = 0x01
+
+HEADER = struct.Struct(">4sBBIHHHB")
+ROW = struct.Struct(">BH")
+# stays under a typical Ethernet MTU after IP and UDP headers
+MAX_PACKET_SIZE = 1400
+DEFAULT_PORT = 5005
+
+
+def frame_bytes(frame):
+    """
+    Returns a frame as packed RGB888 bytes, whichever framebuffer backend produced it.
+    """
+    return frame.tobytes() if hasattr(frame, "tobytes") else bytes(frame)
+
+
+def encode_row(row):
+    """
+    Run-length encodes one row of RGB888 pixels as (count, red, green, blue) runs.
+    """
+    encoded = bytearray()
+    count = 0
+    previous = None
+    for offset in range(0, len(row), 3):
+        pixel = row[offset:offset + 3]
+        if pixel == previous and count < 255:
+            count += 1
+            continue
+        if previous is not None:
+            encoded.append(count)
+            encoded += previous
+        previous = pixel
+        count = 1
+    if previous is not None:
+        encoded.append(count)
+        encoded += previous
+    return bytes(encoded)
+
+
+def decode_row(data, target, offset, length):
+    """
+    Expands runs from data into target starting at offset. Returns False if the runs don't fill exactly `length` bytes.
+    """
+    end = offset + length
+    position = offset
+    for index in range(0, len(data) - 3, 4):
+        count = data[index]
+        pixel = data[index + 1:index + 4]
+        run_end = position + count * 3
+        if run_end > end:
+            return False
+        target[position:run_end] = pixel * count
+        position = run_end
+    return position == end
+
+
+class FrameStreamer:
+    def __init__(self, destinations, width=128, height=32, keyframe_every=60, max_packet_size=MAX_PACKET_SIZE,
+                 sock=None):
+        """
+        Args:
+            destinations (list): (host, port) tuples of the receiving panels.
+            width (int, optional): Panel width. Defaults to 128.
+            height (int, optional): Panel height. Defaults to 32.
+            keyframe_every (int, optional): Frames between full keyframes. Defaults to 60.
+            max_packet_size (int, optional): UDP payload limit. Defaults to 1400.
+            sock (socket.socket, optional): UDP socket to send with. Defaults to a new one.
+        """
+        self.destinations = list(destinations)
+        self.width = width
+        self.height = height
+        self.keyframe_every = keyframe_every
+        self.max_packet_size = max_packet_size
+        self.sock = sock or socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.row_size = width * 3
+        self.sequence = 0
+        self._previous = None
+        self._keyframe_due = True
+        # totals since creation, per destination
+        self.frames = 0
+        self.keyframes = 0
+        self.packets = 0
+        self.bytes_sent = 0
+        self.rows_sent = 0
+
+    def request_keyframe(self):
+        self._keyframe_due = True
+
+    def packetize(self, frame):
+        """
+        Encodes a frame as the packets to send, advancing the sequence number.
+
+        Returns:
+            list: Packet payloads (bytes).
+        """
+        data = frame_bytes(frame)
+        keyframe = self._keyframe_due or self._previous is None or self.sequence % self.keyframe_every == 0
+        records = []
+        for y in range(self.height):
+            start = y * self.row_size
+            row = data[start:start + self.row_size]
+            if keyframe or row != self._previous[start:start + self.row_size]:
+                encoded = encode_row(row)
+                records.append(ROW.pack(y, len(encoded)) + encoded)
+        self._previous = data
+        self._keyframe_due = False
+
+        # group whole rows into packets under the size limit
+        bodies = [bytearray()]
+        for record in records:
+            if bodies[-1] and HEADER.size + len(bodies[-1]) + len(record) > self.max_packet_size:
+                bodies.append(bytearray())
+            bodies[-1] += record
+        flags = FLAG_KEYFRAME if keyframe else 0
+        packets = [HEADER.pack(MAGIC, VERSION, flags, self.sequence, index, len(bodies), self.width, self.height)
+                   + body for index, body in enumerate(bodies)]
+
+        self.sequence = (self.sequence + 1) & 0xFFFFFFFF
+        self.frames += 1
+        self.keyframes += keyframe
+        self.rows_sent += len(records)
+        return packets
+
+    def send(self, frame):
+        """
+        Sends a frame to every destination.
+
+        Returns:
+            int: Bytes sent per destination.
+        """
+        packets = self.packetize(frame)
+        size = 0
+        for packet in packets:
+            size += len(packet)
+            for destination in self.destinations:
+                try:
+                    self.sock.sendto(packet, destination)
+                except OSError as e:
+                    print("Failed to stream frame to {}: {}".format(destination, e))
+        self.packets += len(packets)
+        self.bytes_sent += size
+        return size
+
+
+class FrameReceiver:
+    def __init__(self):
+        self.frame = None
+        self.width = None
+        self.height = None
+        # sequence of the frame being assembled and the packet indexes seen for it
+        self._sequence = None
+        self._expected = 0
+        self._received = set()
+        self._keyframe = False
+        self.last_complete = None
+        # True after a lost delta frame until the next complete keyframe
+        self.desynced = True
+        self.frames = 0
+        self.lost_frames = 0
+        self.incomplete_frames = 0
+        self.late_packets = 0
+        self.invalid_packets = 0
+
+    def _newer(self, sequence, than):
+        return than is None or 0 < ((sequence - than) & 0xFFFFFFFF) < 0x80000000
+
+    def feed(self, packet):
+        """
+        Applies one packet.
+
+        Returns:
+            bytearray or None: The reconstructed RGB888 frame when this packet completes one, else None.
+        """
+        if len(packet) < HEADER.size:
+            self.invalid_packets += 1
+            return None
+        magic, version, flags, sequence, index, count, width, height = HEADER.unpack_from(packet)
+        if magic != MAGIC or version != VERSION or index >= count:
+            self.invalid_packets += 1
+            return None
+        if (width, height) != (self.width, self.height):
+            self.width, self.height = width, height
+            self.frame = bytearray(width * height * 3)
+            self.desynced = True
+
+        if sequence != self._sequence:
+            if not self._newer(sequence, self._sequence):
+                self.late_packets += 1
+                return None
+            if self._sequence is not None:
+                if len(self._received) < self._expected:
+                    self.incomplete_frames += 1
+                    self.desynced = True
+                # frames of which no packet arrived at all
+                gap = ((sequence - self._sequence) & 0xFFFFFFFF) - 1
+                if gap:
+                    self.lost_frames += gap
+                    self.desynced = True
+            self._sequence = sequence
+            self._expected = count
+            self._received = set()
+            self._keyframe = bool(flags & FLAG_KEYFRAME)
+        elif index in self._received:
+            return None
+
+        row_size = width * 3
+        offset = HEADER.size
+        while offset + ROW.size <= len(packet):
+            y, length = ROW.unpack_from(packet, offset)
+            offset += ROW.size
+            data = packet[offset:offset + length]
+            offset += length
+            if y >= height or len(data) != length or not decode_row(data, self.frame, y * row_size, row_size):
+                self.invalid_packets += 1
+                return None
+        self._received.add(index)
+
+        if len(self._received) < self._expected:
+            return None
+        self.last_complete = sequence
+        self.frames += 1
+        if self._keyframe:
+            self.desynced = False
+        return self.frame
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "lost_frames": self.lost_frames,
+            "incomplete_frames": self.incomplete_frames,
+            "late_packets": self.late_packets,
+            "invalid_packets": self.invalid_packets,
+            "desynced": self.desynced,
+        }
+
+
+def listen(port=DEFAULT_PORT, host="0.0.0.0", on_frame=None, timeout=None):
+    """
+    Receives frames until interrupted (or `timeout` seconds without a packet), calling
+    on_frame(frame, receiver) for each reconstructed frame.
+
+    Returns:
+        FrameReceiver: The receiver, for its stats.
+    """
+    receiver = FrameReceiver()
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind((host, port))
+    sock.settimeout(timeout)
+    try:
+        while True:
+            try:
+                packet = sock.recv(65535)
+            except socket.timeout:
+                break
+            frame = receiver.feed(packet)
+            if frame is not None and on_frame is not None:
+                on_frame(frame, receiver)
+    finally:
+        sock.close()
+    return receiver
+
+
+def stream_simulation(simulation, streamer, fps=30):
+    """
+    Streams a simulation's display while it runs: a frame is captured after any virtual clock sleep
+    once at least 1/fps virtual seconds have passed since the last one.
+    """
+    state = {"last": None}
+
+    def capture(elapsed):
+        if state["last"] is not None and elapsed - state["last"] < 1.0 / fps:
+            return
+        frame = simulation.frame()
+        if frame is not None:
+            state["last"] = elapsed
+            streamer.send(frame)
+
+    simulation.clock.listeners.append(capture)
+    return capture
+
+
+def _address(text):
+    host, _, port = text.rpartition(":")
+    return (host or "127.0.0.1", int(port or DEFAULT_PORT))
+
+
+def main():
+    from sim import Simulation
+    from sim.framebuffer import to_text
+
+    parser = argparse.ArgumentParser(description="Stream the simulated sign's frames to UDP panels, or receive them.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    send = commands.add_parser("send", help="run the sign in the simulator and stream its frames")
+    send.add_argument("--to", action="append", required=True, help="HOST:PORT of a receiving panel (repeatable)")
+    send.add_argument("--duration", type=float, default=3600, help="virtual seconds to run (default: 3600)")
+    send.add_argument("--speed", type=float, default=1, help="virtual seconds per real second (default: 1)")
+    send.add_argument("--start", help="virtual start time as YYYY-MM-DDTHH:MM (local), default: now")
+    send.add_argument("--fps", type=float, default=30, help="frames per virtual second (default: 30)")
+    send.add_argument("--keyframe-every", type=int, default=60, help="frames between keyframes (default: 60)")
+    receive = commands.add_parser("receive", help="reconstruct frames from a stream")
+    receive.add_argument("--port", type=int, default=DEFAULT_PORT)
+    receive.add_argument("--show", action="store_true", help="print every reconstructed frame as text")
+    arguments = parser.parse_args()
+
+    if arguments.command == "send":
+        streamer = FrameStreamer([_address(text) for text in arguments.to], keyframe_every=arguments.keyframe_every)
+        simulation = Simulation(duration=arguments.duration, speed=arguments.speed)
+        with simulation:
+            if arguments.start:
+                simulation.clock.start_epoch = time.mktime(time.strptime(arguments.start, "%Y-%m-%dT%H:%M"))
+            stream_simulation(simulation, streamer, arguments.fps)
+            simulation.run()
+        print(f"Sent {streamer.frames} frames ({streamer.keyframes} keyframes) in {streamer.packets} packets, "
+              f"{streamer.bytes_sent} bytes per panel")
+        return
+
+    started = time.monotonic()
+
+    def on_frame(frame, receiver):
+        if arguments.show:
+            print(to_text(frame, receiver.width, receiver.height) + "\n")
+        elif receiver.frames % 100 == 0:
+            print(f"{receiver.frames / (time.monotonic() - started):.1f} fps {receiver.stats()}")
+
+    try:
+        listen(arguments.port, on_frame=on_frame)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
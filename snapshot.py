@@ -0,0 +1,306 @@
+# Snapshot
+# Fixed-layout binary record of everything the sign renders: train slots, weather fields,
+# event countdown and headline. The host side (events.py, news.py) encodes snapshots with
+# encode_snapshot(), the sign decodes them into preallocated buffers with Snapshot.decode_into().
+#
+# Layout (little-endian, every offset is fixed for a given version):
+#   HEADER    magic "DCMS" | version u8 | sections u8 | sequence u16
+#   TRAIN x2  destination len u8 + 10 bytes | minutes len u8 + 3 bytes
+#   WEATHER   icon 3 bytes | current, feels like, daily min, daily max, hourly next, hourly feels like (i16, tenths)
+#   EVENT     departure time u32 (epoch) | departure train len u8 + 16 bytes
+#   HEADLINE  published hour u8 | published minute u8 | source len u8 + 24 bytes | title len u16 + 160 bytes
+#
+# Text fields longer than their slot are truncated by the encoder on a character boundary. Sections that are not
+# present are zero-filled and their bit in the sections byte is cleared.
+
+import struct
+
+MAGIC = b"DCMS"
+VERSION = 1
+
+# section bits
+SECTION_TRAINS = 0x01
+SECTION_WEATHER = 0x02
+SECTION_EVENT = 0x04
+SECTION_HEADLINE = 0x08
+
+# text slot sizes
+DESTINATION_SIZE = 10
+MINUTES_SIZE = 3
+ICON_SIZE = 3
+DEPARTURE_TRAIN_SIZE = 16
+SOURCE_SIZE = 24
+TITLE_SIZE = 160
+
+# weather fields stored as signed tenths of a degree, in this order
+WEATHER_FIELDS = (
+    "current_temp",
+    "current_feels_like",
+    "daily_temp_min",
+    "daily_temp_max",
+    "hourly_next_temp",
+    "hourly_feels_like",
+)
+
+HEADER_FORMAT = "<BBH"
+WEATHER_FORMAT = "<6h"
+EVENT_FORMAT = "<I"
+HEADLINE_TIME_FORMAT = "<BB"
+TITLE_LENGTH_FORMAT = "<H"
+
+# --- OFFSETS ---
+HEADER_OFFSET = 0
+HEADER_SIZE = 8
+TRAIN_OFFSET = HEADER_SIZE
+TRAIN_SIZE = 1 + DESTINATION_SIZE + 1 + MINUTES_SIZE
+WEATHER_OFFSET = TRAIN_OFFSET + 2 * TRAIN_SIZE
+WEATHER_SIZE = ICON_SIZE + 2 * len(WEATHER_FIELDS)
+EVENT_OFFSET = WEATHER_OFFSET + WEATHER_SIZE
+EVENT_SIZE = 4 + 1 + DEPARTURE_TRAIN_SIZE
+HEADLINE_OFFSET = EVENT_OFFSET + EVENT_SIZE
+HEADLINE_SIZE = 2 + 1 + SOURCE_SIZE + 2 + TITLE_SIZE
+SNAPSHOT_SIZE = HEADLINE_OFFSET + HEADLINE_SIZE
+
+
+# --- HOST SIDE ENCODER ---
+
+def truncate_utf8(encoded, size):
+    """
+    Cuts UTF-8 bytes to at most size bytes without splitting a character.
+
+    Returns:
+        bytes: The longest prefix of whole characters that fits.
+    """
+    if len(encoded) <= size:
+        return encoded
+    end = size
+    # step back over continuation bytes (0b10xxxxxx) to the lead byte of the split character
+    while end > 0 and encoded[end] & 0xC0 == 0x80:
+        end -= 1
+    return encoded[:end]
+
+
+def _pack_text(buffer, offset, text, size, length_format="<B"):
+    """
+    Writes a length-prefixed, truncated UTF-8 text slot into buffer at offset.
+
+    Returns:
+        int: The offset just past the slot.
+    """
+    encoded = truncate_utf8((text or "").encode("utf-8"), size)
+    struct.pack_into(length_format, buffer, offset, len(encoded))
+    offset += struct.calcsize(length_format)
+    buffer[offset:offset + len(encoded)] = encoded
+    return offset + size
+
+
+def _tenths(value):
+    # clamp to the i16 range so an absurd reading can't break the record
+    return max(-32768, min(32767, int(round(value * 10))))
+
+
+def encode_snapshot(trains=None, weather=None, event=None, headline=None, sequence=0):
+    """
+    Encodes the sign's display data into a fixed-layout binary snapshot.
+
+    Args:
+        trains (list, optional): Two train entries (Train objects or dicts with 'destination' and 'minutes'),
+            either of which may be None.
+        weather (dict, optional): Weather dict as built by get_weather() in code.py.
+        event (dict, optional): Dict with 'departure_time' (epoch seconds) and 'departure_train'.
+        headline (dict, optional): Dict with 'source', 'title', 'hour' and 'minute' (local publish time).
+        sequence (int, optional): Sequence number so the sign can skip snapshots it has already applied.
+
+    Returns:
+        bytes: A SNAPSHOT_SIZE byte record.
+    """
+    buffer = bytearray(SNAPSHOT_SIZE)
+    sections = 0
+
+    if trains is not None:
+        sections |= SECTION_TRAINS
+        offset = TRAIN_OFFSET
+        for index in range(2):
+            train = trains[index] if index < len(trains) else None
+            if train is not None:
+                _pack_text(buffer, offset, str(train["destination"]), DESTINATION_SIZE)
+                _pack_text(buffer, offset + 1 + DESTINATION_SIZE, str(train["minutes"]), MINUTES_SIZE)
+            offset += TRAIN_SIZE
+
+    if weather:
+        sections |= SECTION_WEATHER
+        icon = truncate_utf8((weather.get("icon") or "").encode("utf-8"), ICON_SIZE)
+        buffer[WEATHER_OFFSET:WEATHER_OFFSET + len(icon)] = icon
+        struct.pack_into(WEATHER_FORMAT, buffer, WEATHER_OFFSET + ICON_SIZE,
+                         *[_tenths(weather.get(field) or 0) for field in WEATHER_FIELDS])
+
+    if event is not None and event.get("departure_time") is not None:
+        sections |= SECTION_EVENT
+        struct.pack_into(EVENT_FORMAT, buffer, EVENT_OFFSET, int(event["departure_time"]))
+        _pack_text(buffer, EVENT_OFFSET + 4, event.get("departure_train"), DEPARTURE_TRAIN_SIZE)
+
+    if headline is not None and headline.get("title"):
+        sections |= SECTION_HEADLINE
+        struct.pack_into(HEADLINE_TIME_FORMAT, buffer, HEADLINE_OFFSET,
+                         int(headline.get("hour") or 0), int(headline.get("minute") or 0))
+        offset = _pack_text(buffer, HEADLINE_OFFSET + 2, headline.get("source"), SOURCE_SIZE)
+        _pack_text(buffer, offset, headline["title"], TITLE_SIZE, TITLE_LENGTH_FORMAT)
+
+    buffer[0:4] = MAGIC
+    struct.pack_into(HEADER_FORMAT, buffer, 4, VERSION, sections, sequence & 0xFFFF)
+    return bytes(buffer)
+
+
+# --- DEVICE SIDE DECODER ---
+
+class Snapshot:
+    """
+    Preallocated decode target for a binary snapshot.
+
+    All text slots are bytearrays sized to their maximum length with a separate length, so
+    decode_into() copies bytes in place instead of building dicts and strings. Call text() only
+    for the fields whose display actually changed.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray(SNAPSHOT_SIZE)
+        self.view = memoryview(self.buffer)
+        self.version = 0
+        self.sections = 0
+        self.sequence = None
+
+        self.destination = [bytearray(DESTINATION_SIZE), bytearray(DESTINATION_SIZE)]
+        self.destination_len = [0, 0]
+        self.minutes = [bytearray(MINUTES_SIZE), bytearray(MINUTES_SIZE)]
+        self.minutes_len = [0, 0]
+
+        self.icon = bytearray(ICON_SIZE)
+        # weather values in tenths of a degree, ordered as WEATHER_FIELDS
+        self.weather = [0] * len(WEATHER_FIELDS)
+
+        self.departure_time = 0
+        self.departure_train = bytearray(DEPARTURE_TRAIN_SIZE)
+        self.departure_train_len = 0
+
+        self.published_hour = 0
+        self.published_minute = 0
+        self.source = bytearray(SOURCE_SIZE)
+        self.source_len = 0
+        self.title = bytearray(TITLE_SIZE)
+        self.title_len = 0
+
+    def read_response(self, response, chunk_size=64):
+        """
+        Copies an HTTP response body into self.buffer chunk by chunk, without building the
+        whole body as one bytes object first.
+
+        Returns:
+            int: The number of bytes copied.
+        """
+        count = 0
+        for chunk in response.iter_content(chunk_size):
+            size = min(len(chunk), SNAPSHOT_SIZE - count)
+            self.buffer[count:count + size] = chunk[:size]
+            count += size
+            if count >= SNAPSHOT_SIZE:
+                break
+        return count
+
+    def decode_into(self, data=None, length=None):
+        """
+        Decodes a snapshot into the preallocated fields.
+
+        Args:
+            data (buffer, optional): Snapshot bytes. Defaults to self.buffer, which callers can
+                fill in place (e.g. with a socket readinto) to skip a copy.
+            length (int, optional): Bytes actually filled in, e.g. read_response()'s count. Defaults
+                to the length of data. A short body is rejected rather than decoded over the tail
+                of the previous snapshot.
+
+        Returns:
+            bool: True if the snapshot was valid and newer than the last one decoded.
+        """
+        view = self.view if data is None else memoryview(data)
+        if length is None:
+            length = len(view)
+        if length < SNAPSHOT_SIZE or len(view) < SNAPSHOT_SIZE:
+            return False
+        for index in range(4):
+            if view[index] != MAGIC[index]:
+                return False
+        version, sections, sequence = struct.unpack_from(HEADER_FORMAT, view, 4)
+        if version != VERSION:
+            print("Unsupported snapshot version: {}".format(version))
+            return False
+        if sequence == self.sequence:
+            return False
+        self.version = version
+        self.sections = sections
+        self.sequence = sequence
+
+        if sections & SECTION_TRAINS:
+            offset = TRAIN_OFFSET
+            for index in range(2):
+                self.destination_len[index] = view[offset]
+                self.destination[index][:] = view[offset + 1:offset + 1 + DESTINATION_SIZE]
+                offset += 1 + DESTINATION_SIZE
+                self.minutes_len[index] = view[offset]
+                self.minutes[index][:] = view[offset + 1:offset + 1 + MINUTES_SIZE]
+                offset += 1 + MINUTES_SIZE
+
+        if sections & SECTION_WEATHER:
+            self.icon[:] = view[WEATHER_OFFSET:WEATHER_OFFSET + ICON_SIZE]
+            values = struct.unpack_from(WEATHER_FORMAT, view, WEATHER_OFFSET + ICON_SIZE)
+            for index in range(len(values)):
+                self.weather[index] = values[index]
+
+        if sections & SECTION_EVENT:
+            self.departure_time = struct.unpack_from(EVENT_FORMAT, view, EVENT_OFFSET)[0]
+            self.departure_train_len = view[EVENT_OFFSET + 4]
+            self.departure_train[:] = view[EVENT_OFFSET + 5:EVENT_OFFSET + 5 + DEPARTURE_TRAIN_SIZE]
+
+        if sections & SECTION_HEADLINE:
+            offset = HEADLINE_OFFSET
+            self.published_hour = view[offset]
+            self.published_minute = view[offset + 1]
+            self.source_len = view[offset + 2]
+            self.source[:] = view[offset + 3:offset + 3 + SOURCE_SIZE]
+            offset += 3 + SOURCE_SIZE
+            self.title_len = struct.unpack_from(TITLE_LENGTH_FORMAT, view, offset)[0]
+            self.title[:] = view[offset + 2:offset + 2 + TITLE_SIZE]
+
+        return True
+
+    def has(self, section):
+        return bool(self.sections & section)
+
+    @staticmethod
+    def text(field, length):
+        """
+        Converts a decoded text slot to a str (allocates, so only call it for changed fields). A slot
+        that is not valid UTF-8 (e.g. cut mid-character by an older encoder) reads as empty.
+        """
+        try:
+            return str(field[:length], "utf-8")
+        except UnicodeError:
+            return ""
+
+    def train(self, index):
+        """Returns (destination, minutes) strings for train slot 0 (east) or 1 (west), or None if empty."""
+        if not self.sections & SECTION_TRAINS or self.destination_len[index] == 0:
+            return None
+        return (self.text(self.destination[index], self.destination_len[index]),
+                self.text(self.minutes[index], self.minutes_len[index]))
+
+    def weather_value(self, field):
+        """Returns a weather field in degrees, e.g. weather_value('current_temp')."""
+        return self.weather[WEATHER_FIELDS.index(field)] / 10
+
+    def fill_weather(self, weather_data):
+        """Updates a code.py style weather dict in place from the decoded weather section."""
+        if not self.sections & SECTION_WEATHER:
+            return False
+        weather_data["icon"] = self.text(self.icon, ICON_SIZE).rstrip("\x00")
+        for index in range(len(WEATHER_FIELDS)):
+            weather_data[WEATHER_FIELDS[index]] = self.weather[index] / 10
+        return True
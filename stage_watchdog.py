@@ -0,0 +1,334 @@
+# Stage Watchdog
+# Supervises the main loop with microcontroller.watchdog so a hung request or a stuck loop
+# recovers by itself instead of freezing the sign until it is power-cycled. Each stage of a loop
+# (time sync, train fetch, render, scroll, sleep) runs under its own deadline. Entering a stage
+# sets the hardware timeout to that deadline (capped at what the hardware allows) and feeds the
+# watchdog. After that it is only fed when the stage finishes or when a long stage reports
+# progress with check(). Between stages the loop runs under the "loop" deadline.
+#
+# A stage that runs past its deadline, or a call that blocks until the hardware timer expires,
+# writes the stage to NVM and resets the board. The next boot reports which stage stalled (see
+# restore()). The timer runs in RAISE mode where the port supports it, so a hang that returns to
+# the interpreter (the ESP32SPI driver waits in Python loops) can be recorded before the reset.
+# A WatchDogTimeout swallowed by an `except Exception` is still caught: the stage sees it was not
+# fed within the hardware timeout when it ends. Without RAISE mode the timer resets the board
+# directly, and only overruns found by the software deadline are recorded.
+#
+# Stages do not nest.
+#
+# The hardware timeout is capped at max_timeout (16 s on the SAMD51) and nothing feeds the watchdog
+# during a blocking call, so no single request may take longer than that: the sign's request timeout
+# is REQUEST_TIMEOUT with the watchdog on. A stage deadline above the cap only holds for stages that
+# call check() between their requests (time sync, and the loop between its fetches).
+#
+# Layout at `offset` in NVM (little-endian), clear of warm_boot.py's and quota.py's records:
+#   magic "DCWD" | version u8 | reason u8 | overruns u8 | pending u8
+#   stage name 16s | seconds in stage u16 | stage deadline u16 | uptime seconds u32
+
+import struct
+import time
+
+try:
+    from watchdog import WatchDogMode, WatchDogTimeout
+except ImportError:
+    WatchDogMode = None
+    WatchDogTimeout = None
+
+MAGIC = b"DCWD"
+VERSION = 1
+
+RECORD_FORMAT = "<4sBBBB16sHHI"
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+
+# why the board was reset
+REASON_DEADLINE = 0
+REASON_HARDWARE = 1
+REASON_CRASH = 2
+REASON_NAMES = ("deadline", "hardware timeout", "crash")
+
+# longest hardware timeout the SAMD51 watchdog allows, in seconds
+MAX_TIMEOUT = 16
+# request timeout that leaves a blocking call room to finish within MAX_TIMEOUT
+REQUEST_TIMEOUT = MAX_TIMEOUT - 4
+
+# seconds each stage may take; "loop" covers the work between stages. Stages made of one blocking
+# request (train fetch) get no more than MAX_TIMEOUT, which is all the hardware can honour.
+DEFAULT_DEADLINES = {
+    "loop": 30,
+    "time sync": 30,
+    "train fetch": MAX_TIMEOUT,
+    "render": 5,
+    "scroll": 60,
+    "sleep": 70,
+}
+
+
+def _reset():
+    import microcontroller
+    microcontroller.reset()
+
+
+class StageWatchdog:
+    def __init__(self, watchdog=None, nvm=None, offset=640, deadlines=None, max_timeout=MAX_TIMEOUT, reset=None):
+        """
+        Args:
+            watchdog (WatchDogTimer, optional): microcontroller.watchdog. None supervises the deadlines
+                in software only.
+            nvm (ByteArray, optional): microcontroller.nvm to record overruns in. Defaults to None.
+            offset (int, optional): Where the record starts in NVM. Defaults to 640.
+            deadlines (dict, optional): Stage name -> seconds, merged over DEFAULT_DEADLINES.
+            max_timeout (int, optional): Longest hardware timeout the port allows. Defaults to 16 seconds.
+            reset (callable, optional): Resets the board. Defaults to microcontroller.reset.
+        """
+        self.watchdog = watchdog
+        self.nvm = nvm
+        self.offset = offset
+        self.deadlines = dict(DEFAULT_DEADLINES)
+        self.deadlines.update(deadlines or {})
+        self.max_timeout = max_timeout
+        self.reset = reset or _reset
+        self.running = False
+        # start() was called, and suspend() stopped supervision that resume() should restart
+        self.started = False
+        self.suspended = False
+        # True while the hardware timer is running
+        self.armed = False
+        # current stage, when it started and when it must be done (monotonic seconds)
+        self.stage_name = "loop"
+        self.started_at = time.monotonic()
+        self.deadline = None
+        self.fed_at = self.started_at
+        # hardware timeout set for the current stage, None without a hardware watchdog
+        self.timeout = None
+        # stage and deadline the next `with` block enters
+        self._next_name = None
+        self._next_deadline = None
+        # overruns recorded in NVM, and the last one if it has not been reported yet
+        self.overruns = 0
+        self.last = None
+        # callables(stage name, reason) run before the reset, e.g. saving state that would be lost
+        self.listeners = []
+
+    @property
+    def feed_interval(self):
+        """
+        Returns the longest a supervised wait should go without calling check(), or None if anything goes.
+        """
+        if self.timeout is None:
+            return None
+        return self.timeout / 2
+
+    # --- HARDWARE ---
+    def _configure(self, seconds):
+        if self.watchdog is None:
+            return
+        timeout = max(1, min(seconds, self.max_timeout))
+        if timeout != self.timeout:
+            try:
+                self.watchdog.timeout = timeout
+                self.timeout = timeout
+            except (ValueError, RuntimeError) as e:
+                print("Watchdog timeout {} rejected: {}".format(timeout, e))
+        if self.armed:
+            self.watchdog.feed()
+
+    def start(self):
+        """
+        Starts the hardware watchdog, in RAISE mode if the port has it, and enters the "loop" stage.
+        """
+        self.started = True
+        self.suspended = False
+        self.running = True
+        self._enter("loop")
+        if self.watchdog is None or WatchDogMode is None:
+            return
+        try:
+            self.watchdog.mode = getattr(WatchDogMode, "RAISE", None) or WatchDogMode.RESET
+        except (ValueError, RuntimeError):
+            self.watchdog.mode = WatchDogMode.RESET
+        self.armed = True
+        self.watchdog.feed()
+
+    def suspend(self):
+        """
+        Stops the hardware watchdog for a light sleep. Does nothing if supervision was never started.
+
+        Returns:
+            bool: True if it was stopped (or there is none). False if this port can't stop it; the
+            caller should sleep in check()ed steps instead.
+        """
+        if not self.running:
+            return True
+        if self.watchdog is None or WatchDogMode is None:
+            self.running = False
+            self.suspended = True
+            return True
+        try:
+            self.watchdog.deinit()
+        except (ValueError, RuntimeError, NotImplementedError) as e:
+            print("Watchdog can't be suspended: {}".format(e))
+            return False
+        self.running = False
+        self.suspended = True
+        self.armed = False
+        self.timeout = None
+        return True
+
+    def resume(self):
+        """
+        Restarts supervision stopped by suspend(). A watchdog that was never started stays off.
+        """
+        if self.suspended:
+            self.start()
+
+    # --- STAGES ---
+    def _enter(self, name, deadline=None):
+        now = time.monotonic()
+        self.stage_name = name
+        self.started_at = now
+        seconds = deadline or self.deadlines.get(name, self.deadlines["loop"])
+        self.deadline = now + seconds
+        self.fed_at = now
+        self._configure(seconds)
+
+    def stage(self, name, deadline=None):
+        """
+        Returns a context manager that runs its block as the named stage:
+            with stage_watchdog.stage("train fetch"):
+                trains = get_trains()
+
+        Args:
+            name (str): Stage name, recorded if it overruns.
+            deadline (float, optional): Seconds for this run of the stage. Defaults to the stage's
+                entry in deadlines.
+        """
+        self._next_name = name
+        self._next_deadline = deadline
+        return self
+
+    def __enter__(self):
+        if self.running:
+            # the work since the last stage has to be on time too
+            self._check_overrun()
+            self._enter(self._next_name, self._next_deadline)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if not self.running:
+            return False
+        if exc_type is not None and WatchDogTimeout is not None and issubclass(exc_type, WatchDogTimeout):
+            self.overrun(REASON_HARDWARE)
+        self._check_overrun()
+        self._enter("loop")
+        return False
+
+    def _check_overrun(self):
+        now = time.monotonic()
+        if self.timeout is not None and now - self.fed_at >= self.timeout:
+            # the hardware timer expired; its WatchDogTimeout was swallowed somewhere
+            self.overrun(REASON_HARDWARE)
+        elif self.deadline is not None and now > self.deadline:
+            self.overrun(REASON_DEADLINE)
+
+    def check(self):
+        """
+        Reports progress from inside a long stage (a scroll, a sleep). Feeds the watchdog if the stage is
+        still within its deadline; resets the board if it is not.
+        """
+        if not self.running:
+            return
+        self._check_overrun()
+        self.fed_at = time.monotonic()
+        if self.armed:
+            self.watchdog.feed()
+
+    def progress(self):
+        """
+        Reports that a long stage finished a unit of work, e.g. a failed attempt in a retry loop, and
+        gives the stage its full deadline again. A stage that keeps making progress is never reset;
+        each unit of work must still finish within the deadline.
+        """
+        if not self.running:
+            return
+        self._check_overrun()
+        self._enter(self.stage_name, self.deadline - self.started_at)
+
+    # --- OVERRUNS ---
+    def overrun(self, reason=REASON_DEADLINE):
+        """
+        Records the current stage in NVM and resets the board.
+        """
+        now = time.monotonic()
+        elapsed = now - self.started_at
+        deadline = self.deadline - self.started_at if self.deadline is not None else 0
+        print("Watchdog: {} {} after {:.1f} s (deadline {:.0f} s), resetting".format(
+            self.stage_name, REASON_NAMES[reason], elapsed, deadline))
+        self.save(self.stage_name, reason, elapsed, deadline, now)
+        # nothing may stall the reset, so the listeners run unsupervised and may not raise
+        self.running = False
+        for listener in self.listeners:
+            try:
+                listener(self.stage_name, reason)
+            except Exception as e:
+                print("Watchdog listener failed: {}".format(e))
+        self.reset()
+
+    def fail(self, error):
+        """
+        Records an exception that escaped the main loop and resets the board, instead of halting.
+        """
+        reason = REASON_CRASH
+        if WatchDogTimeout is not None and isinstance(error, WatchDogTimeout):
+            reason = REASON_HARDWARE
+        print("Main loop failed in {}: {}".format(self.stage_name, error))
+        self.overrun(reason)
+
+    def save(self, stage_name, reason, elapsed, deadline, uptime, pending=True):
+        if self.nvm is None or len(self.nvm) < self.offset + RECORD_SIZE:
+            return False
+        if pending:
+            self.overruns = min(255, self.overruns + 1)
+        record = struct.pack(RECORD_FORMAT, MAGIC, VERSION, reason, self.overruns, 1 if pending else 0,
+                             stage_name.encode("utf-8")[:16], min(65535, int(elapsed)),
+                             min(65535, int(deadline)), int(uptime) & 0xFFFFFFFF)
+        try:
+            self.nvm[self.offset:self.offset + RECORD_SIZE] = record
+        except Exception as e:
+            print("Failed to save watchdog record: {}".format(e))
+            return False
+        return True
+
+    def restore(self):
+        """
+        Reads the overrun recorded before the last reset. An overrun is reported once: it is marked as
+        reported in NVM, the only write a normal boot makes.
+
+        Returns:
+            bool: True if the last reset was an overrun not reported yet; details are in `last`.
+        """
+        if self.nvm is None or len(self.nvm) < self.offset + RECORD_SIZE:
+            return False
+        record = self.nvm[self.offset:self.offset + RECORD_SIZE]
+        magic, version, reason, overruns, pending, stage_name, elapsed, deadline, uptime = struct.unpack(
+            RECORD_FORMAT, record)
+        if magic != MAGIC or version != VERSION:
+            return False
+        self.overruns = overruns
+        if not pending:
+            return False
+        stage_name = str(stage_name.rstrip(b"\x00"), "utf-8")
+        self.last = (stage_name, reason, elapsed, deadline, uptime)
+        self.save(stage_name, reason, elapsed, deadline, uptime, pending=False)
+        return True
+
+    def report(self):
+        """
+        Returns the last overrun as one line, e.g.
+        "train fetch hardware timeout after 16 s of 30 s, 5400 s after boot (3 overruns)".
+        """
+        if self.last is None:
+            return None
+        stage_name, reason, elapsed, deadline, uptime = self.last
+        return "{} {} after {} s of {} s, {} s after boot ({} overruns)".format(
+            stage_name, REASON_NAMES[reason] if reason < len(REASON_NAMES) else reason, elapsed, deadline, uptime,
+            self.overruns)
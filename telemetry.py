@@ -0,0 +1,148 @@
+# Telemetry
+# Records sign metrics into a fixed number of preallocated slots (count, min, max, last) and
+# flushes all of them to Adafruit IO at once: one POST to the group data endpoint, or one MQTT
+# publish to the group's JSON topic when an MQTT connection is available.
+
+import json
+
+AIO_BASE_URL = "https://io.adafruit.com/api/v2/"
+
+# which aggregate is sent as the feed value
+REPORT_LAST = 0
+REPORT_MIN = 1
+REPORT_MAX = 2
+REPORT_COUNT = 3
+
+
+class Telemetry:
+    def __init__(self, username, key, group, size=8):
+        """
+        Args:
+            username (str): Adafruit IO username.
+            key (str): Adafruit IO key.
+            group (str): Key of the Adafruit IO group the metric feeds belong to.
+            size (int, optional): Maximum number of metrics. Slots are allocated up front. Defaults to 8.
+        """
+        self.username = username
+        self.key = key
+        self.group = group
+        self.size = size
+        # metric name -> slot index
+        self.slots = {}
+        self.feeds = [None] * size
+        self.report = [REPORT_LAST] * size
+        self.count = [0] * size
+        self.min = [0.0] * size
+        self.max = [0.0] * size
+        self.last = [0.0] * size
+
+    def register(self, name, feed_key, report=REPORT_LAST):
+        """
+        Reserves a slot for a metric.
+
+        Args:
+            name (str): Metric name used with record().
+            feed_key (str): Adafruit IO feed key (within the group) the metric is sent to.
+            report (int, optional): Aggregate to send as the feed value. Defaults to REPORT_LAST.
+        """
+        if name in self.slots:
+            index = self.slots[name]
+        elif len(self.slots) < self.size:
+            index = len(self.slots)
+            self.slots[name] = index
+        else:
+            print("Telemetry buffer full, not registering {}".format(name))
+            return
+        self.feeds[index] = feed_key
+        self.report[index] = report
+
+    def record(self, name, value):
+        """
+        Adds a value to a metric's aggregates. Unregistered metrics are ignored.
+        """
+        index = self.slots.get(name)
+        if index is None:
+            return
+        if self.count[index] == 0:
+            self.min[index] = value
+            self.max[index] = value
+        elif value < self.min[index]:
+            self.min[index] = value
+        elif value > self.max[index]:
+            self.max[index] = value
+        self.last[index] = value
+        self.count[index] += 1
+
+    @property
+    def pending(self):
+        for index in range(len(self.slots)):
+            if self.count[index]:
+                return True
+        return False
+
+    def summary(self, name):
+        """
+        Returns (count, min, max, last) for a metric, or None if it is not registered.
+        """
+        index = self.slots.get(name)
+        if index is None:
+            return None
+        return self.count[index], self.min[index], self.max[index], self.last[index]
+
+    def _value(self, index):
+        report = self.report[index]
+        if report == REPORT_MIN:
+            return self.min[index]
+        if report == REPORT_MAX:
+            return self.max[index]
+        if report == REPORT_COUNT:
+            return self.count[index]
+        return self.last[index]
+
+    def reset(self):
+        for index in range(self.size):
+            self.count[index] = 0
+
+    def flush(self, wifi=None, mqtt=None):
+        """
+        Sends every metric with at least one value in a single request and resets the aggregates.
+
+        Args:
+            wifi (optional): ESPSPI_WiFiManager used for the group data POST.
+            mqtt (optional): MQTTManager connected to Adafruit IO; preferred over wifi when given.
+
+        Returns:
+            bool: True if the batch was accepted.
+        """
+        indexes = [index for index in range(len(self.slots)) if self.count[index]]
+        if not indexes:
+            return True
+
+        if mqtt is not None:
+            # group JSON topic takes {"feeds": {"feed-key": value, ...}}
+            feeds = {}
+            for index in indexes:
+                feeds[self.feeds[index]] = self._value(index)
+            sent = mqtt.publish("{}/groups/{}/json".format(self.username, self.group),
+                                json.dumps({"feeds": feeds}))
+        else:
+            # group data endpoint takes {"feeds": [{"key": "feed-key", "value": value}, ...]}
+            payload = {"feeds": [{"key": self.feeds[index], "value": self._value(index)} for index in indexes]}
+            sent = False
+            try:
+                response = wifi.post(
+                    "{}{}/groups/{}/data".format(AIO_BASE_URL, self.username, self.group),
+                    headers={"X-AIO-Key": self.key},
+                    json=payload,
+                )
+                # the reply body echoes the data points back, so skip parsing it
+                sent = response.status_code == 200
+                if not sent:
+                    print("Telemetry flush rejected: {}".format(response.status_code))
+                response.close()
+            except Exception as e:
+                print("Failed to flush telemetry: {}".format(e))
+
+        if sent:
+            self.reset()
+        return sent
@@ -0,0 +1,38 @@
+# Time Utilities
+# Small time helpers shared by code.py and the optional subsystems (headlines.py, quota.py).
+
+
+def format_time_struct(time_struct):
+    """
+    Format the given time struct to a 12-hour format.
+
+    Args:
+        time_struct (time.struct_time): The time struct to be formatted.
+
+    Returns:
+        str: The formatted time string in the format "HH:MMAM/PM".
+    """
+    if time_struct.tm_hour == 0:
+        hour = 12
+    elif time_struct.tm_hour > 12:
+        hour = time_struct.tm_hour % 12
+    else:
+        hour = time_struct.tm_hour
+    minute = "{:02d}".format(time_struct.tm_min)
+    # Calculate AM/PM suffix
+    suffix = "AM" if time_struct.tm_hour < 12 else "PM"
+    return f"{hour}:{minute} {suffix}"
+
+
+def offset_minutes(timezone_offset):
+    """
+    Converts a UTC offset like "-0400" to minutes (-240). Returns 0 if it is unknown.
+    """
+    if not timezone_offset:
+        return 0
+    try:
+        sign = -1 if timezone_offset[0] == "-" else 1
+        digits = timezone_offset.lstrip("+-")
+        return sign * (int(digits[:-2]) * 60 + int(digits[-2:]))
+    except ValueError:
+        return 0
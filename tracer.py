@@ -0,0 +1,186 @@
+# Tracer
+# Lightweight per-stage instrumentation for the main loop. Each traced stage records its
+# monotonic duration and gc.mem_free() delta into a fixed-size histogram, and summary()
+# returns a compact one-line report suitable for telemetry.
+#
+# Usage:
+#   tracer = Tracer(enabled=True)
+#
+#   @tracer.traced("get_trains")
+#   def get_trains(): ...
+#
+#   with tracer.span("gc.collect"):
+#       gc.collect()
+#
+# When disabled, traced() returns the function unchanged and span() returns a shared no-op
+# context manager, so tracing costs nothing beyond the toggle check at startup.
+
+import gc
+import time
+
+# duration histogram bucket upper bounds in milliseconds; the last bucket is open-ended
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+try:
+    _monotonic_ns = time.monotonic_ns
+except AttributeError:
+    def _monotonic_ns():
+        return int(time.monotonic() * 1000000000)
+
+# gc.mem_free() only exists on CircuitPython/MicroPython
+_mem_free = getattr(gc, "mem_free", None)
+
+
+class Stage:
+    """
+    Duration histogram and heap delta aggregates for one traced stage. Also acts as the
+    stage's context manager, so entering a span does not allocate. Not reentrant.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        # gc.mem_free() after minus before: negative means the stage consumed heap
+        self.heap_min = 0
+        self.heap_max = 0
+        self.heap_total = 0
+        self._start = 0
+        self._free = 0
+
+    def __enter__(self):
+        self._free = _mem_free() if _mem_free else 0
+        self._start = _monotonic_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        elapsed_ms = (_monotonic_ns() - self._start) / 1000000
+        heap_delta = (_mem_free() - self._free) if _mem_free else 0
+        self.add(elapsed_ms, heap_delta)
+        return False
+
+    def add(self, elapsed_ms, heap_delta=0):
+        index = 0
+        while index < len(BUCKETS_MS) and elapsed_ms > BUCKETS_MS[index]:
+            index += 1
+        self.buckets[index] += 1
+        if self.count == 0 or heap_delta < self.heap_min:
+            self.heap_min = heap_delta
+        if self.count == 0 or heap_delta > self.heap_max:
+            self.heap_max = heap_delta
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.heap_total += heap_delta
+        if elapsed_ms > self.max_ms:
+            self.max_ms = elapsed_ms
+
+    def percentile(self, fraction):
+        """
+        Estimates a duration percentile (e.g. 0.5) from the histogram as the upper bound of the
+        bucket that contains it; the open-ended bucket reports the observed maximum.
+        """
+        if self.count == 0:
+            return 0
+        target = fraction * self.count
+        seen = 0
+        for index in range(len(self.buckets)):
+            seen += self.buckets[index]
+            if seen >= target:
+                if index < len(BUCKETS_MS):
+                    return min(BUCKETS_MS[index], self.max_ms)
+                return self.max_ms
+        return self.max_ms
+
+    def reset(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        for index in range(len(self.buckets)):
+            self.buckets[index] = 0
+        self.heap_min = 0
+        self.heap_max = 0
+        self.heap_total = 0
+
+
+class _NoSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+class Tracer:
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        # stage name -> Stage, in registration order for summaries
+        self.stages = {}
+        self.order = []
+
+    def stage(self, name):
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = Stage(name)
+            self.stages[name] = stage
+            self.order.append(name)
+        return stage
+
+    def span(self, name):
+        """
+        Returns a context manager that records one span of the named stage.
+        """
+        if not self.enabled:
+            return _NO_SPAN
+        return self.stage(name)
+
+    def traced(self, name):
+        """
+        Decorator recording every call of the wrapped function as a span of the named stage.
+        Returns the function unchanged when tracing is disabled.
+        """
+        def decorator(function):
+            if not self.enabled:
+                return function
+            stage = self.stage(name)
+
+            def wrapper(*args, **kwargs):
+                with stage:
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def wrap_method(self, obj, method_name, name=None):
+        """
+        Replaces obj.method_name with a traced version on the instance (used for display_manager).
+        """
+        if self.enabled:
+            setattr(obj, method_name, self.traced(name or method_name)(getattr(obj, method_name)))
+
+    def summary(self):
+        """
+        Returns a compact summary, one "name:count/p50/p95/max ms/heap" entry per stage, e.g.
+        "get_trains:6/500/1000/912ms/-2048B".
+        """
+        parts = []
+        for name in self.order:
+            stage = self.stages[name]
+            if stage.count == 0:
+                continue
+            parts.append("{}:{}/{}/{}/{}ms/{}B".format(
+                name,
+                stage.count,
+                round(stage.percentile(0.5)),
+                round(stage.percentile(0.95)),
+                round(stage.max_ms),
+                stage.heap_min,
+            ))
+        return " ".join(parts)
+
+    def reset(self):
+        for name in self.order:
+            self.stages[name].reset()
@@ -0,0 +1,187 @@
+# Warm Boot
+# Keeps the last known display state in microcontroller.nvm so a reset or power blip comes back
+# showing trains, weather and the daily min/max right away instead of placeholders. The state is
+# a snapshot.py record (train slots, weather fields, current headline) behind a small header that
+# adds what the snapshot doesn't carry: the daily min/max with their day stamps, the timezone
+# offset and when the state was saved.
+#
+# Layout at `offset` in NVM (little-endian):
+#   magic "DCWB" | version u8 | flags u8 | writes u16 | crc32 u32 of everything after the header
+#   highest temp i16 (tenths) | highest day u8 | lowest temp i16 | lowest day u8 | saved epoch u32
+#   timezone offset len u8 + 8 bytes | snapshot record (snapshot.SNAPSHOT_SIZE bytes)
+# A day of 0xFF means the value was not set. NVM is flash: save() writes at most once per
+# `min_interval` seconds and only when the record changed. Train minutes change every minute, so
+# periodic saves keep only the destinations; forced saves before a reset keep the minutes too.
+
+import struct
+import time
+
+from binascii import crc32
+
+from snapshot import Snapshot, SNAPSHOT_SIZE, encode_snapshot
+
+MAGIC = b"DCWB"
+VERSION = 1
+
+HEADER_FORMAT = "<4sBBHI"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+STATE_FORMAT = "<hBhBI"
+STATE_SIZE = struct.calcsize(STATE_FORMAT)
+TIMEZONE_SIZE = 8
+RECORD_SIZE = HEADER_SIZE + STATE_SIZE + 1 + TIMEZONE_SIZE + SNAPSHOT_SIZE
+
+NO_DAY = 0xFF
+# min/max and timezone offset older than this are dropped once the time is known again
+MAX_AGE = 24 * 60 * 60
+
+
+def _tenths(value):
+    return max(-32768, min(32767, int(round(value * 10))))
+
+
+class WarmBoot:
+    def __init__(self, nvm, offset=0, min_interval=60 * 60):
+        """
+        Args:
+            nvm (ByteArray): microcontroller.nvm, or any writable buffer.
+            offset (int, optional): Where the record starts in NVM. Defaults to 0.
+            min_interval (int, optional): Minimum seconds between NVM writes. Defaults to 1 hour.
+        """
+        self.nvm = nvm
+        self.offset = offset
+        self.min_interval = min_interval
+        self.snapshot = Snapshot()
+        self.highest_temp = [None, None]
+        self.lowest_temp = [None, None]
+        self.timezone_offset = None
+        self.saved_epoch = 0
+        self.writes = 0
+        # True from a successful restore() until the sign has fetched fresh data
+        self.stale = False
+        # the first write after boot waits a full interval, so a reset loop can't wear out the flash
+        self.last_save = time.monotonic()
+
+    def restore(self):
+        """
+        Reads the saved state from NVM into self.snapshot and the min/max, timezone and epoch attributes.
+
+        Returns:
+            bool: True if a valid record was found.
+        """
+        if len(self.nvm) < self.offset + RECORD_SIZE:
+            print("NVM too small for warm boot state")
+            return False
+        record = self.nvm[self.offset:self.offset + RECORD_SIZE]
+        magic, version, _, writes, checksum = struct.unpack_from(HEADER_FORMAT, record, 0)
+        if magic != MAGIC or version != VERSION:
+            return False
+        if crc32(record[HEADER_SIZE:]) & 0xFFFFFFFF != checksum:
+            print("Warm boot state failed its checksum, ignoring it")
+            return False
+        self.writes = writes
+
+        highest, highest_day, lowest, lowest_day, saved_epoch = struct.unpack_from(STATE_FORMAT, record, HEADER_SIZE)
+        if highest_day != NO_DAY:
+            self.highest_temp = [highest / 10, highest_day]
+        if lowest_day != NO_DAY:
+            self.lowest_temp = [lowest / 10, lowest_day]
+        self.saved_epoch = saved_epoch
+
+        offset = HEADER_SIZE + STATE_SIZE
+        length = record[offset]
+        if 0 < length <= TIMEZONE_SIZE:
+            self.timezone_offset = str(record[offset + 1:offset + 1 + length], "utf-8")
+
+        if not self.snapshot.decode_into(record[offset + 1 + TIMEZONE_SIZE:]):
+            return False
+        self.stale = True
+        return True
+
+    def invalidate(self):
+        """
+        Clears the record's magic so the next boot starts cold, e.g. after a record that passed its
+        checksum could not be shown. One NVM write.
+        """
+        self.stale = False
+        try:
+            self.nvm[self.offset:self.offset + 4] = b"\x00\x00\x00\x00"
+        except Exception as e:
+            print("Failed to clear warm boot state: {}".format(e))
+
+    def expired(self, now_epoch):
+        """
+        Returns True if the saved state is more than MAX_AGE old at now_epoch (the synced local epoch).
+        """
+        return self.saved_epoch == 0 or now_epoch - self.saved_epoch > MAX_AGE
+
+    def encode(self, trains, weather, highest_temp, lowest_temp, timezone_offset, headline, now_epoch,
+               minutes=True):
+        """
+        Builds the NVM record.
+
+        Args:
+            trains (list): Two Train objects (or None) as kept in historical_trains.
+            weather (dict): The weather_data dict.
+            highest_temp (list): [temperature, day] as kept by track_daily_temps().
+            lowest_temp (list): [temperature, day] as kept by track_daily_temps().
+            timezone_offset (str): Offset like "-0400", or None.
+            headline (dict): 'source', 'title', 'hour' and 'minute' of the current headline, or None.
+            now_epoch (int): Local epoch the state is from.
+            minutes (bool, optional): Keep the train minutes; False keeps only the destinations. Defaults to True.
+
+        Returns:
+            bytearray: RECORD_SIZE bytes.
+        """
+        record = bytearray(RECORD_SIZE)
+        highest_set = highest_temp[0] is not None and highest_temp[1] is not None
+        lowest_set = lowest_temp[0] is not None and lowest_temp[1] is not None
+        struct.pack_into(STATE_FORMAT, record, HEADER_SIZE,
+                         _tenths(highest_temp[0]) if highest_set else 0, highest_temp[1] if highest_set else NO_DAY,
+                         _tenths(lowest_temp[0]) if lowest_set else 0, lowest_temp[1] if lowest_set else NO_DAY,
+                         int(now_epoch or 0))
+        offset = HEADER_SIZE + STATE_SIZE
+        if timezone_offset:
+            encoded = timezone_offset.encode("utf-8")[:TIMEZONE_SIZE]
+            record[offset] = len(encoded)
+            record[offset + 1:offset + 1 + len(encoded)] = encoded
+        offset += 1 + TIMEZONE_SIZE
+        if trains[0] is None and trains[1] is None:
+            trains = None
+        elif not minutes:
+            trains = [None if train is None else {"destination": train["destination"], "minutes": ""}
+                      for train in trains]
+        # sequence 1 so a fresh Snapshot always accepts it
+        record[offset:] = encode_snapshot(trains=trains,
+                                          weather=weather or None, headline=headline, sequence=1)
+        return record
+
+    def save(self, trains, weather, highest_temp, lowest_temp, timezone_offset, headline, now_epoch, force=False):
+        """
+        Writes the state to NVM if it changed and min_interval has passed since the last write.
+        Arguments as for encode(); force=True skips the interval and keeps the train minutes (e.g. right
+        before a reset).
+
+        Returns:
+            bool: True if NVM was written.
+        """
+        if not force and time.monotonic() - self.last_save < self.min_interval:
+            return False
+        record = self.encode(trains, weather, highest_temp, lowest_temp, timezone_offset, headline, now_epoch,
+                             minutes=force)
+        current = self.nvm[self.offset + HEADER_SIZE:self.offset + RECORD_SIZE]
+        # the saved epoch always moves, so compare everything except it
+        epoch_start = STATE_SIZE - 4
+        if (current[:epoch_start] == record[HEADER_SIZE:HEADER_SIZE + epoch_start]
+                and current[STATE_SIZE:] == record[HEADER_SIZE + STATE_SIZE:]):
+            self.last_save = time.monotonic()
+            return False
+        self.writes = (self.writes + 1) & 0xFFFF
+        struct.pack_into(HEADER_FORMAT, record, 0, MAGIC, VERSION, 0, self.writes,
+                         crc32(record[HEADER_SIZE:]) & 0xFFFFFFFF)
+        try:
+            self.nvm[self.offset:self.offset + RECORD_SIZE] = record
+        except Exception as e:
+            print("Failed to save warm boot state: {}".format(e))
+            return False
+        self.last_save = time.monotonic()
+        return True